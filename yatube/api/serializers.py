@@ -0,0 +1,77 @@
+"""Сериализация моделей posts в словари для JSON без шаблонов.
+
+Каждый сериализатор - словарь {поле: функция(объект)}; ?fields=
+оставляет только перечисленные поля. Автор и группа встраиваются
+из select_related и новых запросов не делают.
+"""
+from django.conf import settings
+
+
+class FieldError(ValueError):
+    """Запрошено неизвестное поле."""
+
+
+def _user(user):
+    return {'username': user.username, 'full_name': user.get_full_name()}
+
+
+def _group(group):
+    if group is None:
+        return None
+    return {'slug': group.slug, 'title': group.title}
+
+
+def _image(post):
+    return settings.MEDIA_URL + post.image.name if post.image else None
+
+
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date,
+    'modified': lambda post: post.modified,
+    'author': lambda post: _user(post.author),
+    'group': lambda post: _group(post.group),
+    'image': _image,
+    'comments_count': lambda post: post.comments_count,
+}
+
+GROUP_FIELDS = {
+    'slug': lambda group: group.slug,
+    'title': lambda group: group.title,
+    'description': lambda group: group.description,
+}
+
+PROFILE_FIELDS = {
+    'username': lambda user: user.username,
+    'full_name': lambda user: user.get_full_name(),
+    'posts_count': lambda user: user.stats.posts_count,
+    'followers_count': lambda user: user.stats.followers_count,
+    'following_count': lambda user: user.stats.following_count,
+}
+
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'post': lambda comment: comment.post_id,
+    'text': lambda comment: comment.text,
+    'created': lambda comment: comment.created,
+    'author': lambda comment: _user(comment.author),
+}
+
+
+def select_fields(fields, requested):
+    """Поля из ?fields= (через запятую); пусто - все поля."""
+    if not requested:
+        return fields
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise FieldError(
+            f'Неизвестные поля: {", ".join(unknown)}; '
+            f'доступны: {", ".join(fields)}'
+        )
+    return {name: fields[name] for name in names}
+
+
+def serialize(obj, fields):
+    return {name: getter(obj) for name, getter in fields.items()}
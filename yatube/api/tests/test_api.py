@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}',
+                group=cls.group if number % 2 else None)
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(f'api:{name}', args=args), params)
+
+    def test_post_list_pages_with_cursors(self):
+        """Курсоры проходят все посты, страница - один запрос."""
+        seen = []
+        params = {'limit': 2}
+        while True:
+            with self.assertNumQueries(1):
+                data = self.get('post_list', **params).json()
+            seen.extend(post['id'] for post in data['results'])
+            if not data['next']:
+                break
+            params['after'] = data['next']
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+
+    def test_post_embeds_author_and_group(self):
+        """Автор и группа встроены в пост."""
+        data = self.get('post_detail', self.posts[1].pk).json()
+        self.assertEqual(
+            data['author'], {'username': 'author', 'full_name': 'Лев Толстой'})
+        self.assertEqual(data['group'], {'slug': 'group', 'title': 'Группа'})
+        self.assertEqual(data['text'], 'Пост 1')
+
+    def test_sparse_fieldsets(self):
+        """?fields= оставляет только перечисленные поля."""
+        data = self.get('post_list', fields='id,text').json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response = self.get('post_list', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_group_profile_and_comments(self):
+        """Посты группы, профиль со счетчиками и комментарии."""
+        with self.assertNumQueries(2):
+            data = self.get('group_posts', 'group').json()
+        self.assertEqual(
+            {post['id'] for post in data['results']},
+            {self.posts[1].pk, self.posts[3].pk},
+        )
+        profile = self.get('profile_detail', 'author').json()
+        self.assertEqual(profile['posts_count'], 5)
+        self.assertEqual(profile['followers_count'], 1)
+        with self.assertNumQueries(3):
+            comments = self.get('comment_list', self.posts[0].pk).json()
+        self.assertEqual(
+            [comment['text'] for comment in comments['results']],
+            ['Комментарий'],
+        )
+
+    def test_missing_objects_are_json_404(self):
+        """Несуществующий пост - 404 в JSON, а не HTML-страница."""
+        response = self.get('post_detail', 10 ** 6)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_follow_needs_login(self):
+        """Лента подписок - только для вошедших."""
+        self.assertEqual(self.get('follow_posts').status_code, 401)
+        self.client.force_login(self.reader)
+        data = self.get('follow_posts', limit=3).json()
+        self.assertEqual(len(data['results']), 3)
+        rest = self.get('follow_posts', after=data['next']).json()
+        self.assertEqual(
+            [post['id'] for post in data['results'] + rest['results']],
+            [post.pk for post in reversed(self.posts)],
+        )
+        previous = self.get('follow_posts', before=rest['previous']).json()
+        self.assertEqual(previous['results'], data['results'])
+
+    def test_etags(self):
+        """Совпавший ETag дает 304, и у тегированных, и у ленты подписок."""
+        self.client.force_login(self.reader)
+        for name in ('post_list', 'follow_posts'):
+            with self.subTest(name=name):
+                url = reverse(f'api:{name}')
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
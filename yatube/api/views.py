@@ -0,0 +1,197 @@
+"""JSON API только для чтения: /api/v1/.
+
+Списки листаются keyset-курсорами ?after= / ?before= (как HTML-ленты
+с KeysetPaginator), ?limit= задает размер страницы, ?fields= -
+набор полей. Страница - один запрос с select_related автора и группы.
+ETag и Last-Modified считаются по тем же тегам кэша, что и у HTML-
+страниц (posts.conditional); лента подписок, у которой тегов нет,
+получает ETag по содержимому.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse
+from django.middleware.http import ConditionalGetMiddleware
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import decorator_from_middleware
+from django.views.decorators.http import require_safe
+
+from posts.conditional import (
+    conditional_page, feed_validators, group_validators, post_validators,
+    profile_validators,
+)
+from posts.counters import stats_for
+from posts.models import Comment, Group, Post, User
+from posts.paginators import (
+    InvalidCursor, KeysetPaginator, pack_cursor, unpack_cursor,
+)
+from posts.timeline import timeline_post_ids
+
+from .serializers import (
+    COMMENT_FIELDS, GROUP_FIELDS, POST_FIELDS, PROFILE_FIELDS, FieldError,
+    select_fields, serialize,
+)
+
+content_etag = decorator_from_middleware(ConditionalGetMiddleware)
+
+
+class Unauthorized(Exception):
+    pass
+
+
+def _json(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def api_view(view):
+    """Только GET/HEAD; словарь из view становится JSON, ошибки - тоже."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return _json(view(request, *args, **kwargs))
+        except FieldError as error:
+            return _json({'error': str(error)}, status=400)
+        except Http404:
+            return _json({'error': 'Не найдено'}, status=404)
+        except Unauthorized:
+            return _json({'error': 'Нужна авторизация'}, status=401)
+    return wrapper
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.PAGINATOR_VALUE))
+    except ValueError:
+        limit = settings.PAGINATOR_VALUE
+    return max(1, min(limit, settings.API_MAX_LIMIT))
+
+
+def _page(request, queryset, fields, keys=('pub_date', 'id')):
+    fields = select_fields(fields, request.GET.get('fields'))
+    paginator = KeysetPaginator(queryset, _limit(request), keys)
+    page_obj = paginator.get_keyset_page(
+        after=request.GET.get('after'), before=request.GET.get('before'))
+    return {
+        'results': [serialize(obj, fields) for obj in page_obj],
+        'next': page_obj.next_cursor,
+        'previous': page_obj.previous_cursor,
+    }
+
+
+def _posts():
+    return Post.objects.select_related('author', 'group')
+
+
+@conditional_page(feed_validators)
+@api_view
+def post_list(request):
+    return _page(request, _posts(), POST_FIELDS)
+
+
+@conditional_page(post_validators)
+@api_view
+def post_detail(request, post_id):
+    post = get_object_or_404(_posts(), pk=post_id)
+    return serialize(
+        post, select_fields(POST_FIELDS, request.GET.get('fields')))
+
+
+@conditional_page(post_validators)
+@api_view
+def comment_list(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return _page(
+        request,
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        COMMENT_FIELDS,
+        keys=('created', 'id'),
+    )
+
+
+@conditional_page(feed_validators)
+@api_view
+def group_list(request):
+    return _page(request, Group.objects.all(), GROUP_FIELDS, keys=('id',))
+
+
+@conditional_page(group_validators)
+@api_view
+def group_detail(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return serialize(
+        group, select_fields(GROUP_FIELDS, request.GET.get('fields')))
+
+
+@conditional_page(group_validators)
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return _page(request, _posts().filter(group=group), POST_FIELDS)
+
+
+@conditional_page(profile_validators)
+@api_view
+def profile_detail(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    author.stats = stats_for(author)
+    return serialize(
+        author, select_fields(PROFILE_FIELDS, request.GET.get('fields')))
+
+
+@conditional_page(profile_validators)
+@api_view
+def profile_posts(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return _page(request, _posts().filter(author=author), POST_FIELDS)
+
+
+def _list_page(ids, after, before, limit):
+    """Страница готового списка id; курсор - id поста на границе."""
+    start, end = 0, limit
+    try:
+        if after:
+            start = ids.index(unpack_cursor(after, 1)[0]) + 1
+            end = start + limit
+        elif before:
+            end = ids.index(unpack_cursor(before, 1)[0])
+            start = max(end - limit, 0)
+    except (InvalidCursor, ValueError):
+        start, end = 0, limit
+    page_ids = ids[start:end]
+    next_cursor = previous_cursor = None
+    if page_ids and end < len(ids):
+        next_cursor = pack_cursor([page_ids[-1]])
+    if page_ids and start > 0:
+        previous_cursor = pack_cursor([page_ids[0]])
+    return page_ids, next_cursor, previous_cursor
+
+
+@content_etag
+@api_view
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        raise Unauthorized
+    fields = select_fields(POST_FIELDS, request.GET.get('fields'))
+    page_ids, next_cursor, previous_cursor = _list_page(
+        timeline_post_ids(request.user),
+        request.GET.get('after'),
+        request.GET.get('before'),
+        _limit(request),
+    )
+    posts = _posts().in_bulk(page_ids)
+    return {
+        'results': [
+            serialize(posts[pk], fields) for pk in page_ids if pk in posts
+        ],
+        'next': next_cursor,
+        'previous': previous_cursor,
+    }
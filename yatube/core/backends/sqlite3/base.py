@@ -0,0 +1,46 @@
+"""SQLite с очередью записи процесса (core.sqlite).
+
+ENGINE 'core.backends.sqlite3' - обычный бэкенд Django, который берет
+блокировку записи на каждую транзакцию и на каждый пишущий запрос вне
+транзакции.
+"""
+from django.db.backends.sqlite3 import base
+
+from core import sqlite
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.holds_write_lock = False
+        self.execute_wrappers.append(sqlite.serialize_statement)
+
+    def _start_transaction_under_autocommit(self):
+        if not sqlite.acquire(self):
+            return super()._start_transaction_under_autocommit()
+        try:
+            # IMMEDIATE берет блокировку записи SQLite сразу: транзакция,
+            # которая сначала читает, не упадет на записи после чужого
+            # коммита.
+            self.cursor().execute('BEGIN IMMEDIATE')
+        except Exception:
+            sqlite.release(self)
+            raise
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            sqlite.release(self)
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            sqlite.release(self)
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            sqlite.release(self)
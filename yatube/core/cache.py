@@ -0,0 +1,351 @@
+"""Двухуровневый кэш: LRU в памяти процесса поверх общего бэкенда.
+
+L1 - OrderedDict на процесс (общий для всех потоков, как у LocMemCache),
+ограниченный числом записей, байтами и TTL. L2 - любой другой алиас из
+CACHES: FileBasedCache локально, memcached или redis в бою. LocMemCache
+в роли L2 общим не является - с ним L1 выключен, и запросы идут прямо
+в L2.
+
+Ключи разложены по BUCKETS корзинам (crc32 ключа), у каждой корзины в
+L2 есть счетчик 'twotier:bucket:<n>'. Запись в L2 увеличивает счетчик
+корзины ключа - один incr. Каждый процесс не реже раза в SYNC_INTERVAL
+секунд читает все счетчики одним get_many и выбрасывает из L1 ключи
+корзин, счетчики которых сдвинули другие процессы; пропавший из L2
+счетчик тоже считается сдвигом.
+
+Значения крупнее COMPRESS_MIN_SIZE байт сжимаются zlib. Целые числа
+хранятся как есть, чтобы incr/decr работали атомарно в L2. У файлового
+кэша incr не атомарен, и при одновременной записи из двух процессов
+сдвиг корзины может потеряться - для боя нужен memcached или redis.
+"""
+import pickle
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+BUCKET_KEY = 'twotier:bucket:{}'
+
+_PICKLED = b'P'
+_COMPRESSED = b'Z'
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class Stats:
+    """Счетчики попаданий и промахов одного уровня."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+class LocalTier:
+    """L1 одного процесса: LRU с TTL и последние счетчики корзин."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.counters = None
+        self.epoch = 0
+        self.synced_at = 0.0
+        self.l1 = Stats()
+        self.l2 = Stats()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, stored = entry
+        if expires <= time.monotonic():
+            self.pop(key)
+            return None
+        self.entries.move_to_end(key)
+        return stored
+
+    def put(self, key, stored, timeout, max_entries, max_bytes):
+        self.pop(key)
+        size = _size(stored)
+        if size > max_bytes:
+            return
+        self.entries[key] = (time.monotonic() + timeout, stored)
+        self.size += size
+        while len(self.entries) > max_entries or self.size > max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= _size(evicted)
+
+    def pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= _size(entry[1])
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+def _size(stored):
+    return len(stored) if isinstance(stored, bytes) else 8
+
+
+def _is_counter(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class TwoTierCache(BaseCache):
+    """Бэкенд кэша с L1 в процессе и общим L2.
+
+    OPTIONS: SHARED - алиас общего кэша; L1 - True или False вместо
+    выбора по бэкенду SHARED; L1_MAX_ENTRIES, L1_MAX_BYTES, L1_TIMEOUT -
+    пределы L1; SYNC_INTERVAL, BUCKETS - инвалидация;
+    COMPRESS_MIN_SIZE, COMPRESS_LEVEL - сжатие.
+    """
+
+    def __init__(self, location, params):
+        options = params.get('OPTIONS', {})
+        super().__init__(params)
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.l1_option = options.get('L1')
+        self.l1_max_entries = options.get('L1_MAX_ENTRIES', 1000)
+        self.l1_max_bytes = options.get('L1_MAX_BYTES', 16 * 1024 * 1024)
+        self.l1_timeout = options.get('L1_TIMEOUT', 30)
+        self.sync_interval = options.get('SYNC_INTERVAL', 1.0)
+        self.buckets = options.get('BUCKETS', 256)
+        self.compress_min_size = options.get('COMPRESS_MIN_SIZE', 1024)
+        self.compress_level = options.get('COMPRESS_LEVEL', 6)
+        with _tiers_lock:
+            self.tier = _tiers.setdefault(location, LocalTier())
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    @property
+    def l1_enabled(self):
+        if self.l1_option is not None:
+            return self.l1_option
+        # Инвалидация через процесс-локальный L2 других процессов
+        # не достигнет.
+        return not isinstance(self.shared, LocMemCache)
+
+    def pack(self, value):
+        if _is_counter(value):
+            return value
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) >= self.compress_min_size:
+            return _COMPRESSED + zlib.compress(data, self.compress_level)
+        return _PICKLED + data
+
+    @staticmethod
+    def unpack(stored):
+        if not isinstance(stored, bytes):
+            return stored
+        if stored[:1] == _COMPRESSED:
+            return pickle.loads(zlib.decompress(stored[1:]))
+        return pickle.loads(stored[1:])
+
+    def l1_timeout_for(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    # Инвалидация
+
+    def bucket(self, full_key):
+        return zlib.crc32(full_key.encode()) % self.buckets
+
+    def sync(self, force=False):
+        """Выбрасывает из L1 ключи корзин, сдвинутых другими процессами."""
+        tier = self.tier
+        now = time.monotonic()
+        if not force and now - tier.synced_at < self.sync_interval:
+            return
+        tier.synced_at = now
+        keys = [BUCKET_KEY.format(n) for n in range(self.buckets)]
+        found = self.shared.get_many(keys)
+        counters = [found.get(key) for key in keys]
+        with tier.lock:
+            previous, tier.counters = tier.counters, counters
+            if previous is None:
+                # Первая сверка: чужие записи до нее не отследить.
+                tier.clear()
+                return
+            changed = {
+                n for n, value in enumerate(counters) if value != previous[n]
+            }
+            if not changed:
+                return
+            tier.epoch += 1
+            for full_key in list(tier.entries):
+                if self.bucket(full_key) in changed:
+                    tier.pop(full_key)
+
+    def broadcast(self, *full_keys):
+        """Сдвигает счетчики корзин ключей для L1 других процессов."""
+        if self.tier.counters is None:
+            # Без первой сверки свой сдвиг не отличить от чужого.
+            self.sync(force=True)
+        for n, count in Counter(map(self.bucket, full_keys)).items():
+            key = BUCKET_KEY.format(n)
+            try:
+                value = self.shared.incr(key, count)
+            except ValueError:
+                self.shared.add(key, 0, None)
+                value = self.shared.incr(key, count)
+            with self.tier.lock:
+                counters = self.tier.counters
+                # Только свой сдвиг - L1 корзины остается в силе; иначе
+                # корзину сбросит ближайшая сверка.
+                if counters is not None and (
+                    (counters[n] or 0) + count == value
+                ):
+                    counters[n] = value
+
+    # API BaseCache
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        if not self.l1_enabled:
+            return self.get_shared(keys, version)
+        self.sync()
+        tier = self.tier
+        found = {}
+        missing = []
+        with tier.lock:
+            for key in keys:
+                full_key = self.make_key(key, version=version)
+                self.validate_key(full_key)
+                stored = tier.get(full_key)
+                if stored is None:
+                    missing.append(key)
+                else:
+                    found[key] = stored
+            tier.l1.hits += len(found)
+            tier.l1.misses += len(missing)
+            epoch = tier.epoch
+        if missing:
+            fetched = self.shared.get_many(missing, version=version)
+            with tier.lock:
+                tier.l2.hits += len(fetched)
+                tier.l2.misses += len(missing) - len(fetched)
+                # Если во время чтения сверка сбросила корзины или другой
+                # поток записал ключи, значение могло устареть, а его
+                # инвалидация уже применена - в L1 не кладем.
+                if tier.epoch == epoch:
+                    for key, stored in fetched.items():
+                        tier.put(
+                            self.make_key(key, version=version), stored,
+                            self.l1_timeout, self.l1_max_entries,
+                            self.l1_max_bytes,
+                        )
+            found.update(fetched)
+        return {key: self.unpack(stored) for key, stored in found.items()}
+
+    def get_shared(self, keys, version):
+        fetched = self.shared.get_many(keys, version=version)
+        with self.tier.lock:
+            self.tier.l2.hits += len(fetched)
+            self.tier.l2.misses += len(keys) - len(fetched)
+        return {key: self.unpack(stored) for key, stored in fetched.items()}
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    def _remember(self, key, stored, timeout, version):
+        if not self.l1_enabled:
+            return
+        with self.tier.lock:
+            self.tier.put(
+                self.make_key(key, version=version), stored,
+                self.l1_timeout_for(timeout), self.l1_max_entries,
+                self.l1_max_bytes,
+            )
+
+    def _forget(self, keys, version):
+        if not self.l1_enabled:
+            return
+        full_keys = [self.make_key(key, version=version) for key in keys]
+        with self.tier.lock:
+            # Чтения L2 других потоков, начатые до записи, не положат
+            # старое значение в L1.
+            self.tier.epoch += 1
+            for full_key in full_keys:
+                self.tier.pop(full_key)
+        self.broadcast(*full_keys)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        stored = self.pack(value)
+        self.shared.set(key, stored, timeout, version=version)
+        self._forget([key], version)
+        self._remember(key, stored, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        stored = self.pack(value)
+        if not self.shared.add(key, stored, timeout, version=version):
+            return False
+        self._forget([key], version)
+        self._remember(key, stored, timeout, version)
+        return True
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        packed = {key: self.pack(value) for key, value in data.items()}
+        failed = self.shared.set_many(packed, timeout, version=version)
+        self._forget(list(packed), version)
+        for key, stored in packed.items():
+            if key not in failed:
+                self._remember(key, stored, timeout, version)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        self._forget([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(keys, version=version)
+        self._forget(keys, version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._forget([key], version)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def clear(self):
+        self.shared.clear()
+        with self.tier.lock:
+            self.tier.clear()
+            self.tier.counters = None
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def stats(self):
+        """Попадания и промахи по уровням и заполненность L1."""
+        tier = self.tier
+        with tier.lock:
+            return {
+                'l1': dict(
+                    tier.l1.as_dict(),
+                    entries=len(tier.entries),
+                    bytes=tier.size,
+                ),
+                'l2': tier.l2.as_dict(),
+            }
@@ -0,0 +1,78 @@
+"""Замер SQL-запросов и рендеринга шаблонов внутри одного запроса."""
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.template.base import Template
+
+_local = threading.local()
+_install_lock = threading.Lock()
+
+
+class Measurement:
+    def __init__(self, parent=None):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        # Внешний замер (например, бенчмарк вокруг middleware метрик).
+        self.parent = parent
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        measurement = getattr(_local, 'measurement', None)
+        if measurement is None or getattr(_local, 'rendering', False):
+            return render(self, context)
+        _local.rendering = True
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            while measurement is not None:
+                measurement.template_time += elapsed
+                measurement = measurement.parent
+            _local.rendering = False
+    wrapper.timed = True
+    return wrapper
+
+
+def install_template_timer():
+    """Оборачивает Template.render один раз на процесс."""
+    with _install_lock:
+        if not getattr(Template.render, 'timed', False):
+            Template.render = _timed_render(Template.render)
+
+
+def _sql_timer(measurement):
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            measurement.queries += 1
+            measurement.sql_time += time.perf_counter() - started
+    return wrapper
+
+
+@contextmanager
+def measure():
+    """Считает запросы, время SQL и время рендеринга шаблонов.
+
+    Вложенные шаблоны (include, extends) входят во время внешнего,
+    время шаблонов вложенного замера - и во внешний замер.
+    """
+    install_template_timer()
+    previous = getattr(_local, 'measurement', None)
+    measurement = Measurement(previous)
+    _local.measurement = measurement
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(_sql_timer(measurement))
+                )
+            yield measurement
+    finally:
+        _local.measurement = previous
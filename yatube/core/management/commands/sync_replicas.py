@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.replicas import copy_sqlite
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную SQLite-базу в реплики из DATABASE_REPLICAS - '
+        'локальная замена репликации.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые N секунд (0 - скопировать один раз).'
+        )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        replicas = [
+            settings.DATABASES[alias] for alias in settings.DATABASE_REPLICAS
+        ]
+        if not replicas:
+            raise CommandError('Реплики не заданы: DATABASE_REPLICAS пуст.')
+        aliases = ['default'] + settings.DATABASE_REPLICAS
+        if any(connections[alias].vendor != 'sqlite' for alias in aliases):
+            raise CommandError(
+                'Только для SQLite: остальные базы реплицируются сами.')
+        while True:
+            for replica in replicas:
+                copy_sqlite(primary['NAME'], replica['NAME'])
+            self.stdout.write(f'Скопировано в реплик: {len(replicas)}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
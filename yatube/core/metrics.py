@@ -0,0 +1,398 @@
+"""Метрики Prometheus: MetricsMiddleware и страница /metrics.
+
+Каждый процесс (воркер gunicorn) копит счетчики и гистограммы в своем
+Registry и не чаще раза в METRICS_FLUSH_INTERVAL секунд записывает их
+в METRICS_DIR/<pid>-<время старта>.json (временный файл и os.replace):
+процесс с повторно выданным pid пишет в новый файл и не затирает
+счетчики прежнего. /metrics складывает файлы всех процессов, а файлы
+завершившихся воркеров переносит в архив METRICS_DIR/archive.json,
+как prometheus_client: счетчики и гистограммы остаются в сумме, число
+файлов не растет, а запросы в работе берутся только у живых.
+
+/metrics открыта адресам METRICS_ALLOWED_IPS и запросам с заголовком
+Authorization: Bearer <METRICS_TOKEN>, остальным - 404.
+
+Время SQL и шаблонов считает core.instrumentation.measure, попадания
+и промахи кэша - TwoTierCache.stats().
+"""
+import atexit
+import fcntl
+import hmac
+import json
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import Http404, HttpResponse
+
+from .instrumentation import measure
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+ARCHIVE = 'archive.json'
+
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Ответы по имени URL, методу и статусу'),
+    'yatube_requests_in_flight': (
+        'gauge', 'Запросы в работе'),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время ответа'),
+    'yatube_sql_queries': (
+        'histogram', 'SQL-запросов на ответ'),
+    'yatube_sql_duration_seconds': (
+        'histogram', 'Время SQL на ответ'),
+    'yatube_template_render_seconds': (
+        'histogram', 'Время рендеринга шаблонов на ответ'),
+    'yatube_cache_requests_total': (
+        'counter', 'Попадания и промахи кэша по уровням'),
+}
+
+
+class Registry:
+    """Метрики одного процесса."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.filename = f'{self.pid}-{time.time_ns()}.json'
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.flushed_at = 0.0
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_gauge(self, name, labels, value):
+        key = (name, labels)
+        with self.lock:
+            self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.setdefault(
+                key, {'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0})
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['counts'][index] += 1
+                    break
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            counters = [
+                [name, list(labels), value]
+                for (name, labels), value in self.counters.items()
+            ]
+            gauges = [
+                [name, list(labels), value]
+                for (name, labels), value in self.gauges.items()
+            ]
+            histograms = [
+                [name, list(labels), dict(histogram)]
+                for (name, labels), histogram in self.histograms.items()
+            ]
+        counters.extend(_cache_counters())
+        return {
+            'pid': self.pid,
+            'counters': counters,
+            'gauges': gauges,
+            'histograms': histograms,
+        }
+
+
+_registry = Registry()
+_registry_lock = threading.Lock()
+
+
+def registry():
+    """Registry процесса; после fork воркер начинает с нуля."""
+    global _registry
+    if _registry.pid != os.getpid():
+        with _registry_lock:
+            if _registry.pid != os.getpid():
+                _registry = Registry()
+    return _registry
+
+
+def _cache_counters():
+    cache = caches['default']
+    if not hasattr(cache, 'stats'):
+        return []
+    rows = []
+    for tier, stats in cache.stats().items():
+        for result in ('hits', 'misses'):
+            rows.append([
+                'yatube_cache_requests_total',
+                [['tier', tier], ['result', result]],
+                stats[result],
+            ])
+    return rows
+
+
+def flush(force=False):
+    """Пишет метрики процесса в его файл в METRICS_DIR."""
+    current = registry()
+    now = time.monotonic()
+    interval = settings.METRICS_FLUSH_INTERVAL
+    if not force and now - current.flushed_at < interval:
+        return
+    current.flushed_at = now
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    _write(os.path.join(settings.METRICS_DIR, current.filename),
+           current.snapshot())
+
+
+def _write(path, data):
+    temporary = f'{path}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as target:
+        json.dump(data, target)
+    os.replace(temporary, path)
+
+
+@atexit.register
+def _flush_at_exit():
+    # Команды manage.py без запросов файлов не оставляют.
+    if registry().counters:
+        flush(force=True)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _key(name, labels):
+    return name, tuple(tuple(pair) for pair in labels)
+
+
+def _read(path):
+    try:
+        with open(path) as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
+
+
+def _add(totals, data, with_gauges):
+    counters, gauges, histograms = totals
+    for name, labels, value in data['counters']:
+        key = _key(name, labels)
+        counters[key] = counters.get(key, 0) + value
+    if with_gauges:
+        for name, labels, value in data['gauges']:
+            key = _key(name, labels)
+            gauges[key] = gauges.get(key, 0) + value
+    for name, labels, histogram in data['histograms']:
+        key = _key(name, labels)
+        total = histograms.setdefault(key, {
+            'counts': [0] * len(histogram['counts']),
+            'sum': 0.0,
+            'count': 0,
+        })
+        for index, count in enumerate(histogram['counts']):
+            total['counts'][index] += count
+        total['sum'] += histogram['sum']
+        total['count'] += histogram['count']
+
+
+def _archived(totals, files):
+    counters, _, histograms = totals
+    return {
+        'files': sorted(files),
+        'counters': [
+            [name, labels, value]
+            for (name, labels), value in counters.items()
+        ],
+        'gauges': [],
+        'histograms': [
+            [name, labels, histogram]
+            for (name, labels), histogram in histograms.items()
+        ],
+    }
+
+
+def _remove(directory, filenames):
+    for filename in filenames:
+        try:
+            os.remove(os.path.join(directory, filename))
+        except FileNotFoundError:
+            pass
+
+
+def _fold_dead(directory):
+    """Переносит файлы завершившихся процессов в архив.
+
+    Возвращает суммы архива и данные живых процессов. Имена перенесенных
+    файлов хранятся в архиве, пока файлы не удалены: сбой между записью
+    архива и удалением не посчитает их дважды.
+    """
+    archive = _read(os.path.join(directory, ARCHIVE)) or {
+        'files': [], 'counters': [], 'gauges': [], 'histograms': []}
+    folded = set(archive['files'])
+    totals = ({}, {}, {})
+    _add(totals, archive, with_gauges=False)
+    alive, dead = [], []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json') or filename == ARCHIVE:
+            continue
+        if filename in folded:
+            continue
+        data = _read(os.path.join(directory, filename))
+        if data is None:
+            continue
+        if _is_alive(data['pid']):
+            alive.append(data)
+        else:
+            _add(totals, data, with_gauges=False)
+            dead.append(filename)
+    if dead:
+        folded.update(dead)
+        _write(os.path.join(directory, ARCHIVE), _archived(totals, folded))
+    if folded:
+        _remove(directory, folded)
+        _write(os.path.join(directory, ARCHIVE), _archived(totals, ()))
+    return totals, alive
+
+
+def collect():
+    """Сумма метрик всех процессов из METRICS_DIR."""
+    flush(force=True)
+    directory = settings.METRICS_DIR
+    with open(os.path.join(directory, 'archive.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        totals, alive = _fold_dead(directory)
+    for data in alive:
+        _add(totals, data, with_gauges=True)
+    return totals
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def _labels(labels, *extra):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(counters, gauges, histograms):
+    """Текстовый формат Prometheus 0.0.4."""
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            buckets = (
+                QUERY_BUCKETS if name == 'yatube_sql_queries'
+                else DURATION_BUCKETS
+            )
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, histogram['counts']):
+                    cumulative += count
+                    lines.append(f'{name}_bucket'
+                                 f'{_labels(labels, ("le", bound))} '
+                                 f'{cumulative}')
+                lines.append(f'{name}_bucket'
+                             f'{_labels(labels, ("le", "+Inf"))} '
+                             f'{histogram["count"]}')
+                lines.append(f'{name}_sum{_labels(labels)} '
+                             f'{_number(histogram["sum"])}')
+                lines.append(f'{name}_count{_labels(labels)} '
+                             f'{histogram["count"]}')
+            continue
+        values = counters if kind == 'counter' else gauges
+        for (metric, labels), value in sorted(values.items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _allowed(request):
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    token = settings.METRICS_TOKEN
+    return bool(token) and hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+
+
+def metrics_view(request):
+    if not _allowed(request):
+        raise Http404
+    return HttpResponse(
+        render(*collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+class MetricsMiddleware:
+    """Считает каждый ответ; стоит первым в MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        current = registry()
+        current.add_gauge('yatube_requests_in_flight', (), 1)
+        started = time.perf_counter()
+        status = 500
+        try:
+            with measure() as measurement:
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            current.add_gauge('yatube_requests_in_flight', (), -1)
+            self.record(
+                current, request, status,
+                time.perf_counter() - started, measurement,
+            )
+            flush()
+
+    def record(self, current, request, status, duration, measurement):
+        match = getattr(request, 'resolver_match', None)
+        view = (('view', match.view_name if match else 'unresolved'),)
+        current.inc(
+            'yatube_requests_total',
+            view + (('method', request.method), ('status', str(status))),
+        )
+        current.observe(
+            'yatube_request_duration_seconds', view, duration,
+            DURATION_BUCKETS)
+        current.observe(
+            'yatube_sql_queries', view, measurement.queries, QUERY_BUCKETS)
+        current.observe(
+            'yatube_sql_duration_seconds', view, measurement.sql_time,
+            DURATION_BUCKETS)
+        current.observe(
+            'yatube_template_render_seconds', view,
+            measurement.template_time, DURATION_BUCKETS)
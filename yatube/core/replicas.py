@@ -0,0 +1,139 @@
+"""Запись в основную базу, чтение - с реплик.
+
+ReplicaRouter пишет всегда в default, а читает с реплики из
+settings.DATABASE_REPLICAS только внутри запроса, который
+ReplicaMiddleware отметил как читающий: GET или HEAD от клиента без
+свежей записи. Реплика выбирается случайно один раз на запрос: страница,
+счетчики и комментарии читаются с одной реплики с одним отставанием.
+Первая запись переключает остаток запроса на default
+и ставит cookie: следующие REPLICA_STICKY_SECONDS секунд этот клиент
+читает с default и видит свои изменения, пока реплики догоняют.
+Команды, код вне запроса и открытые транзакции читают с default.
+
+Страницы, которые кэшируются по поколениям тегов (posts.caching) или
+получают ETag, после недавнего сдвига тегов читают с default
+(primary_reads): иначе отстающая реплика попала бы в кэш под новым
+поколением и отдавалась бы до следующего сдвига.
+
+copy_sqlite - замена репликации для локальных SQLite-файлов (команда
+sync_replicas).
+"""
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'primary_until'
+BACKUP_BUSY_TIMEOUT = 5000
+
+_state = threading.local()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            not getattr(_state, 'replica_reads', False)
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return _state.replica
+
+    def db_for_write(self, model, **hints):
+        _state.replica_reads = False
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии default, объекты из них можно связывать.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def _is_sticky(request):
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaMiddleware:
+    """Включает чтение с реплик на запрос и ставит cookie после записи.
+
+    Стоит первым после SecurityMiddleware, чтобы запись сессии тоже
+    считалась записью.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.replica_reads = (
+            bool(settings.DATABASE_REPLICAS)
+            and request.method in ('GET', 'HEAD')
+            and not _is_sticky(request)
+        )
+        if _state.replica_reads:
+            _state.replica = random.choice(settings.DATABASE_REPLICAS)
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            _state.replica_reads = _state.wrote = False
+            _state.replica = DEFAULT_DB_ALIAS
+        if wrote:
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(time.time() + settings.REPLICA_STICKY_SECONDS),
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+@contextmanager
+def primary_reads():
+    """Чтение внутри блока идет в default."""
+    previous = getattr(_state, 'replica_reads', False)
+    _state.replica_reads = False
+    try:
+        yield
+    finally:
+        _state.replica_reads = previous and not getattr(_state, 'wrote', False)
+
+
+def may_lag(changed):
+    """Могли ли реплики еще не получить изменение из момента changed.
+
+    Отставание реплик считается не больше REPLICA_STICKY_SECONDS - на
+    том же допущении держится cookie после записи.
+    """
+    return (
+        time.time() - changed.timestamp() < settings.REPLICA_STICKY_SECONDS
+    )
+
+
+def copy_sqlite(source, target):
+    """Согласованная копия SQLite-базы через backup API.
+
+    backup пишет прямо в открытую реплику одной транзакцией под
+    блокировками SQLite, поэтому читатели видят либо старый, либо новый
+    снимок, а -wal и -shm реплики остаются согласованными с ней.
+    Подмена файла (os.replace) оставила бы их от старой базы.
+    """
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target)
+    try:
+        target_connection.execute(
+            f'PRAGMA busy_timeout = {BACKUP_BUSY_TIMEOUT}')
+        source_connection.backup(target_connection)
+    finally:
+        target_connection.close()
+        source_connection.close()
@@ -0,0 +1,63 @@
+"""SQLite для небольших боевых узлов.
+
+configure_sqlite (сигнал connection_created) выставляет каждому новому
+соединению PRAGMA из settings.SQLITE_PRAGMAS: WAL, чтобы чтение не
+ждало записи, synchronous=NORMAL (в WAL без риска порчи), mmap,
+кэш страниц и busy_timeout.
+
+SQLite пропускает одного писателя за раз, а транзакция, которая
+сначала читала, при записи после чужого коммита сразу получает
+"database is locked" без ожидания. Бэкенд core.backends.sqlite3 ставит
+записи процесса в очередь на одной блокировке: транзакция берет ее на
+BEGIN IMMEDIATE и отпускает на COMMIT или ROLLBACK, пишущий запрос вне
+транзакции - на время запроса. Так очередь проходят и записи из GET,
+а чтение и рендеринг шаблонов идут без блокировки.
+"""
+import threading
+
+from django.conf import settings
+
+WRITE_STATEMENTS = (
+    'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER',
+)
+
+_write_lock = threading.RLock()
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    cursor = connection.connection.cursor()
+    try:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+
+def acquire(connection):
+    """Блокировка записи на транзакцию; False - очередь выключена."""
+    if not settings.SQLITE_SERIALIZE_WRITES:
+        return False
+    if not connection.holds_write_lock:
+        _write_lock.acquire()
+        connection.holds_write_lock = True
+    return True
+
+
+def release(connection):
+    if connection.holds_write_lock:
+        connection.holds_write_lock = False
+        _write_lock.release()
+
+
+def serialize_statement(execute, sql, params, many, context):
+    """execute_wrapper: пишущий запрос вне транзакции ждет очереди."""
+    if (
+        context['connection'].holds_write_lock
+        or not settings.SQLITE_SERIALIZE_WRITES
+        or not sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS)
+    ):
+        return execute(sql, params, many, context)
+    with _write_lock:
+        return execute(sql, params, many, context)
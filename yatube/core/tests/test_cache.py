@@ -0,0 +1,161 @@
+import itertools
+import threading
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from ..cache import BUCKET_KEY, TwoTierCache
+
+locations = itertools.count()
+
+
+def make_cache(**options):
+    """Кэш с отдельным L1 - как в другом процессе.
+
+    LocMemCache тестов общий для таких "процессов", поэтому L1 включен
+    явно.
+    """
+    options = dict(
+        {'SHARED': 'shared', 'SYNC_INTERVAL': 0, 'L1': True}, **options)
+    return TwoTierCache(f'test-{next(locations)}', {'OPTIONS': options})
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches['shared'].clear()
+
+    def test_second_read_is_served_from_l1(self):
+        """Повторное чтение не ходит в общий кэш."""
+        cache = make_cache()
+        cache.set('key', {'value': 1})
+        other = make_cache(SYNC_INTERVAL=60)
+        self.assertEqual(other.get('key'), {'value': 1})
+        with mock.patch.object(caches['shared'], 'get_many') as shared_get:
+            self.assertEqual(other.get('key'), {'value': 1})
+        shared_get.assert_not_called()
+        self.assertEqual(other.stats()['l1']['hits'], 1)
+        self.assertEqual(other.stats()['l2']['hits'], 1)
+
+    def test_writes_invalidate_other_processes(self):
+        """set, incr и delete в одном процессе сбрасывают L1 других."""
+        writer, reader = make_cache(), make_cache()
+        writer.set('text', 'old')
+        writer.set('counter', 1)
+        self.assertEqual(reader.get_many(['text', 'counter']),
+                         {'text': 'old', 'counter': 1})
+        writer.set('text', 'new')
+        writer.incr('counter')
+        self.assertEqual(reader.get_many(['text', 'counter']),
+                         {'text': 'new', 'counter': 2})
+        writer.delete('text')
+        self.assertIsNone(reader.get('text'))
+
+    def test_sync_interval_bounds_staleness(self):
+        """До SYNC_INTERVAL L1 может отдавать старое значение."""
+        writer = make_cache()
+        reader = make_cache(SYNC_INTERVAL=60)
+        writer.set('key', 'old')
+        self.assertEqual(reader.get('key'), 'old')
+        writer.set('key', 'new')
+        self.assertEqual(reader.get('key'), 'old')
+        reader.sync(force=True)
+        self.assertEqual(reader.get('key'), 'new')
+
+    def test_lost_bucket_counter_drops_bucket(self):
+        """Пропавший из L2 счетчик корзины сбрасывает ее ключи в L1."""
+        writer, reader = make_cache(), make_cache()
+        writer.set('key', 'old')
+        reader.get('key')
+        caches['shared'].set('key', writer.pack('new'))
+        caches['shared'].delete_many(
+            [BUCKET_KEY.format(n) for n in range(reader.buckets)])
+        self.assertEqual(reader.get('key'), 'new')
+
+    def test_write_costs_one_extra_round_trip(self):
+        """Запись - сама операция в L2 и один incr счетчика корзины."""
+        cache = make_cache()
+        cache.set_many({'key': 'value', 'counter': 1})
+        shared = caches['shared']
+        with mock.patch.object(
+            shared, 'incr', wraps=shared.incr
+        ) as incr, mock.patch.object(
+            shared, 'set_many', wraps=shared.set_many
+        ) as set_many:
+            cache.set('key', 'other')
+            cache.incr('counter')
+        self.assertEqual(incr.call_count, 3)
+        set_many.assert_not_called()
+
+    def test_own_writes_keep_l1(self):
+        """Свои записи не сбрасывают L1 при сверке."""
+        cache = make_cache()
+        cache.get('other')
+        cache.set('key', 'value')
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertEqual(cache.stats()['l1']['hits'], 1)
+
+    def test_process_local_shared_disables_l1(self):
+        """С LocMemCache в роли L2 значения в L1 не кладутся."""
+        cache = make_cache(L1=None)
+        cache.set('key', 'value')
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertEqual(cache.stats()['l1']['entries'], 0)
+        self.assertEqual(cache.stats()['l2']['hits'], 1)
+
+    def test_l1_is_bounded_lru(self):
+        """L1 вытесняет самые старые записи сверх L1_MAX_ENTRIES."""
+        cache = make_cache(L1_MAX_ENTRIES=2)
+        cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(cache.stats()['l1']['entries'], 2)
+        cache.get_many(['a', 'b', 'c'])
+        self.assertEqual(cache.stats()['l1']['misses'], 1)
+
+    def test_l1_entries_expire(self):
+        """Записи L1 живут не дольше L1_TIMEOUT."""
+        cache = make_cache(L1_TIMEOUT=10)
+        cache.set('key', 'value')
+        with mock.patch('core.cache.time.monotonic', return_value=10 ** 9):
+            self.assertEqual(cache.get('key'), 'value')
+        self.assertEqual(cache.stats()['l2']['hits'], 1)
+
+    def test_large_values_are_compressed(self):
+        """Крупные значения лежат в общем кэше сжатыми."""
+        cache = make_cache(COMPRESS_MIN_SIZE=100)
+        value = 'пост ' * 1000
+        cache.set('big', value)
+        stored = caches['shared'].get('big')
+        self.assertTrue(stored.startswith(b'Z'))
+        self.assertLess(len(stored), len(value))
+        self.assertEqual(make_cache().get('big'), value)
+
+    def test_write_in_other_thread_blocks_stale_read(self):
+        """Чтение L2, начатое до записи другого потока, не попадает в L1."""
+        cache = make_cache()
+        cache.set('key', 'old')
+        make_cache().set('evict', 1)
+        cache.sync(force=True)
+        shared = caches['shared']
+        real_get_many = shared.get_many
+        fetched, written = threading.Event(), threading.Event()
+
+        def slow_get_many(keys, version=None):
+            result = real_get_many(keys, version=version)
+            if 'key' in result:
+                fetched.set()
+                written.wait(5)
+            return result
+
+        def writer():
+            fetched.wait(5)
+            cache.set('key', 'new')
+            written.set()
+
+        with cache.tier.lock:
+            cache.tier.pop(cache.make_key('key'))
+        thread = threading.Thread(target=writer)
+        thread.start()
+        with mock.patch.object(shared, 'get_many', slow_get_many):
+            self.assertEqual(cache.get('key'), 'old')
+        thread.join()
+        self.assertEqual(cache.get('key'), 'new')
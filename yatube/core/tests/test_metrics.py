@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from .. import metrics
+
+METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(
+    METRICS_DIR=METRICS_DIR,
+    METRICS_FLUSH_INTERVAL=3600,
+    METRICS_ALLOWED_IPS=['127.0.0.1'],
+)
+class MetricsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        for filename in os.listdir(METRICS_DIR):
+            os.remove(os.path.join(METRICS_DIR, filename))
+        metrics._registry = metrics.Registry()
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост')
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_requests_are_counted_by_view(self):
+        """Ответы попадают в счетчик и гистограммы по имени URL."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get('/missing/')
+        text = self.scrape()
+        self.assertIn(
+            'yatube_requests_total{view="posts:index",method="GET",'
+            'status="200"} 2', text)
+        self.assertIn(
+            'yatube_requests_total{view="unresolved",method="GET",'
+            'status="404"} 1', text)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2', text)
+        self.assertIn(
+            'yatube_sql_queries_count{view="posts:index"} 2', text)
+        self.assertIn('yatube_template_render_seconds_sum', text)
+        self.assertIn('yatube_cache_requests_total{tier="l1"', text)
+        # Запрос к /metrics еще в работе.
+        self.assertIn('yatube_requests_in_flight 1', text)
+
+    def write_process(self, filename, pid, requests):
+        with open(os.path.join(METRICS_DIR, filename), 'w') as f:
+            json.dump({
+                'pid': pid,
+                'counters': [[
+                    'yatube_requests_total',
+                    [['view', 'posts:index'], ['method', 'GET'],
+                     ['status', '200']],
+                    requests,
+                ]],
+                'gauges': [['yatube_requests_in_flight', [], 3]],
+                'histograms': [],
+            }, f)
+
+    def test_other_processes_are_summed(self):
+        """Файлы других процессов складываются, gauge - только живых."""
+        self.client.get(reverse('posts:index'))
+        self.write_process('999999999-1.json', 999999999, 5)
+        text = self.scrape()
+        self.assertIn(
+            'yatube_requests_total{view="posts:index",method="GET",'
+            'status="200"} 6', text)
+        self.assertIn('yatube_requests_in_flight 1', text)
+
+    def test_dead_processes_are_archived(self):
+        """Файлы завершившихся процессов уходят в архив, сумма растет."""
+        self.write_process('999999999-1.json', 999999999, 5)
+        self.scrape()
+        self.assertEqual(
+            sorted(name for name in os.listdir(METRICS_DIR)
+                   if name.startswith('999999999')), [])
+        # Тот же pid у нового процесса - новый файл, старое не теряется.
+        self.write_process('999999999-2.json', 999999999, 2)
+        text = self.scrape()
+        self.assertIn(
+            'yatube_requests_total{view="posts:index",method="GET",'
+            'status="200"} 7', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_are_hidden_from_other_addresses(self):
+        """/metrics недоступна с адресов не из METRICS_ALLOWED_IPS."""
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='secret')
+    def test_metrics_require_token_when_no_address_is_allowed(self):
+        """Без адреса в списке /metrics отдается только по токену."""
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(
+            url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        self.assertEqual(self.client.get(
+            url, HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+    def test_label_values_are_escaped(self):
+        """Кавычки и переводы строк в значениях меток экранируются."""
+        self.assertEqual(
+            metrics._labels((('view', 'a"b\nc\\'),)),
+            '{view="a\\"b\\nc\\\\"}')
@@ -0,0 +1,123 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..replicas import (
+    STICKY_COOKIE, ReplicaMiddleware, ReplicaRouter, copy_sqlite,
+    primary_reads,
+)
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def serve(self, request, write=False):
+        """Базы чтения до и после (возможной) записи и ответ."""
+        reads = []
+
+        def view(request):
+            reads.append(self.router.db_for_read(User))
+            if write:
+                self.router.db_for_write(User)
+            reads.append(self.router.db_for_read(User))
+            return HttpResponse()
+
+        response = ReplicaMiddleware(view)(request)
+        return reads, response
+
+    def test_reads_outside_requests_use_primary(self):
+        """Вне запроса (команды, сигналы) чтение идет в default."""
+        self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertEqual(self.router.db_for_write(User), 'default')
+
+    def test_get_reads_from_replica(self):
+        """GET читает с реплики и не ставит cookie без записи."""
+        reads, response = self.serve(self.factory.get('/'))
+        self.assertEqual(reads, ['replica', 'replica'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'other'])
+    def test_request_reads_from_one_replica(self):
+        """Все чтения запроса идут с одной реплики."""
+        chosen = set()
+        for _ in range(20):
+            reads, _ = self.serve(self.factory.get('/'))
+            self.assertEqual(len(set(reads)), 1)
+            chosen.update(reads)
+        self.assertEqual(chosen, {'replica', 'other'})
+
+    def test_write_sticks_to_primary(self):
+        """После записи запрос и следующие запросы клиента читают default."""
+        reads, response = self.serve(self.factory.get('/'), write=True)
+        self.assertEqual(reads, ['replica', 'default'])
+        cookie = response.cookies[STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = cookie.value
+        self.assertEqual(self.serve(request)[0], ['default', 'default'])
+        request.COOKIES[STICKY_COOKIE] = str(time.time() - 1)
+        self.assertEqual(self.serve(request)[0], ['replica', 'replica'])
+
+    def test_unsafe_methods_use_primary(self):
+        """POST читает с default."""
+        reads, _ = self.serve(self.factory.post('/'))
+        self.assertEqual(reads, ['default', 'default'])
+
+    def test_primary_reads_block(self):
+        """primary_reads переключает чтение в default только внутри блока."""
+        reads = []
+
+        def view(request):
+            with primary_reads():
+                reads.append(self.router.db_for_read(User))
+            reads.append(self.router.db_for_read(User))
+            return HttpResponse()
+
+        ReplicaMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(reads, ['default', 'replica'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_is_primary(self):
+        """Без реплик роутер ничего не меняет."""
+        reads, _ = self.serve(self.factory.get('/'))
+        self.assertEqual(reads, ['default', 'default'])
+
+
+class CopySqliteTests(SimpleTestCase):
+    def test_copy_updates_open_wal_replica(self):
+        """Реплика в WAL с открытым читателем получает новый снимок."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        primary = os.path.join(directory, 'primary.sqlite3')
+        replica = os.path.join(directory, 'replica.sqlite3')
+        with sqlite3.connect(primary) as connection:
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('CREATE TABLE post (text TEXT)')
+            connection.execute("INSERT INTO post VALUES ('Пост')")
+        connection.close()
+        copy_sqlite(primary, replica)
+        reader = sqlite3.connect(replica)
+        self.addCleanup(reader.close)
+        reader.execute('PRAGMA journal_mode = WAL')
+        self.assertEqual(
+            reader.execute('SELECT text FROM post').fetchall(), [('Пост',)])
+        with sqlite3.connect(primary) as connection:
+            connection.execute("INSERT INTO post VALUES ('Еще пост')")
+        connection.close()
+        copy_sqlite(primary, replica)
+        self.assertEqual(
+            reader.execute('SELECT count(*) FROM post').fetchone(), (2,))
+        self.assertEqual(
+            reader.execute('PRAGMA integrity_check').fetchone(), ('ok',))
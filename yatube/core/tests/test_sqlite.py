@@ -0,0 +1,106 @@
+import threading
+import time
+import unittest
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from posts import benchmark, hammer_sqlite
+
+from .. import sqlite
+
+User = get_user_model()
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'PRAGMA SQLite')
+class PragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connection_gets_pragmas(self):
+        """Новое соединение получает PRAGMA из SQLITE_PRAGMAS."""
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -20000)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'очередь для SQLite')
+class SerializedWriteTests(TransactionTestCase):
+    def in_thread(self, target):
+        def run():
+            try:
+                target()
+            finally:
+                connection.close()
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def lock_is_free(self):
+        """Блокировку записи может взять другой поток."""
+        result = []
+
+        def probe():
+            result.append(sqlite._write_lock.acquire(blocking=False))
+            if result[0]:
+                sqlite._write_lock.release()
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+        return result[0]
+
+    def test_transaction_queues_other_writes_until_commit(self):
+        """Запись ждет коммита чужой транзакции, а не падает."""
+        inside, proceed = threading.Event(), threading.Event()
+        done = []
+
+        def transaction_writer():
+            with transaction.atomic():
+                User.objects.create(username='first')
+                inside.set()
+                proceed.wait(5)
+
+        def plain_writer():
+            User.objects.create(username='second')
+            done.append(time.monotonic())
+
+        first = self.in_thread(transaction_writer)
+        inside.wait(5)
+        second = self.in_thread(plain_writer)
+        time.sleep(0.1)
+        self.assertEqual(done, [])
+        proceed.set()
+        first.join()
+        second.join()
+        self.assertEqual(len(done), 1)
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_lock_is_held_only_while_writing(self):
+        """Блокировка свободна вне транзакции, после коммита и отката."""
+        User.objects.create(username='author')
+        self.assertTrue(self.lock_is_free())
+        with transaction.atomic():
+            User.objects.create(username='reader')
+            self.assertFalse(self.lock_is_free())
+        self.assertTrue(self.lock_is_free())
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                User.objects.create(username='other')
+                raise ValueError
+        self.assertTrue(self.lock_is_free())
+        self.assertFalse(connection.holds_write_lock)
+
+
+class HammerTests(TransactionTestCase):
+    def test_hammer_reports_metrics(self):
+        """Замер записи из потоков возвращает все метрики."""
+        benchmark.seed(users=3, groups=1, posts=5, comments=5, follows=1)
+        results = hammer_sqlite.hammer(threads=2, seconds=0.2)
+        self.assertEqual(
+            set(results),
+            {'writes_s', 'p50_ms', 'p99_ms', 'max_ms', 'errors'},
+        )
+        self.assertGreater(results['writes_s'], 0)
@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from . import search
 from .models import Comment, Follow, Group, Post
 
 
@@ -9,6 +11,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = ('-пусто-')
 
+    def get_search_results(self, request, queryset, search_term):
+        # search_fields только включает поле поиска, ищет индекс posts.search.
+        if not search_term:
+            return queryset, False
+        return queryset.filter(pk__in=search.matching_ids(search_term)), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
@@ -0,0 +1,169 @@
+"""Нагрузочный прогон страниц posts через тестовый клиент Django.
+
+Для каждой страницы записываются число запросов, время SQL, время
+рендеринга шаблонов и перцентили полного времени ответа. Результаты
+сравниваются с сохраненным baseline. Граф подписок замеряет
+posts.benchmark_graph, параллельную запись - posts.hammer_sqlite.
+"""
+import math
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from core.instrumentation import measure
+from . import counters, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+METRICS = ('queries', 'sql_ms', 'template_ms', 'p50_ms', 'p90_ms', 'p99_ms')
+
+
+def seed(users=50, groups=5, posts=2000, comments=5000, follows=10):
+    """Заполняет базу реалистичным набором данных через bulk_create."""
+    rnd = random.Random(0)
+    User.objects.bulk_create(
+        User(username=f'bench{i}', first_name=f'Автор {i}')
+        for i in range(users)
+    )
+    user_ids = list(User.objects.values_list('id', flat=True))
+    Group.objects.bulk_create(
+        Group(title=f'Группа {i}', slug=f'bench-{i}', description='-')
+        for i in range(groups)
+    )
+    group_ids = list(Group.objects.values_list('id', flat=True))
+    Post.objects.bulk_create(
+        (
+            Post(
+                author_id=rnd.choice(user_ids),
+                group_id=rnd.choice(group_ids + [None]),
+                text=f'Пост {i} ' * 10,
+            )
+            for i in range(posts)
+        ),
+        batch_size=500,
+    )
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    Comment.objects.bulk_create(
+        (
+            Comment(
+                post_id=rnd.choice(post_ids),
+                author_id=rnd.choice(user_ids),
+                text=f'Комментарий {i}',
+            )
+            for i in range(comments)
+        ),
+        batch_size=500,
+    )
+    Follow.objects.bulk_create(
+        (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in rnd.sample(user_ids, min(follows, users))
+            if author_id != user_id
+        ),
+        batch_size=500,
+    )
+    counters.reconcile_users(user_ids)
+    counters.reconcile_posts(post_ids)
+    for user_id in user_ids:
+        timeline.rebuild(user_id)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[index]
+
+
+def scenarios(reader, author, post, group):
+    """Тройки (имя, запрос клиента, подготовка вне замера)."""
+    def unfollow():
+        Follow.objects.filter(user=reader, author=author).delete()
+
+    return (
+        ('index', lambda client: client.get(reverse('posts:index')), None),
+        ('group_list', lambda client: client.get(
+            reverse('posts:group_list', args=[group.slug])), None),
+        ('profile', lambda client: client.get(
+            reverse('posts:profile', args=[author.username])), None),
+        ('post_detail', lambda client: client.get(
+            reverse('posts:post_detail', args=[post.id])), None),
+        ('follow_index', lambda client: client.get(
+            reverse('posts:follow_index')), None),
+        ('add_comment', lambda client: client.post(
+            reverse('posts:add_comment', args=[post.id]),
+            {'text': 'Комментарий'}), None),
+        ('post_create', lambda client: client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}), None),
+        ('profile_follow', lambda client: client.get(
+            reverse('posts:profile_follow', args=[author.username])),
+         unfollow),
+    )
+
+
+def run(iterations=30, warmup=3):
+    """Прогоняет все страницы и возвращает {имя: метрики}."""
+    reader = User.objects.order_by('id').first()
+    author = User.objects.exclude(pk=reader.pk).order_by('-id').first()
+    post = Post.objects.order_by('-comments_count').first()
+    group = Group.objects.order_by('id').first()
+    client = Client()
+    client.force_login(reader)
+    results = {}
+    for name, request, prepare in scenarios(reader, author, post, group):
+        cache.clear()
+        walls, samples = [], []
+        for iteration in range(warmup + iterations):
+            if prepare is not None:
+                prepare()
+            if iteration < warmup:
+                request(client)
+                continue
+            started = time.perf_counter()
+            with measure() as measurement:
+                request(client)
+            walls.append((time.perf_counter() - started) * 1000)
+            samples.append(measurement)
+        results[name] = {
+            'queries': max(sample.queries for sample in samples),
+            'sql_ms': percentile(
+                [sample.sql_time * 1000 for sample in samples], 0.5),
+            'template_ms': percentile(
+                [sample.template_time * 1000 for sample in samples], 0.5),
+            'p50_ms': percentile(walls, 0.5),
+            'p90_ms': percentile(walls, 0.9),
+            'p99_ms': percentile(walls, 0.99),
+        }
+    return results
+
+
+def compare(baseline, results, tolerance=0.25, query_tolerance=0,
+            slack_ms=1.0):
+    """Список регрессий относительно baseline.
+
+    Время может вырасти не больше чем в (1 + tolerance) раз плюс
+    slack_ms на шум, число запросов - не больше чем на query_tolerance.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if metrics['queries'] > expected['queries'] + query_tolerance:
+            regressions.append(
+                f'{name}: запросов {metrics["queries"]}, '
+                f'было {expected["queries"]}'
+            )
+        for metric in METRICS[1:]:
+            limit = expected[metric] * (1 + tolerance) + slack_ms
+            if metrics[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {metrics[metric]:.2f}, '
+                    f'было {expected[metric]:.2f}'
+                )
+    return regressions
@@ -0,0 +1,55 @@
+"""Замер графа подписок (posts.graph) для команды benchmark_graph.
+
+Граф строится на синтетических ребрах без базы: сборка, память и
+время запросов к нему.
+"""
+import random
+import time
+
+from .graph import FollowGraph
+
+
+def follow_pairs(edges, users, rnd):
+    """Случайные подписки; авторы с малыми id популярнее (log-uniform)."""
+    pairs = set()
+    while len(pairs) < edges:
+        user_id = rnd.randint(1, users)
+        author_id = int(users ** rnd.random())
+        if author_id != user_id:
+            pairs.add((user_id, author_id))
+    return pairs
+
+
+def graph_run(edges=1000000, users=100000, checks=10000):
+    """Время сборки графа, память и время запросов к нему."""
+    rnd = random.Random(0)
+    pairs = follow_pairs(edges, users, rnd)
+    started = time.perf_counter()
+    graph = FollowGraph(pairs)
+    build_s = time.perf_counter() - started
+    probes = [
+        (rnd.randint(1, users), rnd.randint(1, users)) for _ in range(checks)
+    ]
+
+    def per_call(function, arguments):
+        started = time.perf_counter()
+        for argument in arguments:
+            function(*argument)
+        return (time.perf_counter() - started) / len(arguments)
+
+    return {
+        'edges': len(pairs),
+        'build_s': build_s,
+        'memory_mb': graph.nbytes() / 2 ** 20,
+        'follows_us': per_call(graph.follows, probes) * 10 ** 6,
+        'mutual_us': per_call(graph.is_mutual, probes) * 10 ** 6,
+        'degree_us': per_call(
+            graph.followers_count, [probe[:1] for probe in probes]
+        ) * 10 ** 6,
+        'suggestions_ms': per_call(
+            graph.suggestions, [probe[:1] for probe in probes[:1000]]
+        ) * 1000,
+        'apply_us': per_call(
+            graph.apply, [probe + (True,) for probe in probes]
+        ) * 10 ** 6,
+    }
@@ -0,0 +1,181 @@
+"""Поколения кэша для лент и страниц постов.
+
+Каждая зависимость страницы - тег: 'feed' (общая лента), 'trending'
+(рейтинг), 'group:<slug>', 'author:<username>', 'post:<id>'. У тега
+есть счетчик поколения в кэше; запись Post, Group или Comment (и
+пересчет рейтинга) увеличивает счетчики своих тегов, и ключи,
+собранные из старых поколений, больше не совпадают. Поэтому кэш
+можно держать долго и не отдавать устаревшее.
+
+Теми же поколениями проверяются целые ответы анонимам
+(cache_anonymous_page): запись хранит поколения, с которыми страница
+была собрана, и отдается, только пока они не сдвинулись. Вместе с
+поколением запоминается время сдвига - из него строится Last-Modified.
+"""
+import datetime
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+FEED = 'feed'
+TRENDING = 'trending'
+
+
+def group_tag(slug):
+    return f'group:{slug}'
+
+
+def author_tag(username):
+    return f'author:{username}'
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def post_tags(post, *group_slugs):
+    """Теги всех страниц, на которых виден пост."""
+    tags = [FEED, author_tag(post.author.username), post_tag(post.pk)]
+    if post.group_id is not None:
+        tags.append(group_tag(post.group.slug))
+    tags.extend(group_tag(slug) for slug in group_slugs)
+    return tags
+
+
+def _key(tag, prefix='generation'):
+    # В slug и username бывают символы, недопустимые в ключах memcached.
+    return f'{prefix}:' + hashlib.md5(tag.encode()).hexdigest()
+
+
+def _initial():
+    # Пропавший из кэша счетчик начинается с текущего времени в мс,
+    # поэтому он не вернется к уже выданному значению.
+    return int(time.time() * 1000)
+
+
+def get_generations(tags):
+    """Словарь {тег: поколение}; отсутствующие счетчики создаются."""
+    keys = {_key(tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, _initial(), None)
+        found[key] = cache.get(key)
+    return {keys[key]: value for key, value in found.items()}
+
+
+def bump(*tags):
+    """Сдвигает поколения тегов, делая зависимые записи устаревшими."""
+    tags = set(tags)
+    for tag in tags:
+        try:
+            cache.incr(_key(tag))
+        except ValueError:
+            cache.add(_key(tag), _initial(), None)
+    cache.set_many({_key(tag, 'changed'): time.time() for tag in tags}, None)
+
+
+def changed_at(tags):
+    """Время последнего сдвига любого из тегов (aware datetime).
+
+    Пропавшее время считается текущим: лучше отдать страницу целиком,
+    чем ответить 304 на устаревшую.
+    """
+    keys = [_key(tag, 'changed') for tag in tags]
+    found = cache.get_many(keys)
+    for key in set(keys) - found.keys():
+        cache.add(key, time.time(), None)
+        found[key] = cache.get(key)
+    return datetime.datetime.fromtimestamp(
+        max(found.values()), tz=datetime.timezone.utc
+    )
+
+
+def page_token(request, page_obj):
+    """Часть ключа, различающая страницы одной ленты."""
+    if getattr(page_obj, 'is_keyset', False):
+        return 'after={}&before={}'.format(
+            request.GET.get('after', ''), request.GET.get('before', '')
+        )
+    return f'page={page_obj.number}'
+
+
+def add_cache_tags(request, *tags):
+    """Отмечает, от каких тегов зависит ответ; возвращает их поколения."""
+    generations = get_generations(tags)
+    if not hasattr(request, 'cache_generations'):
+        request.cache_generations = {}
+    request.cache_generations.update(generations)
+    return generations
+
+
+def versioned_key(generations, *parts):
+    """Ключ, который меняется при сдвиге поколения любого из тегов."""
+    versions = ','.join(
+        f'{tag}={generations[tag]}' for tag in sorted(generations)
+    )
+    return '|'.join((versions,) + tuple(str(part) for part in parts))
+
+
+def feed_cache(request, page_obj, *tags):
+    """Контекст для {% cache feed_cache.timeout ... feed_cache.key %}."""
+    generations = add_cache_tags(request, *tags)
+    return {
+        'timeout': settings.FEED_CACHE_TIMEOUT,
+        'key': versioned_key(generations, page_token(request, page_obj)),
+    }
+
+
+def _page_key(request):
+    url = request.build_absolute_uri()
+    return 'anonymous_page:' + hashlib.md5(url.encode()).hexdigest()
+
+
+def _is_cacheable_request(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and not request.user.is_authenticated
+    )
+
+
+def _is_cacheable_response(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+        and getattr(request, 'cache_generations', None)
+    )
+
+
+def cache_anonymous_page(view):
+    """Кэширует целые ответы view для анонимных GET-запросов.
+
+    Ключ - полный URL с query string. View отмечает зависимости через
+    add_cache_tags (feed_cache делает это сам); ответ без тегов, с
+    сессией, cookie или CSRF-токеном не кэшируется.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _is_cacheable_request(request):
+            return view(request, *args, **kwargs)
+        key = _page_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            generations, response = entry
+            if get_generations(generations) == generations:
+                return response
+        response = view(request, *args, **kwargs)
+        if _is_cacheable_response(request, response):
+            patch_vary_headers(response, ('Cookie',))
+            cache.set(
+                key,
+                (request.cache_generations, response),
+                settings.PAGE_CACHE_TIMEOUT,
+            )
+        return response
+    return wrapper
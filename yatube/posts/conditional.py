@@ -0,0 +1,127 @@
+"""Условные GET (ETag / Last-Modified) для страниц posts.
+
+Валидаторы считаются до вызова view и без рендеринга шаблонов. ETag -
+хэш поколений тегов страницы (posts.caching), полного URL с номером
+страницы или курсором и пользователя; Last-Modified - время последнего
+сдвига тех же тегов. Так 304 учитывает и удаления, которые не видны
+по max(modified). Для поста к ним добавляются Post.modified и время
+последнего комментария.
+
+Если теги страницы сдвинулись недавно, view читает с основной базы
+(core.replicas.primary_reads): ETag и кэш страницы уже несут новое
+поколение, и данные к нему не должны прийти с отстающей реплики.
+"""
+import hashlib
+from contextlib import ExitStack
+from functools import wraps
+
+from django.db.models import OuterRef, Subquery
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from core import replicas
+
+from . import caching, graph
+from .models import Comment, Post
+
+
+def _viewer_tags(request):
+    # Кнопки подписки в лентах зависят от подписок зрителя, а подписка
+    # сдвигает его тег автора (signals.bump_follow_tags).
+    if request.user.is_authenticated:
+        return [caching.author_tag(request.user.username)]
+    return []
+
+
+def feed_validators(request):
+    return [caching.FEED] + _viewer_tags(request), None
+
+
+def trending_validators(request):
+    return [caching.FEED, caching.TRENDING] + _viewer_tags(request), None
+
+
+def group_validators(request, slug):
+    return [caching.group_tag(slug)] + _viewer_tags(request), None
+
+
+def profile_validators(request, username):
+    tags = [caching.author_tag(username)]
+    if request.user.is_authenticated:
+        # «Кого почитать» зависит от подписок зрителя и от графа.
+        tags += _viewer_tags(request) + [graph.GRAPH_TAG]
+    return tags, None
+
+
+def post_validators(request, post_id):
+    last_comment = Comment.objects.filter(post=OuterRef('pk')).order_by(
+        '-created', '-id'
+    ).values('created')[:1]
+    rows = Post.objects.filter(pk=post_id).order_by().annotate(
+        last_comment=Subquery(last_comment)
+    ).values('modified', 'author__username', 'group__slug', 'last_comment')
+    row = next(iter(rows), None)
+    if row is None:
+        return None, None
+    tags = [
+        caching.post_tag(post_id),
+        caching.author_tag(row['author__username']),
+    ]
+    if row['group__slug'] is not None:
+        tags.append(caching.group_tag(row['group__slug']))
+    modified = max(filter(None, (row['modified'], row['last_comment'])))
+    return tags, modified
+
+
+def _changed(request, tags):
+    if not hasattr(request, 'page_changed'):
+        request.page_changed = caching.changed_at(tags)
+    return request.page_changed
+
+
+def _primary_if_fresh(view, get):
+    """Читает view с default, если теги страницы сдвинулись недавно."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        tags, _ = get(request, args, kwargs)
+        with ExitStack() as stack:
+            if tags is not None and replicas.may_lag(_changed(request, tags)):
+                stack.enter_context(replicas.primary_reads())
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def conditional_page(validators):
+    """Отвечает 304 на If-None-Match / If-Modified-Since.
+
+    validators(request, *args, **kwargs) возвращает (теги, время
+    изменения из базы или None); теги None - валидаторов нет, и view
+    отвечает сама (например, 404).
+    """
+    def get(request, args, kwargs):
+        if not hasattr(request, 'page_validators'):
+            request.page_validators = validators(request, *args, **kwargs)
+        return request.page_validators
+
+    def etag(request, *args, **kwargs):
+        tags, _ = get(request, args, kwargs)
+        if tags is None:
+            return None
+        key = caching.versioned_key(
+            caching.get_generations(tags),
+            request.get_full_path(),
+            request.user.pk,
+        )
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        tags, modified = get(request, args, kwargs)
+        if tags is None:
+            return None
+        changed = _changed(request, tags)
+        return changed if modified is None else max(changed, modified)
+
+    def decorator(view):
+        return vary_on_cookie(
+            condition(etag, last_modified)(_primary_if_fresh(view, get)))
+    return decorator
@@ -0,0 +1,125 @@
+"""Денормализованные счетчики постов, комментариев и подписок.
+
+Сигналы меняют их атомарно через F-выражения, а reconcile_users и
+reconcile_posts пересчитывают их по таблицам, если счетчики разошлись.
+Вместе с Post.comments_count хранится Post.last_commented - время
+последнего комментария, чтобы ленты не считали их запросом на пост.
+"""
+from django.db.models import (
+    Case, Count, F, Max, OuterRef, Subquery, Value, When,
+)
+
+from .models import Comment, Follow, Post, UserStats
+
+
+def _actual_user_counts(user_ids):
+    counts = {
+        user_id: {
+            'posts_count': 0, 'followers_count': 0, 'following_count': 0,
+        }
+        for user_id in user_ids
+    }
+    sources = (
+        ('posts_count', Post.objects, 'author'),
+        ('followers_count', Follow.objects, 'author'),
+        ('following_count', Follow.objects, 'user'),
+    )
+    for name, manager, column in sources:
+        rows = manager.filter(**{f'{column}__in': user_ids}).order_by(
+        ).values(column).annotate(total=Count('id')).values_list(
+            column, 'total'
+        )
+        for user_id, total in rows:
+            counts[user_id][name] = total
+    return counts
+
+
+def stats_for(user):
+    """Счетчики пользователя; недостающая строка считается с нуля."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        defaults = _actual_user_counts([user.id])[user.id]
+        stats, _ = UserStats.objects.get_or_create(
+            user_id=user.id, defaults=defaults
+        )
+        return stats
+
+
+def change_user_counter(user_id, name, delta):
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{name: F(name) + delta}
+    )
+    if not updated and delta > 0:
+        UserStats.objects.get_or_create(
+            user_id=user_id,
+            defaults=_actual_user_counts([user_id])[user_id],
+        )
+
+
+def comment_added(post_id, created):
+    # Импортированный комментарий бывает старше последнего.
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + 1,
+        last_commented=Case(
+            When(last_commented__gte=created, then=F('last_commented')),
+            default=Value(created),
+        ),
+    )
+
+
+def comment_removed(post_id):
+    latest = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by('-created').values('created')[:1]
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') - 1,
+        last_commented=Subquery(latest),
+    )
+
+
+def reconcile_users(user_ids):
+    """Чинит счетчики пользователей; возвращает число исправленных."""
+    actual = _actual_user_counts(user_ids)
+    existing = UserStats.objects.in_bulk(user_ids)
+    fixed = []
+    for user_id, counts in actual.items():
+        stats = existing.get(user_id)
+        if stats is None:
+            stats = UserStats(user_id=user_id)
+        elif all(getattr(stats, k) == v for k, v in counts.items()):
+            continue
+        for name, value in counts.items():
+            setattr(stats, name, value)
+        fixed.append(stats)
+    UserStats.objects.bulk_create(
+        [stats for stats in fixed if stats.user_id not in existing]
+    )
+    UserStats.objects.bulk_update(
+        [stats for stats in fixed if stats.user_id in existing],
+        ('posts_count', 'followers_count', 'following_count'),
+    )
+    return len(fixed)
+
+
+def reconcile_posts(post_ids):
+    """Чинит comments_count и last_commented; возвращает число починенных."""
+    actual = {
+        post_id: (total, latest)
+        for post_id, total, latest in Comment.objects.filter(
+            post_id__in=post_ids
+        ).order_by().values('post').annotate(
+            total=Count('id'), latest=Max('created')
+        ).values_list('post', 'total', 'latest')
+    }
+    fixed = []
+    posts = Post.objects.filter(pk__in=post_ids).only(
+        'comments_count', 'last_commented')
+    for post in posts:
+        total, latest = actual.get(post.pk, (0, None))
+        if (post.comments_count, post.last_commented) != (total, latest):
+            post.comments_count = total
+            post.last_commented = latest
+            fixed.append(post)
+    Post.objects.bulk_update(fixed, ('comments_count', 'last_commented'))
+    return len(fixed)
@@ -0,0 +1,86 @@
+"""Потоковая выгрузка постов и комментариев пользователя.
+
+Записи читаются через .values().iterator(chunk_size=EXPORT_CHUNK_SIZE):
+без кэша QuerySet и без моделей, на PostgreSQL - серверным курсором,
+поэтому память не растет с числом постов. Поля совпадают с форматом
+import_content (плюс image и image_url), так что выгрузку можно
+загрузить обратно.
+"""
+import csv
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Post
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+CSV_FIELDS = (
+    'type', 'id', 'post', 'author', 'group', 'text', 'pub_date', 'created',
+    'image', 'image_url',
+)
+
+
+def records(user):
+    """Посты пользователя, затем его комментарии - по одному словарю."""
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    posts = Post.objects.filter(author=user).order_by('pk').values(
+        'id', 'group__slug', 'text', 'pub_date', 'image'
+    )
+    for row in posts.iterator(chunk_size=chunk_size):
+        image = row['image']
+        yield {
+            'type': 'post',
+            'id': row['id'],
+            'author': user.username,
+            'group': row['group__slug'],
+            'text': row['text'],
+            'pub_date': row['pub_date'],
+            'image': image,
+            'image_url': settings.MEDIA_URL + image if image else None,
+        }
+    comments = Comment.objects.filter(author=user).order_by('pk').values(
+        'id', 'post_id', 'text', 'created'
+    )
+    for row in comments.iterator(chunk_size=chunk_size):
+        yield {
+            'type': 'comment',
+            'id': row['id'],
+            'post': row['post_id'],
+            'author': user.username,
+            'text': row['text'],
+            'created': row['created'],
+        }
+
+
+class _Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for row in rows:
+        yield writer.writerow([
+            '' if row.get(field) is None else row[field]
+            for field in CSV_FIELDS
+        ])
+
+
+def lines(user, export_format):
+    """Строки выгрузки в формате ndjson или csv."""
+    if export_format == 'csv':
+        return csv_lines(records(user))
+    return ndjson_lines(records(user))
@@ -0,0 +1,156 @@
+"""RSS и Atom для общей ленты, групп и авторов.
+
+Ленты - последние FEED_ITEMS постов без пагинатора и COUNT. Ответ
+кэшируется целиком, как страницы для анонимов, по тем же тегам, что
+и HTML-страница ленты, и отвечает 304 на условные GET (posts.caching,
+posts.conditional).
+"""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from . import caching
+from .conditional import (
+    conditional_page, feed_validators, group_validators, profile_validators,
+)
+from .models import Group, Post, User
+
+
+class PostsFeed(Feed):
+    """Общая лента."""
+
+    title = 'Yatube: последние записи'
+    description = 'Новые посты всех авторов'
+
+    def link(self):
+        """Ссылка на HTML-страницу ленты."""
+        return reverse('posts:index')
+
+    def subtitle(self, obj):
+        """Подзаголовок Atom - то же описание."""
+        return self._get_dynamic_attr('description', obj)
+
+    def items(self):
+        """Последние FEED_ITEMS постов."""
+        return Post.objects.select_related('author', 'group').order_by(
+            '-pub_date', '-id')[:settings.FEED_ITEMS]
+
+    def item_link(self, item):
+        """Страница поста."""
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_title(self, item):
+        """Первые восемь слов текста."""
+        return Truncator(item.text).words(8)
+
+    def item_description(self, item):
+        """Полный текст поста."""
+        return item.text
+
+    def item_pubdate(self, item):
+        """Дата публикации."""
+        return item.pub_date
+
+    def item_updateddate(self, item):
+        """Время последнего изменения."""
+        return item.modified
+
+    def item_author_name(self, item):
+        """Полное имя автора или username."""
+        return item.author.get_full_name() or item.author.username
+
+    def item_author_link(self, item):
+        """Профиль автора."""
+        return reverse('posts:profile', args=[item.author.username])
+
+    def item_categories(self, item):
+        """Название группы поста, если она есть."""
+        return [item.group.title] if item.group else []
+
+
+class GroupFeed(PostsFeed):
+    """Лента группы."""
+
+    def get_object(self, request, slug):
+        """Группа по slug из URL."""
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        """Заголовок с названием группы."""
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        """Описание группы."""
+        return obj.description
+
+    def link(self, obj):
+        """Страница группы."""
+        return reverse('posts:group_list', args=[obj.slug])
+
+    def items(self, obj):
+        """Последние FEED_ITEMS постов группы."""
+        return obj.posts.select_related('author', 'group').order_by(
+            '-pub_date', '-id')[:settings.FEED_ITEMS]
+
+
+class AuthorFeed(PostsFeed):
+    """Лента автора."""
+
+    def get_object(self, request, username):
+        """Автор по username из URL."""
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        """Заголовок с именем автора."""
+        return f'Yatube: {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        """Подпись с username автора."""
+        return f'Посты пользователя {obj.username}'
+
+    def link(self, obj):
+        """Профиль автора."""
+        return reverse('posts:profile', args=[obj.username])
+
+    def items(self, obj):
+        """Последние FEED_ITEMS постов автора."""
+        return obj.posts.select_related('author', 'group').order_by(
+            '-pub_date', '-id')[:settings.FEED_ITEMS]
+
+
+class AtomPostsFeed(PostsFeed):
+    """Общая лента в Atom."""
+
+    feed_type = Atom1Feed
+
+
+class AtomGroupFeed(GroupFeed):
+    """Лента группы в Atom."""
+
+    feed_type = Atom1Feed
+
+
+class AtomAuthorFeed(AuthorFeed):
+    """Лента автора в Atom."""
+
+    feed_type = Atom1Feed
+
+
+def cached_feed(feed, validators):
+    """View ленты с кэшем целого ответа и условным GET."""
+    def view(request, *args, **kwargs):
+        tags, _ = validators(request, *args, **kwargs)
+        caching.add_cache_tags(request, *tags)
+        return feed(request, *args, **kwargs)
+    return conditional_page(validators)(caching.cache_anonymous_page(view))
+
+
+posts_rss = cached_feed(PostsFeed(), feed_validators)
+posts_atom = cached_feed(AtomPostsFeed(), feed_validators)
+group_rss = cached_feed(GroupFeed(), group_validators)
+group_atom = cached_feed(AtomGroupFeed(), group_validators)
+author_rss = cached_feed(AuthorFeed(), profile_validators)
+author_atom = cached_feed(AtomAuthorFeed(), profile_validators)
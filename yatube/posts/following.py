@@ -0,0 +1,68 @@
+"""Кэш id авторов, на которых подписан пользователь.
+
+Список хранится отсортированным array('q'): он компактнее множества
+при pickle, а проверка подписки - bisect без запроса к Follow. Ключ
+содержит поколение тега following:<id> (posts.caching). Сигналы
+Follow (а значит, profile_follow и profile_unfollow) и импорт подписок
+сдвигают его через forget - сразу и еще раз после коммита. Поэтому
+запрос, прочитавший Follow до чужой подписки, кладет список под
+старое поколение, которое уже никто не читает. В пределах запроса
+массив запоминается на request.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import caching
+from .models import Follow
+
+
+def _tag(user_id):
+    return f'following:{user_id}'
+
+
+def followed_ids(user_id):
+    """Отсортированный array id авторов подписок пользователя."""
+    tag = _tag(user_id)
+    key = caching.versioned_key(caching.get_generations([tag]), tag)
+    ids = cache.get(key)
+    if ids is None:
+        ids = array('q', Follow.objects.filter(user_id=user_id).order_by(
+            'author_id').values_list('author_id', flat=True))
+        cache.set(key, ids, settings.FOLLOWING_CACHE_TIMEOUT)
+    return ids
+
+
+def forget(*user_ids):
+    tags = [_tag(user_id) for user_id in user_ids]
+    caching.bump(*tags)
+    # Заполнение кэша между записью и коммитом видит старые подписки.
+    transaction.on_commit(lambda: caching.bump(*tags))
+
+
+def followed_authors(request):
+    """Подписки текущего пользователя, один раз за запрос; у анонима - нет."""
+    if not request.user.is_authenticated:
+        return array('q')
+    if not hasattr(request, 'followed_ids'):
+        request.followed_ids = followed_ids(request.user.pk)
+    return request.followed_ids
+
+
+def is_following(request, author_id):
+    ids = followed_authors(request)
+    index = bisect_left(ids, author_id)
+    return index < len(ids) and ids[index] == author_id
+
+
+def button_state(request):
+    """Данные для кнопок подписки в общих (кэшируемых) фрагментах лент."""
+    if not request.user.is_authenticated:
+        return None
+    return {
+        'user': request.user.pk,
+        'authors': followed_authors(request).tolist(),
+    }
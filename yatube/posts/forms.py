@@ -1,5 +1,5 @@
 from django import forms
-from .models import Post, Comment
+from .models import Group, Post, Comment, User
 
 
 class PostForm(forms.ModelForm):
@@ -12,3 +12,25 @@ class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Запрос', max_length=200)
+    group = forms.ModelChoiceField(
+        Group.objects.order_by('title'),
+        to_field_name='slug',
+        required=False,
+        label='Группа',
+        empty_label='Все группы',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    author = forms.CharField(label='Автор', max_length=150, required=False)
+
+    def clean_author(self):
+        username = self.cleaned_data['author']
+        if not username:
+            return None
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            raise forms.ValidationError('Нет такого автора')
+        return author
@@ -0,0 +1,335 @@
+"""Граф подписок в памяти процесса.
+
+Follow загружается в CSR: для каждого пользователя - отрезок
+отсортированного array('i') id авторов (и отдельно подписчиков), так
+что подписка проверяется bisect, а степени вершин - разность смещений.
+Изменения после загрузки дочитываются из журнала FollowEvent раз в
+GRAPH_REFRESH_INTERVAL секунд (с перекрытием GRAPH_EVENT_LAG) и лежат
+в наборах added/removed поверх CSR; граф собирается заново, когда
+наборы разрастаются, по истечении GRAPH_RELOAD_INTERVAL или при сдвиге
+тега GRAPH_TAG (rebuild). Сборка идет в фоновом потоке, а запросы тем
+временем читают старый граф; синхронно граф загружается первый раз в
+процессе и внутри транзакции.
+
+Старые события журнала удаляет prune_events (команда
+prune_follow_events), а не чтение графа.
+
+Вместо NumPy - стандартный array: те же int32 без новой зависимости.
+"""
+import datetime
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from . import caching
+from .models import Follow, FollowEvent, User
+
+GRAPH_TAG = 'follow-graph'
+POPULAR_COUNT = 50
+
+_lock = threading.Lock()
+_graph = None
+_reloading = False
+
+
+def _csr(keys, size):
+    """Смещения и соседи из отсортированных ключей row << 32 | column."""
+    offsets = array('i', [0]) * (size + 1)
+    targets = array('i')
+    for key in keys:
+        offsets[(key >> 32) + 1] += 1
+        targets.append(key & 0xFFFFFFFF)
+    for row in range(size):
+        offsets[row + 1] += offsets[row]
+    return offsets, targets
+
+
+class Adjacency:
+    """Одно направление графа: CSR и изменения поверх него."""
+
+    def __init__(self, pairs, size):
+        self.offsets, self.targets = _csr(
+            sorted(row << 32 | column for row, column in pairs), size)
+        self.added = {}
+        self.removed = {}
+
+    def _bounds(self, row):
+        if 0 <= row < len(self.offsets) - 1:
+            return self.offsets[row], self.offsets[row + 1]
+        return 0, 0
+
+    def in_base(self, row, column):
+        low, high = self._bounds(row)
+        index = bisect_left(self.targets, column, low, high)
+        return index < high and self.targets[index] == column
+
+    def has(self, row, column):
+        if column in self.added.get(row, ()):
+            return True
+        if column in self.removed.get(row, ()):
+            return False
+        return self.in_base(row, column)
+
+    def row(self, row):
+        low, high = self._bounds(row)
+        base = self.targets[low:high]
+        removed = self.removed.get(row)
+        if removed:
+            base = [column for column in base if column not in removed]
+        added = self.added.get(row)
+        if added:
+            return sorted(list(base) + list(added))
+        return list(base)
+
+    def degree(self, row):
+        low, high = self._bounds(row)
+        return (
+            high - low
+            - len(self.removed.get(row, ()))
+            + len(self.added.get(row, ()))
+        )
+
+    def apply(self, row, column, present):
+        # added - только связи не из CSR, removed - только из CSR.
+        in_base = self.in_base(row, column)
+        if present:
+            self.removed.get(row, set()).discard(column)
+            if not in_base:
+                self.added.setdefault(row, set()).add(column)
+        else:
+            self.added.get(row, set()).discard(column)
+            if in_base:
+                self.removed.setdefault(row, set()).add(column)
+
+    def changes(self):
+        return (
+            sum(map(len, self.added.values()))
+            + sum(map(len, self.removed.values()))
+        )
+
+    def nbytes(self):
+        return (
+            self.offsets.itemsize * len(self.offsets)
+            + self.targets.itemsize * len(self.targets)
+        )
+
+
+class FollowGraph:
+    """Подписки (user -> author) и подписчики (author -> user)."""
+
+    def __init__(self, pairs, event_id=0, generation=None, read_at=None):
+        pairs = list(pairs)
+        size = max((max(pair) for pair in pairs), default=0) + 1
+        self.following = Adjacency(pairs, size)
+        self.followers = Adjacency(
+            ((author, user) for user, author in pairs), size)
+        self.event_id = event_id
+        self.read_at = read_at or timezone.now()
+        self.generation = generation
+        self.loaded_at = self.checked_at = time.monotonic()
+        self.popular = heapq.nlargest(
+            POPULAR_COUNT, range(size), key=self.followers.degree)
+
+    def apply(self, user_id, author_id, followed):
+        self.following.apply(user_id, author_id, followed)
+        self.followers.apply(author_id, user_id, followed)
+
+    def follows(self, user_id, author_id):
+        return self.following.has(user_id, author_id)
+
+    def is_mutual(self, user_id, other_id):
+        return (
+            self.follows(user_id, other_id)
+            and self.follows(other_id, user_id)
+        )
+
+    def following_count(self, user_id):
+        return self.following.degree(user_id)
+
+    def followers_count(self, author_id):
+        return self.followers.degree(author_id)
+
+    def suggestions(self, user_id, limit=5):
+        """[(id, общих подписок)]: авторы, которых читают ваши авторы.
+
+        Ранжируются по числу общих подписок, затем по числу подписчиков;
+        недостающие места занимают самые популярные авторы.
+        """
+        followed = set(self.following.row(user_id))
+        scores = Counter()
+        for friend in followed:
+            scores.update(self.following.row(friend))
+        for skipped in followed | {user_id}:
+            scores.pop(skipped, None)
+        ranked = heapq.nlargest(
+            limit, scores.items(),
+            key=lambda item: (item[1], self.followers.degree(item[0])),
+        )
+        seen = followed | {user_id} | {pk for pk, _ in ranked}
+        for author_id in self.popular:
+            if len(ranked) >= limit:
+                break
+            if author_id not in seen and self.followers.degree(author_id):
+                ranked.append((author_id, 0))
+        return ranked
+
+    def changes(self):
+        return self.following.changes()
+
+    def nbytes(self):
+        return self.following.nbytes() + self.followers.nbytes()
+
+
+def _generation():
+    return caching.get_generations([GRAPH_TAG])[GRAPH_TAG]
+
+
+def load():
+    """Граф из Follow."""
+    generation = _generation()
+    # Id и время события берутся до чтения Follow: события применяются
+    # идемпотентно, и гонка дает повтор, а не пропуск.
+    read_at = timezone.now()
+    event_id = FollowEvent.objects.aggregate(last=Max('id'))['last'] or 0
+    pairs = Follow.objects.order_by().values_list(
+        'user_id', 'author_id'
+    ).iterator(chunk_size=settings.GRAPH_LOAD_CHUNK_SIZE)
+    return FollowGraph(pairs, event_id, generation, read_at)
+
+
+def prune_events():
+    """Удаляет события журнала старше GRAPH_EVENT_RETENTION."""
+    deleted, _ = FollowEvent.objects.filter(
+        created__lt=timezone.now() - datetime.timedelta(
+            seconds=settings.GRAPH_EVENT_RETENTION)
+    ).delete()
+    return deleted
+
+
+def refresh(graph):
+    """Дочитывает журнал событий после последнего примененного.
+
+    При параллельных писателях события фиксируются не в порядке id:
+    событие с меньшим id может появиться уже после прочитанного.
+    Поэтому события последних GRAPH_EVENT_LAG секунд перед прошлым
+    чтением читаются заново. apply идемпотентен, события идут по id, и
+    для каждой пары побеждает последнее - повтор состояния не меняет.
+    """
+    read_at = timezone.now()
+    since = graph.read_at - datetime.timedelta(
+        seconds=settings.GRAPH_EVENT_LAG)
+    events = FollowEvent.objects.filter(
+        Q(id__gt=graph.event_id) | Q(created__gte=since)
+    ).order_by('id').values_list('id', 'user_id', 'author_id', 'followed')
+    for event_id, user_id, author_id, followed in events:
+        graph.apply(user_id, author_id, followed)
+        graph.event_id = max(graph.event_id, event_id)
+    graph.read_at = read_at
+    graph.checked_at = time.monotonic()
+
+
+def _is_stale(graph, now):
+    return (
+        graph.generation != _generation()
+        or now - graph.loaded_at >= settings.GRAPH_RELOAD_INTERVAL
+        or graph.changes() > settings.GRAPH_MAX_CHANGES
+    )
+
+
+def _reload():
+    global _graph, _reloading
+    try:
+        graph = load()
+        with _lock:
+            refresh(graph)
+            _graph = graph
+    finally:
+        _reloading = False
+
+
+def _in_background(function):
+    def run():
+        try:
+            function()
+        finally:
+            connections.close_all()
+    threading.Thread(
+        target=run, name='follow-graph-reload', daemon=True).start()
+
+
+def _can_reload_in_background():
+    # Поток со своим соединением не видит незакоммиченных данных
+    # текущей транзакции (ATOMIC_REQUESTS, TestCase) - тогда граф
+    # собирается синхронно.
+    return not connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+def get_graph():
+    """Граф процесса; устаревший пересобирается в фоне."""
+    global _graph, _reloading
+    start_reload = False
+    with _lock:
+        now = time.monotonic()
+        stale = _graph is None or _is_stale(_graph, now)
+        if stale and (_graph is None or not _can_reload_in_background()):
+            _graph = load()
+        else:
+            if stale and not _reloading:
+                _reloading = start_reload = True
+            if now - _graph.checked_at >= settings.GRAPH_REFRESH_INTERVAL:
+                refresh(_graph)
+    if start_reload:
+        _in_background(_reload)
+    return _graph
+
+
+def rebuild():
+    """Заставляет все процессы собрать граф заново."""
+    caching.bump(GRAPH_TAG)
+
+
+def _suggestions_key(user_id):
+    return f'who_to_follow:{user_id}'
+
+
+def record(follows, followed):
+    """Пишет подписки или отписки в журнал и сбрасывает подсказки."""
+    FollowEvent.objects.bulk_create(
+        FollowEvent(
+            user_id=follow.user_id,
+            author_id=follow.author_id,
+            followed=followed,
+        )
+        for follow in follows
+    )
+    cache.delete_many(
+        [_suggestions_key(follow.user_id) for follow in follows])
+
+
+def who_to_follow(user):
+    """Подсказки для блока «Кого почитать», кэшируются по пользователю."""
+    key = _suggestions_key(user.pk)
+    rows = cache.get(key)
+    if rows is None:
+        suggestions = get_graph().suggestions(
+            user.pk, settings.WHO_TO_FOLLOW_COUNT)
+        users = User.objects.in_bulk([pk for pk, _ in suggestions])
+        rows = [
+            {
+                'username': users[pk].username,
+                'full_name': users[pk].get_full_name(),
+                'mutual': mutual,
+            }
+            for pk, mutual in suggestions if pk in users
+        ]
+        cache.set(key, rows, settings.WHO_TO_FOLLOW_TIMEOUT)
+    return rows
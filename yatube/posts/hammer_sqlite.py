@@ -0,0 +1,69 @@
+"""Параллельная запись из потоков для команды hammer_sqlite."""
+import random
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection, transaction
+
+from .benchmark import percentile
+from .models import Comment, Post
+
+User = get_user_model()
+
+
+def hammer(threads=8, seconds=5.0):
+    """Потоки пишут посты и комментарии; пропускная способность и хвосты.
+
+    Каждая запись - транзакция с сигналами, как в post_create и
+    add_comment, в очереди записи core.sqlite.
+    """
+    user_ids = list(User.objects.values_list('id', flat=True))
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def worker(number):
+        rnd = random.Random(number)
+        try:
+            while time.monotonic() < stop:
+                started = time.perf_counter()
+                try:
+                    with transaction.atomic():
+                        if rnd.random() < 0.5:
+                            Post.objects.create(
+                                author_id=rnd.choice(user_ids),
+                                text=f'Пост из потока {number}',
+                            )
+                        else:
+                            Comment.objects.create(
+                                post_id=rnd.choice(post_ids),
+                                author_id=rnd.choice(user_ids),
+                                text=f'Комментарий из потока {number}',
+                            )
+                except OperationalError as error:
+                    with lock:
+                        errors.append(str(error))
+                    continue
+                with lock:
+                    latencies.append(
+                        (time.perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+
+    workers = [
+        threading.Thread(target=worker, args=(number,))
+        for number in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return {
+        'writes_s': len(latencies) / seconds,
+        'p50_ms': percentile(latencies, 0.5) if latencies else 0.0,
+        'p99_ms': percentile(latencies, 0.99) if latencies else 0.0,
+        'max_ms': max(latencies, default=0.0),
+        'errors': len(errors),
+    }
@@ -0,0 +1,339 @@
+"""Массовый импорт постов, комментариев и подписок.
+
+Записи приходят пачками (import_content режет поток на транзакции):
+авторы и группы ищутся через словари-кэши, недостающие авторы
+создаются без пароля, строки вставляются bulk_create. Сигналы при этом
+не срабатывают, поэтому производные данные - счетчики, ленты подписок,
+поисковый индекс и поколения тегов кэша - обновляются в конце пачки
+одним проходом по затронутым объектам.
+
+Записи, которые уже есть в базе (тот же id или та же подписка),
+пропускаются с ошибкой и в импортированные не попадают. auto_now и
+auto_now_add проставляют при вставке текущее время, поэтому даты
+записей возвращаются вторым запросом - bulk_update.
+
+Поля записей: post - id (необязательно, сохраняется как первичный
+ключ), author, text, group (slug), pub_date, image (путь в MEDIA_ROOT);
+comment - id, post (id поста), author, text, created; follow - user,
+author. Даты в ISO 8601, по умолчанию - время импорта.
+"""
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, counters, following, graph, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+TYPES = ('post', 'comment', 'follow')
+
+
+class RowError(ValueError):
+    """Строка пропускается с этим сообщением."""
+
+
+def _required(record, name):
+    value = record.get(name)
+    if value in (None, ''):
+        raise RowError(f'нет поля {name}')
+    return value
+
+
+def _date(record, name):
+    value = record.get(name)
+    if not value:
+        return timezone.now()
+    try:
+        parsed = parse_datetime(value)
+    except (TypeError, ValueError):
+        parsed = None
+    if parsed is None:
+        raise RowError(f'неверная дата {name}: {value}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _id(record, name, required=False):
+    value = record.get(name)
+    if value in (None, ''):
+        if required:
+            raise RowError(f'нет поля {name}')
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f'неверный {name}: {value}')
+
+
+def _new_rows(rows, key, existing, message, errors):
+    """Объекты строк, ключа которых нет в existing и выше в пачке.
+
+    Остальные строки уходят в errors; ключ None - строка всегда новая.
+    """
+    seen = set(existing)
+    new = []
+    for number, obj in rows:
+        value = key(obj)
+        if value is None:
+            new.append(obj)
+        elif value in seen:
+            errors.append((number, message.format(value)))
+        else:
+            seen.add(value)
+            new.append(obj)
+    return new
+
+
+def _assign_ids(model, objects, last_id):
+    """Проставляет id, которые не вернул bulk_create (SQLite).
+
+    Пачка импортируется в транзакции с блокировкой записи, поэтому
+    строки без явного id - все новые строки выше last_id, кроме явных,
+    в порядке вставки.
+    """
+    missing = [obj for obj in objects if obj.pk is None]
+    if not missing:
+        return
+    explicit = [obj.pk for obj in objects if obj.pk is not None]
+    ids = model.objects.filter(pk__gt=last_id).exclude(
+        pk__in=explicit).order_by('pk').values_list('pk', flat=True)
+    for obj, pk in zip(missing, ids):
+        obj.pk = pk
+
+
+class Importer:
+    """Вставляет пачки записей и обновляет производные данные."""
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.user_ids = {}
+        self.group_ids = {}
+
+    def resolve_users(self, usernames):
+        missing = set(usernames) - set(self.user_ids)
+        if not missing:
+            return
+        self.user_ids.update(
+            User.objects.filter(username__in=missing).values_list(
+                'username', 'id')
+        )
+        missing -= set(self.user_ids)
+        if missing:
+            password = make_password(None)
+            User.objects.bulk_create(
+                [User(username=name, password=password) for name in missing],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            self.user_ids.update(
+                User.objects.filter(username__in=missing).values_list(
+                    'username', 'id')
+            )
+
+    def resolve_groups(self, slugs):
+        missing = set(slugs) - set(self.group_ids)
+        if missing:
+            self.group_ids.update(
+                Group.objects.filter(slug__in=missing).values_list(
+                    'slug', 'id')
+            )
+
+    def import_chunk(self, records):
+        """Импортирует [(номер строки, запись)] в текущей транзакции.
+
+        Возвращает (число вставленных, [(номер строки, ошибка)]).
+        """
+        by_type = {name: [] for name in TYPES}
+        errors = []
+        for number, record in records:
+            kind = record.get('type')
+            if kind in by_type:
+                by_type[kind].append((number, record))
+            else:
+                errors.append((number, f'неизвестный тип {kind}'))
+        usernames = set()
+        for _, record in records:
+            for name in ('author', 'user'):
+                if record.get(name):
+                    usernames.add(record[name])
+        self.resolve_users(usernames)
+        self.resolve_groups(
+            record['group'] for _, record in by_type['post']
+            if record.get('group')
+        )
+        touched = Touched()
+        imported = 0
+        for name in TYPES:
+            rows = []
+            for number, record in by_type[name]:
+                try:
+                    rows.append(
+                        (number, getattr(self, f'build_{name}')(record)))
+                except RowError as error:
+                    errors.append((number, str(error)))
+            insert = getattr(self, f'insert_{name}s')
+            imported += insert(rows, touched, errors)
+        touched.apply()
+        return imported, errors
+
+    # Разбор записей
+
+    def _user_id(self, record, name):
+        username = _required(record, name)
+        if username not in self.user_ids:
+            raise RowError(f'не удалось создать пользователя {username}')
+        return self.user_ids[username]
+
+    def build_post(self, record):
+        group_id = None
+        if record.get('group'):
+            group_id = self.group_ids.get(record['group'])
+            if group_id is None:
+                raise RowError(f'нет группы {record["group"]}')
+        pub_date = _date(record, 'pub_date')
+        return Post(
+            id=_id(record, 'id'),
+            author_id=self._user_id(record, 'author'),
+            group_id=group_id,
+            text=_required(record, 'text'),
+            pub_date=pub_date,
+            modified=pub_date,
+            image=record.get('image') or '',
+        )
+
+    def build_comment(self, record):
+        return Comment(
+            id=_id(record, 'id'),
+            post_id=_id(record, 'post', required=True),
+            author_id=self._user_id(record, 'author'),
+            text=_required(record, 'text'),
+            created=_date(record, 'created'),
+        )
+
+    def build_follow(self, record):
+        user_id = self._user_id(record, 'user')
+        author_id = self._user_id(record, 'author')
+        if user_id == author_id:
+            raise RowError('подписка на самого себя')
+        return Follow(user_id=user_id, author_id=author_id)
+
+    # Вставка
+
+    def reset_sequences(self):
+        """Сдвигает последовательности id после вставки явных id."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Post, Comment])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def insert_posts(self, rows, touched, errors):
+        existing = Post.objects.filter(
+            pk__in=[post.id for _, post in rows if post.id is not None]
+        ).values_list('id', flat=True)
+        posts = _new_rows(
+            rows, lambda post: post.id, existing, 'пост {} уже есть', errors)
+        if not posts:
+            return 0
+        last_id = Post.objects.aggregate(last=Max('id'))['last'] or 0
+        dates = [(post.pub_date, post.modified) for post in posts]
+        Post.objects.bulk_create(posts, batch_size=self.batch_size)
+        _assign_ids(Post, posts, last_id)
+        for post, (pub_date, modified) in zip(posts, dates):
+            post.pub_date, post.modified = pub_date, modified
+        Post.objects.bulk_update(
+            posts, ('pub_date', 'modified'), batch_size=self.batch_size)
+        touched.post_ids.update(post.id for post in posts)
+        touched.user_ids.update(post.author_id for post in posts)
+        touched.group_ids.update(
+            post.group_id for post in posts if post.group_id is not None)
+        return len(posts)
+
+    def insert_comments(self, rows, touched, errors):
+        posts = set(
+            Post.objects.filter(
+                pk__in={comment.post_id for _, comment in rows}
+            ).values_list('id', flat=True)
+        )
+        found = []
+        for number, comment in rows:
+            if comment.post_id in posts:
+                found.append((number, comment))
+            else:
+                errors.append((number, f'нет поста {comment.post_id}'))
+        existing = Comment.objects.filter(
+            pk__in=[comment.id for _, comment in found
+                    if comment.id is not None]
+        ).values_list('id', flat=True)
+        comments = _new_rows(
+            found, lambda comment: comment.id, existing,
+            'комментарий {} уже есть', errors)
+        if not comments:
+            return 0
+        last_id = Comment.objects.aggregate(last=Max('id'))['last'] or 0
+        dates = [comment.created for comment in comments]
+        Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+        _assign_ids(Comment, comments, last_id)
+        for comment, created in zip(comments, dates):
+            comment.created = created
+        Comment.objects.bulk_update(
+            comments, ('created',), batch_size=self.batch_size)
+        touched.commented_ids.update(comment.post_id for comment in comments)
+        return len(comments)
+
+    def insert_follows(self, rows, touched, errors):
+        existing = Follow.objects.filter(
+            user_id__in={follow.user_id for _, follow in rows},
+            author_id__in={follow.author_id for _, follow in rows},
+        ).values_list('user_id', 'author_id')
+        follows = _new_rows(
+            rows, lambda follow: (follow.user_id, follow.author_id),
+            existing, 'подписка уже есть', errors)
+        Follow.objects.bulk_create(
+            follows, batch_size=self.batch_size, ignore_conflicts=True)
+        graph.record(follows, followed=True)
+        for follow in follows:
+            touched.user_ids.update((follow.user_id, follow.author_id))
+            touched.follower_ids.add(follow.user_id)
+        return len(follows)
+
+
+class Touched:
+    """Что затронула пачка - по этому обновляются производные данные."""
+
+    def __init__(self):
+        self.post_ids = set()
+        self.commented_ids = set()
+        self.user_ids = set()
+        self.group_ids = set()
+        self.follower_ids = set()
+
+    def apply(self):
+        if self.user_ids:
+            counters.reconcile_users(list(self.user_ids))
+        if self.commented_ids:
+            counters.reconcile_posts(list(self.commented_ids))
+        search.index_posts(self.post_ids)
+        timeline.push_posts(self.post_ids)
+        following.forget(*self.follower_ids)
+        for user_id in self.follower_ids:
+            timeline.rebuild(user_id)
+        self.bump()
+
+    def bump(self):
+        tags = [caching.FEED]
+        tags.extend(
+            caching.author_tag(username) for username in
+            User.objects.filter(pk__in=self.user_ids).values_list(
+                'username', flat=True)
+        )
+        tags.extend(
+            caching.group_tag(slug) for slug in
+            Group.objects.filter(pk__in=self.group_ids).values_list(
+                'slug', flat=True)
+        )
+        tags.extend(caching.post_tag(pk) for pk in self.commented_ids)
+        caching.bump(*tags)
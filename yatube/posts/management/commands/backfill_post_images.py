@@ -0,0 +1,45 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает недостающие варианты картинок постов (POST_IMAGE_VARIANTS) '
+        'параллельно в пуле процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число процессов; 0 - генерировать в текущем процессе.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько картинок ставить в пул за раз.'
+        )
+
+    def missing(self):
+        posts = Post.objects.exclude(image='').order_by('pk')
+        for post in posts.only('image').iterator():
+            _, complete = thumbnails.ready_variants(post.image)
+            if not complete:
+                yield post.image.name
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        results = thumbnails.generate_many(
+            self.missing(), options['workers'], options['batch_size'])
+        for name, result in results:
+            if isinstance(result, Exception):
+                failed += 1
+                self.stderr.write(f'{name}: {result}')
+                continue
+            thumbnails.finish(name, result)
+            done += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок обработано: {done}, с ошибками: {failed}'
+        ))
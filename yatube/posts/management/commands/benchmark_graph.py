@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import benchmark_graph
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет граф подписок в памяти (posts.graph) на случайных '
+        'ребрах: сборку CSR, память и время запросов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edges', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--checks', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        results = benchmark_graph.graph_run(
+            edges=options['edges'],
+            users=options['users'],
+            checks=options['checks'],
+        )
+        for name, value in results.items():
+            self.stdout.write(f'{name:<16}{value:>13.2f}')
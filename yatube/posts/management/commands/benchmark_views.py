@@ -0,0 +1,94 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет страницы posts на сгенерированных данных во временной '
+        'тестовой базе и сравнивает результат с JSON baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(settings.BASE_DIR, 'benchmark_baseline.json'),
+            help='Файл baseline; если его нет, он будет создан.'
+        )
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Перезаписать baseline текущими результатами.'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый относительный рост времени (0.25 = 25%%).'
+        )
+        parser.add_argument(
+            '--query-tolerance', type=int, default=0,
+            help='Допустимый рост числа запросов.'
+        )
+
+    @override_settings(DEBUG=False)
+    def measure(self, options):
+        """Замер во временной базе без тестовой обвязки шаблонов.
+
+        setup_test_environment не вызывается: тестовый рендеринг
+        копирует контекст каждого шаблона и искажает время.
+        """
+        old_names = {}
+        for connection in connections.all():
+            old_names[connection.alias] = connection.settings_dict['NAME']
+            connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False)
+        try:
+            benchmark.seed(
+                users=options['users'],
+                posts=options['posts'],
+                comments=options['comments'],
+            )
+            return benchmark.run(iterations=options['iterations'])
+        finally:
+            for connection in connections.all():
+                connection.creation.destroy_test_db(
+                    old_names[connection.alias], verbosity=0)
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"view":<16}' + ''.join(f'{m:>13}' for m in benchmark.METRICS)
+        )
+        for name, metrics in results.items():
+            self.stdout.write(f'{name:<16}' + ''.join(
+                f'{metrics[m]:>13.2f}' for m in benchmark.METRICS
+            ))
+
+    def handle(self, *args, **options):
+        results = self.measure(options)
+        self.report(results)
+        path = options['baseline']
+        if options['update'] or not os.path.exists(path):
+            with open(path, 'w') as baseline_file:
+                json.dump(results, baseline_file, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Baseline записан: {path}'))
+            return
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = benchmark.compare(
+            baseline, results,
+            tolerance=options['tolerance'],
+            query_tolerance=options['query_tolerance'],
+        )
+        if regressions:
+            raise CommandError(
+                'Регрессии производительности:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
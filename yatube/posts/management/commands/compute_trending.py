@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг «Популярное» (TrendingScore). Запускается '
+        'периодически, например из cron раз в несколько минут.'
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = trending.compute()
+        self.stdout.write(self.style.SUCCESS(
+            f'Постов в рейтинге: {total} '
+            f'за {time.monotonic() - started:.2f} с'
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты и комментарии пользователя в NDJSON или CSV '
+        'потоком, не собирая выгрузку в памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Чьи записи выгрузить.')
+        parser.add_argument(
+            '--format', choices=tuple(export.FORMATS), default='ndjson',
+            help='Формат выгрузки.'
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout.'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f'Нет пользователя {options["username"]}')
+        lines = export.lines(user, options['format'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as target:
+            target.writelines(lines)
+        self.stderr.write(f'Выгрузка записана в {options["output"]}')
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts import benchmark, hammer_sqlite
+
+PROFILES = (
+    ('до', {'SQLITE_PRAGMAS': {}, 'SQLITE_SERIALIZE_WRITES': False}),
+    ('после', {}),
+)
+METRICS = ('writes_s', 'p50_ms', 'p99_ms', 'max_ms', 'errors')
+
+
+class Command(BaseCommand):
+    help = (
+        'Параллельная запись в SQLite-файл из нескольких потоков: '
+        'настройки SQLite по умолчанию против WAL, PRAGMA и очереди '
+        'записи (core.sqlite).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5.0)
+
+    def measure(self, path, options):
+        """Прогон в отдельном файле базы, который удаляется после."""
+        old_name = connection.settings_dict['NAME']
+        connection.settings_dict['TEST']['NAME'] = path
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        try:
+            cache.clear()
+            benchmark.seed(users=20, posts=200, comments=200, follows=5)
+            return hammer_sqlite.hammer(
+                threads=options['threads'], seconds=options['seconds'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер только для SQLite.')
+        directory = tempfile.mkdtemp()
+        try:
+            self.stdout.write(
+                f'{"профиль":<10}' + ''.join(f'{m:>12}' for m in METRICS))
+            for name, overrides in PROFILES:
+                with override_settings(**overrides):
+                    results = self.measure(
+                        os.path.join(directory, f'{name}.sqlite3'), options)
+                self.stdout.write(f'{name:<10}' + ''.join(
+                    f'{results[m]:>12.2f}' for m in METRICS))
+        finally:
+            shutil.rmtree(directory)
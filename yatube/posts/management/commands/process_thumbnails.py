@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import ThumbnailJob
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбирает очередь ThumbnailJob: создает варианты картинок '
+        'постов в пуле процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Число процессов; 0 - генерировать в текущем процессе.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько задач брать из очереди за раз.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Проверять очередь каждые N секунд (0 - разобрать один раз).'
+        )
+
+    def process(self, names, options):
+        done = failed = 0
+        results = thumbnails.generate_many(
+            names, options['workers'], options['batch_size'])
+        for name, result in results:
+            if isinstance(result, Exception):
+                failed += 1
+                self.stderr.write(f'{name}: {result}')
+            else:
+                thumbnails.finish(name, result)
+                done += 1
+        ThumbnailJob.objects.filter(name__in=names).delete()
+        return done, failed
+
+    def handle(self, *args, **options):
+        while True:
+            done = failed = 0
+            while True:
+                names = list(ThumbnailJob.objects.values_list(
+                    'name', flat=True)[:options['batch_size']])
+                if not names:
+                    break
+                batch_done, batch_failed = self.process(names, options)
+                done += batch_done
+                failed += batch_failed
+            if done or failed or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Картинок обработано: {done}, с ошибками: {failed}'
+                ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
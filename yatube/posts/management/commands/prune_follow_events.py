@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import graph
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из журнала подписок (FollowEvent) события старше '
+        'GRAPH_EVENT_RETENTION. Запускается периодически, например из '
+        'cron раз в час.'
+    )
+
+    def handle(self, *args, **options):
+        deleted = graph.prune_events()
+        self.stdout.write(
+            self.style.SUCCESS(f'Удалено событий: {deleted}'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+from posts.models import Follow, TimelineEntry, User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок с нуля.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Чьи ленты пересобрать (по умолчанию все).'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(
+            id__in=Follow.objects.values('user_id')
+        ).order_by('id')
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+        else:
+            TimelineEntry.objects.exclude(
+                user_id__in=Follow.objects.values('user_id')
+            ).delete()
+        rebuilt = 0
+        for user_id in users.values_list('id', flat=True).iterator():
+            with transaction.atomic():
+                timeline.rebuild(user_id)
+            rebuilt += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано лент: {rebuilt}')
+        )
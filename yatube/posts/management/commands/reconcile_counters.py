@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет счетчики постов, комментариев и подписок с таблицами '
+        'и исправляет расхождения пачками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько строк сверять за одну транзакцию.'
+        )
+
+    def reconcile(self, queryset, fix, batch_size):
+        fixed = 0
+        ids = queryset.order_by('pk').values_list('pk', flat=True)
+        batch = []
+        for pk in ids.iterator(chunk_size=batch_size):
+            batch.append(pk)
+            if len(batch) == batch_size:
+                with transaction.atomic():
+                    fixed += fix(batch)
+                batch = []
+        if batch:
+            with transaction.atomic():
+                fixed += fix(batch)
+        return fixed
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        users = self.reconcile(
+            User.objects.all(), counters.reconcile_users, batch_size)
+        posts = self.reconcile(
+            Post.objects.all(), counters.reconcile_posts, batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счетчиков: пользователей {users}, постов {posts}'
+        ))
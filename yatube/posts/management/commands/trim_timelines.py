@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из лент подписок записи сверх TIMELINE_LENGTH. '
+        'Запускается периодически, например из cron раз в час.'
+    )
+
+    def handle(self, *args, **options):
+        users = deleted = 0
+        for user_id in list(timeline.overflowing_users()):
+            with transaction.atomic():
+                deleted += timeline.trim(user_id)
+            users += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обрезано лент: {users}, удалено записей: {deleted}'
+        ))
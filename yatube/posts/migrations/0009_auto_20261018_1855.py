@@ -0,0 +1,70 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:55
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_related(model, column, value_column='pk'):
+    return Coalesce(Subquery(
+        model.objects.filter(**{column: OuterRef(value_column)}).order_by(
+        ).values(column).annotate(total=Count('id')).values('total')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    Post.objects.update(comments_count=count_related(Comment, 'post'))
+    users = User.objects.annotate(
+        posts_total=count_related(Post, 'author'),
+        followers_total=count_related(Follow, 'author'),
+        following_total=count_related(Follow, 'user'),
+    ).values_list('pk', 'posts_total', 'followers_total', 'following_total')
+    UserStats.objects.bulk_create(
+        (
+            UserStats(
+                user_id=pk,
+                posts_count=posts,
+                followers_count=followers,
+                following_count=following,
+            )
+            for pk, posts, followers, following in users.iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0008_auto_20261018_1853'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('followers_count', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+            ],
+            options={
+                'verbose_name': 'Счетчики пользователя',
+                'verbose_name_plural': 'Счетчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Поддерживается сигналами, чинится reconcile_counters', verbose_name='Число комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:40
+
+from django.db import migrations
+
+# SQL зафиксирован здесь, а не берется из posts.search: миграция должна
+# создавать ту же схему, как бы ни менялся код поиска.
+FORWARD = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE posts_post_search USING fts5("
+        "text, group_title, group_description, "
+        "tokenize = 'unicode61 remove_diacritics 2')",
+        "INSERT INTO posts_post_search (rowid, text, group_title, "
+        "group_description) SELECT p.id, p.text, "
+        "COALESCE(g.title, ''), COALESCE(g.description, '') "
+        "FROM posts_post p LEFT JOIN posts_group g ON g.id = p.group_id",
+    ],
+    'postgresql': [
+        "CREATE TABLE posts_post_search ("
+        "post_id integer PRIMARY KEY "
+        "REFERENCES posts_post (id) ON DELETE CASCADE, "
+        "document tsvector NOT NULL)",
+        "CREATE INDEX posts_post_search_document "
+        "ON posts_post_search USING GIN (document)",
+        "INSERT INTO posts_post_search (post_id, document) SELECT p.id, "
+        "setweight(to_tsvector('russian', p.text), 'A') || "
+        "setweight(to_tsvector('russian', COALESCE(g.title, '')), 'B') || "
+        "setweight(to_tsvector('russian', COALESCE(g.description, '')), "
+        "'C') "
+        "FROM posts_post p LEFT JOIN posts_group g ON g.id = p.group_id",
+    ],
+}
+
+BACKWARD = {
+    'sqlite': ['DROP TABLE IF EXISTS posts_post_search'],
+    'postgresql': ['DROP TABLE IF EXISTS posts_post_search'],
+}
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, ()):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_modified'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD), _run(BACKWARD)),
+    ]
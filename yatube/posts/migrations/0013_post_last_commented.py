@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+def fill_last_commented(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    Post = apps.get_model('posts', 'Post')
+    latest = Comment.objects.filter(
+        post=models.OuterRef('pk')
+    ).order_by('-created').values('created')[:1]
+    Post.objects.filter(comments__isnull=False).update(
+        last_commented=models.Subquery(latest)
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='last_commented',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Поддерживается сигналами, чинится reconcile_counters', null=True, verbose_name='Последний комментарий'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-last_commented', '-id'], name='post_last_commented_idx'),
+        ),
+        migrations.RunPython(fill_last_commented, migrations.RunPython.noop),
+    ]
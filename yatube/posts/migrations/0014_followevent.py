@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_last_commented'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField(verbose_name='Последователь')),
+                ('author_id', models.IntegerField(verbose_name='Лидер')),
+                ('followed', models.BooleanField(help_text='True - подписка, False - отписка', verbose_name='Подписка')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Время события')),
+            ],
+            options={
+                'verbose_name': 'Событие подписки',
+                'verbose_name_plural': 'События подписок',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_trendingscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('name', models.CharField(help_text='Имя файла в хранилище', max_length=255, primary_key=True, serialize=False, verbose_name='Картинка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Поставлена в очередь')),
+            ],
+            options={
+                'verbose_name': 'Задача миниатюр',
+                'verbose_name_plural': 'Задачи миниатюр',
+                'ordering': ('created',),
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_thumbnailjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('path', models.CharField(help_text='Абсолютный путь к файлу импорта', max_length=1000, primary_key=True, serialize=False, verbose_name='Файл')),
+                ('position', models.PositiveIntegerField(default=0, help_text='Номер последней записи импортированной пачки', verbose_name='Последняя запись')),
+                ('imported', models.PositiveIntegerField(default=0, verbose_name='Импортировано')),
+                ('skipped', models.PositiveIntegerField(default=0, verbose_name='Пропущено')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Время сохранения')),
+            ],
+            options={
+                'verbose_name': 'Контрольная точка импорта',
+                'verbose_name_plural': 'Контрольные точки импорта',
+            },
+        ),
+    ]
@@ -29,6 +29,11 @@ class Post(models.Model):
         verbose_name='Дата публикации поста',
         help_text='Дата присвоена автоматически'
     )
+    modified = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+        help_text='Обновляется при каждом сохранении'
+    )
     text = models.TextField(
         max_length=400,
         verbose_name='Текст поста',
@@ -37,6 +42,7 @@ class Post(models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='posts',
         verbose_name='Автор поста',
         help_text='Этот пользователь создал пост'
@@ -46,6 +52,7 @@ class Post(models.Model):
         blank=True,
         null=True,
         on_delete=models.SET_NULL,
+        db_index=False,
         related_name='posts',
         verbose_name='Группа',
         help_text='Группа, к которой будет относиться пост'
@@ -55,8 +62,39 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев',
+        help_text='Поддерживается сигналами, чинится reconcile_counters'
+    )
+    last_commented = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Последний комментарий',
+        help_text='Поддерживается сигналами, чинится reconcile_counters'
+    )
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=('-last_commented', '-id'),
+                name='post_last_commented_idx'
+            ),
+        ]
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
@@ -79,6 +117,7 @@ class Comment(models.Model):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='comments',
         verbose_name='Пост',
         help_text='Этот пост комментим'
@@ -92,6 +131,12 @@ class Comment(models.Model):
     )
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=('post', '-created', '-id'),
+                name='comment_post_created_idx'
+            ),
+        ]
         ordering = ('-created',)
         verbose_name = 'Коммент'
         verbose_name_plural = 'Комменты'
@@ -104,6 +149,7 @@ class Follow(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='follower',
         verbose_name='Последователь',
         help_text='Это фолловер '
@@ -111,6 +157,7 @@ class Follow(models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='following',
         verbose_name='Лидер',
         help_text='Это контентмейкер'
@@ -123,7 +170,184 @@ class Follow(models.Model):
                 name='followings are unique'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('author', 'user'),
+                name='follow_author_user_idx'
+            ),
+        ]
         ordering = ('user',)
 
     def __str__(self):
         return f'{self.user} follows {self.author}'
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        verbose_name='Число подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписок'
+    )
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.posts_count} posts'
+
+
+class FollowEvent(models.Model):
+    """Журнал подписок и отписок для инкрементального обновления графа."""
+
+    user_id = models.IntegerField(verbose_name='Последователь')
+    author_id = models.IntegerField(verbose_name='Лидер')
+    followed = models.BooleanField(
+        verbose_name='Подписка',
+        help_text='True - подписка, False - отписка'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Время события'
+    )
+
+    class Meta:
+        verbose_name = 'Событие подписки'
+        verbose_name_plural = 'События подписок'
+
+
+class TrendingScore(models.Model):
+    """Рейтинг поста для вкладки «Популярное», считается compute_trending."""
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост'
+    )
+    score = models.FloatField(verbose_name='Рейтинг')
+    computed = models.DateTimeField(verbose_name='Время расчета')
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('-score', '-post'),
+                name='trending_score_idx'
+            ),
+        ]
+        verbose_name = 'Рейтинг поста'
+        verbose_name_plural = 'Рейтинги постов'
+
+
+class ThumbnailJob(models.Model):
+    """Картинка в очереди на миниатюры, разбирает process_thumbnails."""
+
+    name = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name='Картинка',
+        help_text='Имя файла в хранилище'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Поставлена в очередь'
+    )
+
+    class Meta:
+        ordering = ('created',)
+        verbose_name = 'Задача миниатюр'
+        verbose_name_plural = 'Задачи миниатюр'
+
+
+class ImportCheckpoint(models.Model):
+    """Позиция прерванного import_content в файле.
+
+    Пишется в транзакции пачки: пачка и точка фиксируются вместе.
+    """
+
+    path = models.CharField(
+        max_length=1000,
+        primary_key=True,
+        verbose_name='Файл',
+        help_text='Абсолютный путь к файлу импорта'
+    )
+    position = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Последняя запись',
+        help_text='Номер последней записи импортированной пачки'
+    )
+    imported = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Импортировано'
+    )
+    skipped = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Пропущено'
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Время сохранения'
+    )
+
+    class Meta:
+        verbose_name = 'Контрольная точка импорта'
+        verbose_name_plural = 'Контрольные точки импорта'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='timeline',
+        verbose_name='Читатель',
+        help_text='Лента этого пользователя'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+        help_text='Пост в ленте'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации поста',
+        help_text='Копия Post.pub_date для сортировки ленты'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='timeline entries are unique'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='timeline_user_pub_date_idx'
+            )
+        ]
+        ordering = ('-pub_date', '-post_id')
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+
+    def __str__(self):
+        return f'{self.post_id} in {self.user_id} timeline'
@@ -0,0 +1,163 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def pack_cursor(values):
+    """Непрозрачный курсор из списка JSON-значений ключа."""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def unpack_cursor(cursor, length):
+    """Список значений курсора; InvalidCursor, если он испорчен."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw.decode())
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor(cursor)
+    return values
+
+
+class KeysetPage(Page):
+    """Страница keyset-пагинации: вместо номера знает курсоры соседей."""
+
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<KeysetPage>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator(Paginator):
+    """Пагинация по ключу (по умолчанию (pub_date, id)) без COUNT и OFFSET.
+
+    Записи идут по убыванию ключа, соседние страницы адресуются
+    непрозрачными курсорами ?after= и ?before=.
+    """
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id')):
+        super().__init__(object_list, per_page)
+        self.keys = keys
+
+    def encode_cursor(self, obj):
+        return pack_cursor([
+            self._model_field(key).value_to_string(obj) for key in self.keys
+        ])
+
+    def decode_cursor(self, cursor):
+        values = unpack_cursor(cursor, len(self.keys))
+        try:
+            return [
+                self._model_field(key).to_python(value)
+                for key, value in zip(self.keys, values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            raise InvalidCursor(cursor)
+
+    def get_keyset_page(self, after=None, before=None):
+        """Страница после курсора after, до курсора before или первая.
+
+        Испорченный курсор вместо ошибки дает первую страницу.
+        """
+        try:
+            if after:
+                return self._page_after(self.decode_cursor(after))
+            if before:
+                return self._page_before(self.decode_cursor(before))
+        except InvalidCursor:
+            pass
+        return self._page_after(None)
+
+    def _model_field(self, key):
+        return self.object_list.model._meta.get_field(key)
+
+    def _seek(self, values, lookup):
+        condition = Q()
+        for position in reversed(range(len(self.keys))):
+            equal = {
+                key: value for key, value in
+                zip(self.keys[:position], values[:position])
+            }
+            step = Q(**{f'{self.keys[position]}__{lookup}': values[position]})
+            condition = (Q(**equal) & step) | condition
+        return condition
+
+    def _rows(self, values, descending, limit):
+        """До limit записей за ключом values по убыванию или возрастанию."""
+        if descending:
+            queryset = self.object_list.order_by(
+                *(f'-{key}' for key in self.keys)
+            )
+            if values is not None:
+                queryset = queryset.filter(self._seek(values, 'lt'))
+        else:
+            queryset = self.object_list.order_by(*self.keys).filter(
+                self._seek(values, 'gt')
+            )
+        return list(queryset[:limit])
+
+    def _page_after(self, values):
+        rows = self._rows(values, True, self.per_page + 1)
+        items = rows[:self.per_page]
+        next_cursor = None
+        if len(rows) > self.per_page:
+            next_cursor = self.encode_cursor(items[-1])
+        previous_cursor = None
+        if values is not None and items:
+            previous_cursor = self.encode_cursor(items[0])
+        return KeysetPage(items, self, next_cursor, previous_cursor)
+
+    def _page_before(self, values):
+        rows = self._rows(values, False, self.per_page + 1)
+        items = rows[:self.per_page][::-1]
+        if not items:
+            return self._page_after(None)
+        previous_cursor = None
+        if len(rows) > self.per_page:
+            previous_cursor = self.encode_cursor(items[0])
+        next_cursor = self.encode_cursor(items[-1])
+        return KeysetPage(items, self, next_cursor, previous_cursor)
+
+
+class IdSequence:
+    """Готовый список id, который Paginator режет как обычный список.
+
+    Длина известна без COUNT, а объекты страницы достаются одним
+    запросом in_bulk в порядке списка.
+    """
+
+    def __init__(self, ids, queryset):
+        self.ids = ids
+        self.queryset = queryset
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ids[index]
+        objects = self.queryset.in_bulk(ids)
+        return [objects[pk] for pk in ids if pk in objects]
@@ -0,0 +1,337 @@
+"""Полнотекстовый поиск по постам.
+
+Индекс - отдельная таблица posts_post_search с документом на пост:
+текст поста, название и описание его группы. На SQLite это виртуальная
+таблица FTS5 (rowid - id поста, ранжирование bm25), на PostgreSQL -
+tsvector с GIN-индексом, где текст, название и описание группы
+получают веса A, B и C (ранжирование ts_rank_cd). Таблицу создает
+миграция 0012_post_search со своей копией DDL, в актуальном состоянии
+ее держат сигналы posts.signals, а rebuild_search_index пересобирает
+ее целиком - например, после update() в обход сигналов. На других
+базах индекса нет, и поиск сводится к LIKE по тем же полям без
+ранжирования.
+
+Запрос разбивается на слова, каждое ищется как префикс, и в документе
+должны встретиться все слова. Выдача идет по убыванию релевантности
+(score), страницы адресуются курсорами (score, id) без OFFSET.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .paginators import InvalidCursor, KeysetPaginator, pack_cursor
+from .paginators import unpack_cursor
+
+TABLE = 'posts_post_search'
+PG_CONFIG = 'russian'
+MAX_WORDS = 10
+
+_WORD_RE = re.compile(r'\w+')
+
+_DOCUMENTS = (
+    'FROM posts_post p LEFT JOIN posts_group g ON g.id = p.group_id '
+    'WHERE {where}'
+)
+
+
+def words(query):
+    """Слова запроса без операторов и кавычек - их синтаксис не нужен."""
+    return _WORD_RE.findall(query.lower())[:MAX_WORDS]
+
+
+class SqliteIndex:
+    """FTS5: текст, название и описание группы с весами bm25."""
+
+    weights = (1.0, 0.5, 0.2)
+
+    def create(self, cursor):
+        """Создает виртуальную таблицу FTS5."""
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE {TABLE} USING fts5('
+            'text, group_title, group_description, '
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def drop(self, cursor):
+        """Удаляет таблицу индекса."""
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def remove(self, cursor, post_ids):
+        """Удаляет документы постов."""
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid IN '
+            f'({", ".join(["%s"] * len(post_ids))})',
+            post_ids,
+        )
+
+    def index(self, cursor, where, params):
+        """Пересобирает документы постов по условию where."""
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid IN (SELECT p.id '
+            + _DOCUMENTS.format(where=where) + ')',
+            params,
+        )
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, group_title, '
+            'group_description) SELECT p.id, p.text, '
+            "COALESCE(g.title, ''), COALESCE(g.description, '') "
+            + _DOCUMENTS.format(where=where),
+            params,
+        )
+
+    def match(self, terms):
+        """Выражение MATCH: все слова как префиксы."""
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def hits(self, terms):
+        """Запрос найденных постов со score и параметры."""
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return (
+            f'SELECT p.id AS id, -bm25({TABLE}, {weights}) AS score, '
+            f'p.group_id AS group_id, p.author_id AS author_id '
+            f'FROM {TABLE} JOIN posts_post p ON p.id = {TABLE}.rowid '
+            f'WHERE {TABLE} MATCH %s',
+            [self.match(terms)],
+        )
+
+    def ids(self, terms):
+        """Запрос id найденных постов и параметры."""
+        return (
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+            [self.match(terms)],
+        )
+
+
+class PostgresIndex:
+    """tsvector с весами A/B/C и GIN-индекс."""
+
+    def create(self, cursor):
+        """Создает таблицу с tsvector и GIN-индекс."""
+        cursor.execute(
+            f'CREATE TABLE {TABLE} ('
+            'post_id integer PRIMARY KEY '
+            'REFERENCES posts_post (id) ON DELETE CASCADE, '
+            'document tsvector NOT NULL)'
+        )
+        cursor.execute(
+            f'CREATE INDEX {TABLE}_document ON {TABLE} USING GIN (document)'
+        )
+
+    def drop(self, cursor):
+        """Удаляет таблицу индекса."""
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def remove(self, cursor, post_ids):
+        """Удаляет документы постов."""
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE post_id = ANY(%s)', [list(post_ids)]
+        )
+
+    def index(self, cursor, where, params):
+        """Пересобирает документы постов по условию where."""
+        cursor.execute(
+            f'INSERT INTO {TABLE} (post_id, document) SELECT p.id, '
+            "setweight(to_tsvector(%s, p.text), 'A') || "
+            "setweight(to_tsvector(%s, COALESCE(g.title, '')), 'B') || "
+            "setweight(to_tsvector(%s, COALESCE(g.description, '')), 'C') "
+            + _DOCUMENTS.format(where=where)
+            + ' ON CONFLICT (post_id) DO UPDATE '
+            'SET document = EXCLUDED.document',
+            [PG_CONFIG] * 3 + list(params),
+        )
+
+    def match(self, terms):
+        """tsquery: все слова как префиксы."""
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def hits(self, terms):
+        """Запрос найденных постов со score и параметры."""
+        # float8: курсор должен вернуть в запрос ровно тот же score.
+        return (
+            'SELECT p.id AS id, '
+            'ts_rank_cd(s.document, q.query)::float8 AS score, '
+            'p.group_id AS group_id, p.author_id AS author_id '
+            f'FROM {TABLE} s JOIN posts_post p ON p.id = s.post_id, '
+            'to_tsquery(%s, %s) q(query) WHERE s.document @@ q.query',
+            [PG_CONFIG, self.match(terms)],
+        )
+
+    def ids(self, terms):
+        """Запрос id найденных постов и параметры."""
+        return (
+            f'SELECT post_id FROM {TABLE} '
+            'WHERE document @@ to_tsquery(%s, %s)',
+            [PG_CONFIG, self.match(terms)],
+        )
+
+
+class LikeIndex:
+    """Без индекса: LIKE по тем же полям, score у всех постов 0."""
+
+    def create(self, cursor):
+        """Таблицы нет."""
+
+    def drop(self, cursor):
+        """Таблицы нет."""
+
+    def remove(self, cursor, post_ids):
+        """Таблицы нет."""
+
+    def index(self, cursor, where, params):
+        """Таблицы нет."""
+
+    def _where(self, terms):
+        condition = ' AND '.join(
+            '(UPPER(p.text) LIKE UPPER(%s) OR UPPER(g.title) LIKE UPPER(%s) '
+            'OR UPPER(g.description) LIKE UPPER(%s))'
+            for _ in terms
+        )
+        params = []
+        for term in terms:
+            params.extend(
+                ['%' + connection.ops.prep_for_like_query(term) + '%'] * 3
+            )
+        return condition, params
+
+    def hits(self, terms):
+        """Запрос найденных постов с нулевым score и параметры."""
+        condition, params = self._where(terms)
+        return (
+            'SELECT p.id AS id, 0.0 AS score, p.group_id AS group_id, '
+            'p.author_id AS author_id '
+            + _DOCUMENTS.format(where=condition),
+            params,
+        )
+
+    def ids(self, terms):
+        """Запрос id найденных постов и параметры."""
+        condition, params = self._where(terms)
+        return 'SELECT p.id ' + _DOCUMENTS.format(where=condition), params
+
+
+INDEXES = {
+    'sqlite': SqliteIndex,
+    'postgresql': PostgresIndex,
+}
+
+
+def get_index(vendor=None):
+    """Индекс для базы vendor; по умолчанию - текущей."""
+    return INDEXES.get(vendor or connection.vendor, LikeIndex)()
+
+
+def index_posts(post_ids):
+    """Переиндексирует посты после сохранения."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    where = f'p.id IN ({", ".join(["%s"] * len(post_ids))})'
+    with connection.cursor() as cursor:
+        get_index().index(cursor, where, post_ids)
+
+
+def index_group(group_id):
+    """Переиндексирует посты группы - в их документах ее название."""
+    with connection.cursor() as cursor:
+        get_index().index(cursor, 'p.group_id = %s', [group_id])
+
+
+def remove_posts(post_ids):
+    """Удаляет посты из индекса."""
+    post_ids = list(post_ids)
+    if post_ids:
+        with connection.cursor() as cursor:
+            get_index().remove(cursor, post_ids)
+
+
+def rebuild():
+    """Пересобирает индекс с нуля; возвращает число постов."""
+    index = get_index()
+    with connection.cursor() as cursor:
+        index.drop(cursor)
+        index.create(cursor)
+        index.index(cursor, '1 = 1', [])
+    return Post.objects.count()
+
+
+def matching_ids(query):
+    """Подзапрос id постов по запросу - для filter(pk__in=...)."""
+    terms = words(query)
+    if not terms:
+        return RawSQL('SELECT id FROM posts_post', [])
+    return RawSQL(*get_index().ids(terms))
+
+
+def search(query, values=None, descending=True, limit=10, group_id=None,
+           author_id=None):
+    """До limit пар (id, score) за курсором values.
+
+    descending=True - следующие по убыванию (score, id), иначе
+    предыдущие по возрастанию; values=None - с начала выдачи.
+    """
+    terms = words(query)
+    if not terms:
+        return []
+    sql, params = get_index().hits(terms)
+    conditions = []
+    params = list(params)
+    if group_id is not None:
+        conditions.append('group_id = %s')
+        params.append(group_id)
+    if author_id is not None:
+        conditions.append('author_id = %s')
+        params.append(author_id)
+    sign = '<' if descending else '>'
+    if values is not None:
+        conditions.append(
+            f'(score {sign} %s OR (score = %s AND id {sign} %s))'
+        )
+        params.extend([values[0], values[0], values[1]])
+    order = 'DESC' if descending else 'ASC'
+    where = f'WHERE {" AND ".join(conditions)} ' if conditions else ''
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id, score FROM ({sql}) hits {where}'
+            f'ORDER BY score {order}, id {order} LIMIT %s',
+            params + [limit],
+        )
+        return cursor.fetchall()
+
+
+class SearchPaginator(KeysetPaginator):
+    """Keyset-пагинация выдачи поиска по (score, id).
+
+    object_list - QuerySet постов, из которого достаются найденные;
+    у постов страницы есть атрибут search_score.
+    """
+
+    def __init__(self, object_list, per_page, query, group_id=None,
+                 author_id=None):
+        """Выдача по запросу query с фильтрами group_id и author_id."""
+        super().__init__(object_list, per_page, keys=('score', 'id'))
+        self.query = query
+        self.filters = {'group_id': group_id, 'author_id': author_id}
+
+    def encode_cursor(self, obj):
+        """Курсор поста - его (score, id)."""
+        return pack_cursor([obj.search_score, obj.pk])
+
+    def decode_cursor(self, cursor):
+        """(score, id) из курсора; иначе InvalidCursor."""
+        score, pk = unpack_cursor(cursor, 2)
+        if not isinstance(score, (int, float)) or not isinstance(pk, int):
+            raise InvalidCursor(cursor)
+        return [float(score), pk]
+
+    def _rows(self, values, descending, limit):
+        hits = search(
+            self.query, values, descending, limit, **self.filters)
+        posts = self.object_list.in_bulk([pk for pk, _ in hits])
+        rows = []
+        for pk, score in hits:
+            if pk in posts:
+                posts[pk].search_score = score
+                rows.append(posts[pk])
+        return rows
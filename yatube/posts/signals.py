@@ -0,0 +1,203 @@
+import threading
+
+from django.db.models import DEFERRED
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+
+from . import caching, counters, following, graph, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+
+# id постов, которые удаляются в этом потоке: их комментарии уходят
+# каскадом, и пересчитывать для них счетчики и теги незачем.
+_deleting = threading.local()
+
+
+def _deleting_posts():
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = set()
+    return _deleting.posts
+
+
+def bump_follow_tags(follow):
+    # Профили обоих показывают счетчики подписок и кнопку подписки.
+    caching.bump(
+        caching.author_tag(follow.author.username),
+        caching.author_tag(follow.user.username),
+    )
+
+
+def _loaded(instance, field):
+    # Отложенное поле (only, defer) не читается: иначе каждый экземпляр
+    # догружал бы его отдельным запросом. Старое значение нужно только
+    # при сохранении - его прочитают load_post_group и load_group_slug.
+    return instance.__dict__.get(field, DEFERRED)
+
+
+@receiver(post_init, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    instance._initial_group_id = _loaded(instance, 'group_id')
+
+
+@receiver(post_init, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance._initial_slug = _loaded(instance, 'slug')
+
+
+@receiver(pre_save, sender=Post)
+def load_post_group(sender, instance, raw=False, **kwargs):
+    if not raw and instance._initial_group_id is DEFERRED:
+        instance._initial_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Group)
+def load_group_slug(sender, instance, raw=False, **kwargs):
+    if not raw and instance._initial_slug is DEFERRED:
+        instance._initial_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_user_counter(instance.author_id, 'posts_count', 1)
+        timeline.push_post(instance)
+    old_slugs = ()
+    initial_group_id = instance._initial_group_id
+    if initial_group_id not in (None, instance.group_id):
+        old_slugs = Group.objects.filter(
+            pk=initial_group_id
+        ).values_list('slug', flat=True)
+    search.index_posts([instance.pk])
+    caching.bump(*caching.post_tags(instance, *old_slugs))
+    instance._initial_group_id = instance.group_id
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post(sender, instance, **kwargs):
+    _deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _deleting_posts().discard(instance.pk)
+    counters.change_user_counter(instance.author_id, 'posts_count', -1)
+    search.remove_posts([instance.pk])
+    caching.bump(*caching.post_tags(instance))
+
+
+def bump_comment_tags(comment):
+    # Число комментариев видно во всех лентах, где есть пост.
+    caching.bump(*caching.post_tags(comment.post))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.comment_added(instance.post_id, instance.created)
+        bump_comment_tags(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # Каскад от удаления поста: post_deleted сбросит теги сам.
+    if instance.post_id in _deleting_posts():
+        return
+    counters.comment_removed(instance.post_id)
+    bump_comment_tags(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user_counter(instance.author_id, 'followers_count', 1)
+        counters.change_user_counter(instance.user_id, 'following_count', 1)
+        following.forget(instance.user_id)
+        graph.record([instance], followed=True)
+        timeline.followers_changed(instance.author_id, followed=True)
+        timeline.backfill(instance.user_id, instance.author_id)
+        bump_follow_tags(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'followers_count', -1)
+    counters.change_user_counter(instance.user_id, 'following_count', -1)
+    following.forget(instance.user_id)
+    graph.record([instance], followed=False)
+    timeline.followers_changed(instance.author_id, followed=False)
+    timeline.prune(instance.user_id, instance.author_id)
+    bump_follow_tags(instance)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    # Название и описание группы входят в документы поиска ее постов.
+    if not created and not raw:
+        search.index_group(instance.pk)
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_posts(sender, instance, **kwargs):
+    # SET_NULL обнулит group_id постов без сигналов.
+    instance._post_ids = list(instance.posts.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    search.index_posts(instance._post_ids)
+
+
+def _group_authors(group):
+    # После удаления у постов группы уже нет group_id - берем id,
+    # запомненные в remember_group_posts.
+    if hasattr(group, '_post_ids'):
+        posts = Post.objects.filter(pk__in=group._post_ids)
+    else:
+        posts = group.posts.all()
+    return posts.order_by().values_list(
+        'author__username', flat=True).distinct()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tags = [caching.FEED, caching.group_tag(instance.slug)]
+        # Удаление не проходит pre_save, и старый slug бывает неизвестен.
+        if instance._initial_slug not in (DEFERRED, None):
+            tags.append(caching.group_tag(instance._initial_slug))
+        # Название и ссылка группы видны в профилях авторов ее постов.
+        tags.extend(
+            caching.author_tag(username)
+            for username in _group_authors(instance)
+        )
+        caching.bump(*tags)
+        instance._initial_slug = instance.slug
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, raw=False, update_fields=None,
+                 **kwargs):
+    # Вход пользователя обновляет только last_login - ленты не меняются.
+    if raw or update_fields == frozenset(('last_login',)):
+        return
+    if created:
+        # Под этим именем мог быть закэширован профиль удаленного автора.
+        caching.bump(caching.author_tag(instance.username))
+        return
+    # Имя автора видно и в лентах групп, где есть его посты.
+    slugs = Group.objects.filter(posts__author=instance).order_by(
+    ).values_list('slug', flat=True).distinct()
+    caching.bump(
+        caching.FEED,
+        caching.author_tag(instance.username),
+        *(caching.group_tag(slug) for slug in slugs),
+    )
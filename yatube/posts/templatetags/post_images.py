@@ -0,0 +1,50 @@
+from django import template
+from django.conf import settings
+from django.utils.html import format_html_join
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+def _srcset(variants):
+    return format_html_join(
+        ', ', '{} {}w', ((variant.url, variant.width) for variant in variants)
+    )
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(image, sizes=None):
+    """<picture> с вариантами POST_IMAGE_VARIANTS в srcset.
+
+    Последний формат из настроек - запасной для <img>, остальные идут
+    в <source>. Пока запасных вариантов нет, выводится заглушка.
+    """
+    if not image:
+        return {}
+    config = settings.POST_IMAGE_VARIANTS
+    found, complete = thumbnails.ready_variants(image)
+    if not complete:
+        thumbnails.enqueue(image.name)
+    formats = thumbnails.image_formats()
+    fallback = found.get(formats[-1]) if formats else None
+    if not fallback:
+        aspect_width, aspect_height = config['aspect']
+        width = config['default_width']
+        return {'img': thumbnails.Placeholder(
+            f'{width}x{round(width * aspect_height / aspect_width)}')}
+    return {
+        'sources': [
+            {
+                'type': thumbnails.MIME_TYPES[image_format],
+                'srcset': _srcset(found[image_format]),
+            }
+            for image_format in formats[:-1] if image_format in found
+        ],
+        'img': min(
+            fallback,
+            key=lambda variant: abs(variant.width - config['default_width'])
+        ),
+        'srcset': _srcset(fallback),
+        'sizes': sizes or config['sizes'],
+    }
@@ -0,0 +1,43 @@
+from django.test import TestCase
+
+from .. import benchmark
+
+
+class BenchmarkTests(TestCase):
+    def test_run_measures_every_view(self):
+        """Прогон возвращает все метрики для всех страниц."""
+        benchmark.seed(users=5, groups=2, posts=30, comments=30, follows=3)
+        results = benchmark.run(iterations=2, warmup=1)
+        self.assertEqual(set(results), {
+            'index', 'group_list', 'profile', 'post_detail',
+            'follow_index', 'add_comment', 'post_create', 'profile_follow',
+        })
+        for name, metrics in results.items():
+            with self.subTest(view=name):
+                self.assertEqual(set(metrics), set(benchmark.METRICS))
+                self.assertGreater(metrics['queries'], 0)
+        self.assertGreater(results['index']['template_ms'], 0)
+
+    def test_compare_reports_regressions(self):
+        """Регрессией считается рост сверх допуска."""
+        baseline = {'index': {
+            'queries': 3, 'sql_ms': 1.0, 'template_ms': 5.0,
+            'p50_ms': 10.0, 'p90_ms': 12.0, 'p99_ms': 20.0,
+        }}
+        same = {'index': dict(baseline['index'], p50_ms=12.0)}
+        self.assertEqual(benchmark.compare(baseline, same, slack_ms=0), [])
+        worse = {'index': dict(baseline['index'], queries=4, p50_ms=13.0)}
+        regressions = benchmark.compare(baseline, worse, slack_ms=0)
+        self.assertEqual(len(regressions), 2)
+        self.assertEqual(
+            benchmark.compare(baseline, worse, tolerance=0.5,
+                              query_tolerance=1, slack_ms=0),
+            []
+        )
+
+    def test_percentile(self):
+        """Перцентиль считается по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 0.5), 50)
+        self.assertEqual(benchmark.percentile(values, 0.99), 99)
+        self.assertEqual(benchmark.percentile([7], 0.9), 7)
@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PER_PAGE=2)
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(
+            author=User.objects.create_user(username='author'), text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader{number}'),
+                text=f'Комментарий {number}',
+            )
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.url = reverse('posts:post_comments', args=[self.post.pk])
+
+    def test_post_detail_renders_first_page(self):
+        """На странице поста - первая страница комментариев и «еще»."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        self.assertEqual(
+            list(response.context['comments']), self.comments[:-3:-1])
+        self.assertContains(response, 'load-more-comments')
+        self.assertContains(response, f'{self.url}?after=')
+
+    def test_fragments_continue_without_repeats(self):
+        """Фрагменты по курсорам отдают остальные комментарии по разу."""
+        seen = []
+        params = {}
+        while True:
+            with self.assertNumQueries(3):
+                response = self.client.get(self.url, params)
+            self.assertNotContains(response, '<html')
+            page = response.context['comments']
+            seen.extend(page)
+            if not page.has_next():
+                break
+            params = {'after': page.next_cursor}
+        self.assertEqual(seen, self.comments[::-1])
+        self.assertNotContains(response, 'load-more-comments')
+
+    def test_json_page(self):
+        """?format=json отдает комментарии и курсор."""
+        data = self.client.get(self.url, {'format': 'json'}).json()
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Комментарий 4', 'Комментарий 3'],
+        )
+        self.assertEqual(data['results'][0]['author'], 'reader4')
+        data = self.client.get(
+            self.url, {'format': 'json', 'after': data['next']}).json()
+        self.assertEqual(data['results'][0]['text'], 'Комментарий 2')
@@ -0,0 +1,153 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import replicas
+
+from .. import graph
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.id]),
+        )
+
+    def test_matching_etag_returns_304_without_rendering(self):
+        """Совпавший ETag дает 304 без шаблонов."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_fresh_changes_are_read_from_primary(self):
+        """Сразу после сдвига тегов страница читается с default."""
+        Post.objects.create(author=self.author, text='Новый пост')
+        with mock.patch(
+            'core.replicas.primary_reads', wraps=replicas.primary_reads
+        ) as primary_reads:
+            self.guest_client.get(self.urls[0])
+            self.assertEqual(primary_reads.call_count, 1)
+            with mock.patch(
+                'core.replicas.time.time', return_value=time.time() + 60
+            ):
+                self.guest_client.get(self.urls[0])
+            self.assertEqual(primary_reads.call_count, 1)
+
+    def test_write_changes_etag(self):
+        """Новый пост и комментарий меняют ETag зависимых страниц."""
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        Post.objects.create(author=self.author, group=self.group, text='Еще')
+        Comment.objects.create(post=self.post, author=self.author, text='Ок')
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def assert_refreshed(self, url, etag, text):
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, text)
+
+    def test_author_rename_changes_group_etag(self):
+        """Имя автора в группе и ее ленте обновляется, а не 304."""
+        urls = (
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:group_rss', args=[self.group.slug]),
+        )
+        etags = {url: self.guest_client.get(url)['ETag'] for url in urls}
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Переименованный'
+        author.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                self.assert_refreshed(url, etag, 'Переименованный')
+
+    def test_group_rename_changes_author_etag(self):
+        """Группа в профиле и ленте автора обновляется, а не 304."""
+        urls = (
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:author_rss', args=[self.author.username]),
+        )
+        etags = {url: self.guest_client.get(url)['ETag'] for url in urls}
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.title = 'Новое название'
+        group.save()
+        self.assert_refreshed(urls[0], etags[urls[0]], '/group/renamed/')
+        self.assert_refreshed(urls[1], etags[urls[1]], 'Новое название')
+
+    def test_profile_etag_follows_viewer_and_graph(self):
+        """ETag профиля для зрителя сдвигают его подписки и граф."""
+        viewer = User.objects.create_user(username='viewer')
+        other = User.objects.create_user(username='other')
+        client = Client()
+        client.force_login(viewer)
+        url = reverse('posts:profile', args=[self.author.username])
+        etag = client.get(url)['ETag']
+        Follow.objects.create(user=viewer, author=other)
+        self.assertNotEqual(client.get(url)['ETag'], etag)
+        etag = client.get(url)['ETag']
+        graph.rebuild()
+        self.assertNotEqual(client.get(url)['ETag'], etag)
+
+    def test_page_and_user_are_part_of_etag(self):
+        """У разных страниц и пользователей разные ETag."""
+        url = reverse('posts:index')
+        authorized_client = Client()
+        authorized_client.force_login(self.author)
+        etags = {
+            self.guest_client.get(url)['ETag'],
+            self.guest_client.get(url + '?page=2')['ETag'],
+            authorized_client.get(url)['ETag'],
+        }
+        self.assertEqual(len(etags), 3)
+
+    def test_if_modified_since_sees_deletes(self):
+        """Удаление поста сдвигает Last-Modified ленты."""
+        url = reverse('posts:group_list', args=[self.group.slug])
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Удалим')
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+        later = time.time() + 5
+        with mock.patch('posts.caching.time.time', return_value=later):
+            post.delete()
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_modified_is_updated_on_save(self):
+        """Post.modified обновляется при редактировании."""
+        post = Post.objects.create(author=self.author, text='Текст')
+        modified = post.modified
+        post.text = 'Новый текст'
+        post.save()
+        self.assertGreater(post.modified, modified)
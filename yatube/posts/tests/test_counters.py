@@ -0,0 +1,112 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_creates_and_deletes(self):
+        """Счетчики меняются вместе с Post, Comment и Follow."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Post.objects.create(author=self.author, text='Еще пост')
+        self.client.post(
+            reverse('posts:add_comment', args=[post.id]), {'text': 'Ок'})
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+
+        Comment.objects.all().delete()
+        post.delete()
+        Follow.objects.all().delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_last_commented_follows_comments(self):
+        """last_commented - время самого нового из оставшихся комментариев."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        first = Comment.objects.create(
+            post=post, author=self.reader, text='Первый')
+        second = Comment.objects.create(
+            post=post, author=self.reader, text='Второй')
+        post.refresh_from_db()
+        self.assertEqual(post.last_commented, second.created)
+        second.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.last_commented, first.created)
+        first.delete()
+        post.refresh_from_db()
+        self.assertIsNone(post.last_commented)
+
+    def test_post_delete_cost_does_not_grow_with_comments(self):
+        """Удаление поста не обрабатывает каждый комментарий отдельно."""
+        queries = []
+        for total in (1, 5):
+            post = Post.objects.create(author=self.author, text='Пост')
+            for number in range(total):
+                Comment.objects.create(
+                    post=post, author=self.reader, text=f'Ответ {number}')
+            with CaptureQueriesContext(connection) as context:
+                post.delete()
+            queries.append(len(context.captured_queries))
+        self.assertEqual(queries[0], queries[1])
+        comment_post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=comment_post, author=self.reader, text='Комментарий')
+        comment.delete()
+        comment_post.refresh_from_db()
+        self.assertEqual(comment_post.comments_count, 0)
+
+    def test_profile_reads_counters(self):
+        """Профиль берет число постов из счетчика, а не из COUNT."""
+        Post.objects.create(author=self.author, text='Пост')
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username]))
+        self.assertEqual(response.context['count_posts'], 42)
+
+    def test_reconcile_counters_repairs_drift(self):
+        """reconcile_counters пересчитывает разошедшиеся счетчики."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.all().update(
+            posts_count=7, followers_count=7, following_count=7)
+        UserStats.objects.filter(user=self.reader).delete()
+        Post.objects.update(comments_count=7, last_commented=None)
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.last_commented, post.comments.get().created)
+        author_stats = self.stats(self.author)
+        self.assertEqual(
+            (author_stats.posts_count, author_stats.followers_count,
+             author_stats.following_count),
+            (1, 1, 0)
+        )
+        self.assertEqual(self.stats(self.reader).following_count, 1)
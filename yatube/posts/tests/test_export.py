@@ -0,0 +1,95 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=group,
+            image='posts/photo.jpg')
+        Post.objects.create(author=cls.other, text='Чужой пост')
+        Comment.objects.create(
+            post=cls.post, author=cls.author, text='Свой комментарий')
+        Comment.objects.create(
+            post=cls.post, author=cls.other, text='Чужой комментарий')
+        cls.url = reverse('posts:profile_export', args=['author'])
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def tmp_file(self, content):
+        descriptor, path = tempfile.mkstemp(suffix='.ndjson')
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as target:
+            target.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_ndjson_streams_posts_and_comments(self):
+        """NDJSON - посты и комментарии пользователя построчно."""
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [
+            json.loads(line) for line in
+            b''.join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual(
+            [(row['type'], row['text']) for row in rows],
+            [('post', 'Пост'), ('comment', 'Свой комментарий')],
+        )
+        self.assertEqual(rows[0]['group'], 'group')
+        self.assertEqual(rows[0]['image_url'], '/media/posts/photo.jpg')
+        self.assertEqual(rows[1]['post'], self.post.pk)
+
+    def test_csv_has_header(self):
+        """CSV начинается с заголовка полей."""
+        response = self.client.get(self.url, {'format': 'csv'})
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([row['type'] for row in rows], ['post', 'comment'])
+        self.assertIn('attachment; filename="author.csv"',
+                      response['Content-Disposition'])
+
+    def test_only_owner_and_staff_can_export(self):
+        """Чужую выгрузку видят только сотрудники."""
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.other.is_staff = True
+        self.other.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_export_roundtrips_through_import(self):
+        """Выгрузку принимает import_content."""
+        out = StringIO()
+        call_command('export_content', 'author', stdout=out)
+        Post.objects.filter(author=self.author).delete()
+        source = self.tmp_file(out.getvalue())
+        call_command('import_content', source, stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.filter(author=self.author).values_list(
+                'pk', 'text')),
+            [(self.post.pk, 'Пост')],
+        )
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).image, 'posts/photo.jpg')
+        self.assertTrue(Comment.objects.filter(
+            post=self.post.pk, text='Свой комментарий').exists())
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание группы')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост в группе')
+        cls.other = Post.objects.create(
+            author=User.objects.create_user(username='other'),
+            text='Пост без группы')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.feeds = (
+            reverse('posts:feed_rss'),
+            reverse('posts:feed_atom'),
+            reverse('posts:group_rss', args=[self.group.slug]),
+            reverse('posts:group_atom', args=[self.group.slug]),
+            reverse('posts:author_rss', args=[self.author.username]),
+            reverse('posts:author_atom', args=[self.author.username]),
+        )
+
+    def test_feeds_list_matching_posts(self):
+        """Ленты групп и авторов отдают только свои посты."""
+        post_url = reverse('posts:post_detail', args=[self.post.pk])
+        other_url = reverse('posts:post_detail', args=[self.other.pk])
+        for url in self.feeds:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, post_url)
+                if url.startswith('/feed/'):
+                    self.assertContains(response, other_url)
+                else:
+                    self.assertNotContains(response, other_url)
+        self.assertEqual(
+            self.client.get(self.feeds[1])['Content-Type'],
+            'application/atom+xml; charset=utf-8',
+        )
+
+    def test_unknown_group_is_404(self):
+        """Лента несуществующей группы - 404."""
+        response = self.client.get(reverse('posts:group_rss', args=['no']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed_is_cached_until_post_saved(self):
+        """Лента отдается из кэша, пока не сохранен пост."""
+        url = self.feeds[2]
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        Post.objects.create(
+            author=self.author, group=self.group, text='Свежий пост')
+        self.assertContains(self.client.get(url), 'Свежий пост')
+
+    def test_conditional_get(self):
+        """Совпавший ETag дает 304, новый пост - новую ленту."""
+        url = self.feeds[4]
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
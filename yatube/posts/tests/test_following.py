@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..following import followed_ids
+from ..graph import who_to_follow
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowingCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+        for author in reversed(cls.authors[:2]):
+            Follow.objects.create(user=cls.reader, author=author)
+        Post.objects.create(author=cls.authors[2], text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_followed_ids_sorted_and_cached(self):
+        """Подписки - отсортированный массив, второй раз без запроса."""
+        expected = sorted(author.pk for author in self.authors[:2])
+        self.assertEqual(followed_ids(self.reader.pk).tolist(), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(followed_ids(self.reader.pk).tolist(), expected)
+
+    def test_late_fill_does_not_hide_follow(self):
+        """Список, прочитанный до подписки, не переживает ее."""
+        author = self.authors[2]
+        real_set = cache.set
+
+        def set_after_follow(key, value, timeout):
+            # Подписка коммитится между чтением Follow и cache.set.
+            if not Follow.objects.filter(author=author).exists():
+                Follow.objects.create(user=self.reader, author=author)
+            real_set(key, value, timeout)
+
+        with mock.patch.object(cache, 'set', side_effect=set_after_follow):
+            self.assertNotIn(author.pk, followed_ids(self.reader.pk))
+        self.assertIn(author.pk, followed_ids(self.reader.pk))
+
+    def test_follow_and_unfollow_reset_cache(self):
+        """profile_follow и profile_unfollow сбрасывают кэш подписок."""
+        author = self.authors[2]
+        profile = reverse('posts:profile', args=[author.username])
+        self.assertFalse(self.client.get(profile).context['following'])
+        self.client.get(
+            reverse('posts:profile_follow', args=[author.username]))
+        self.assertIn(author.pk, followed_ids(self.reader.pk))
+        self.assertTrue(self.client.get(profile).context['following'])
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[author.username]))
+        self.assertNotIn(author.pk, followed_ids(self.reader.pk))
+        self.assertFalse(self.client.get(profile).context['following'])
+
+    def test_profile_does_not_query_follow(self):
+        """Проверка подписки в профиле читает кэш, а не Follow."""
+        followed_ids(self.reader.pk)
+        who_to_follow(self.reader)
+        profile = reverse('posts:profile', args=[self.authors[0].username])
+        with self.assertNumQueries(4) as context:
+            response = self.client.get(profile)
+        self.assertTrue(response.context['following'])
+        self.assertFalse(any(
+            'posts_follow' in query['sql']
+            for query in context.captured_queries
+        ))
+
+    def test_list_pages_get_follow_buttons(self):
+        """Ленты отдают список подписок для кнопок, аноним - нет."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['follow_buttons'], {
+            'user': self.reader.pk,
+            'authors': sorted(author.pk for author in self.authors[:2]),
+        })
+        self.assertContains(response, 'id="follow-buttons"')
+        self.assertContains(response, 'data-author="%d"' % self.authors[2].pk)
+        self.client.logout()
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'id="follow-buttons"')
+
+    def test_follow_changes_feed_etag(self):
+        """После подписки лента не отвечает 304 со старыми кнопками."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        self.client.get(reverse(
+            'posts:profile_follow', args=[self.authors[2].username]))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,155 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import benchmark_graph, graph
+from ..graph import FollowGraph
+from ..models import Follow, FollowEvent
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    def setUp(self):
+        # 1 и 2 взаимны; 1 и 2 читают 3, 2 и 3 читают 4, 5 читает 3.
+        self.graph = FollowGraph([
+            (1, 2), (2, 1), (1, 3), (2, 3), (2, 4), (3, 4), (5, 3),
+        ])
+
+    def test_checks_and_degrees(self):
+        """Подписка, взаимность и степени читаются из CSR."""
+        self.assertTrue(self.graph.follows(1, 3))
+        self.assertFalse(self.graph.follows(3, 1))
+        self.assertTrue(self.graph.is_mutual(2, 1))
+        self.assertFalse(self.graph.is_mutual(1, 3))
+        self.assertEqual(self.graph.followers_count(3), 3)
+        self.assertEqual(self.graph.following_count(2), 3)
+        self.assertEqual(self.graph.followers_count(100), 0)
+
+    def test_suggestions_rank_friends_of_friends(self):
+        """Подсказки - авторы ваших авторов, затем популярные."""
+        self.assertEqual(self.graph.suggestions(1), [(4, 2)])
+        self.assertEqual(
+            self.graph.suggestions(5, limit=3), [(4, 1), (1, 0), (2, 0)])
+        self.assertEqual(self.graph.suggestions(6, limit=1), [(3, 0)])
+
+    def test_changes_overlay_csr(self):
+        """Подписки и отписки после загрузки видны без пересборки."""
+        self.graph.apply(1, 4, True)
+        self.graph.apply(1, 3, False)
+        self.graph.apply(7, 1, True)
+        self.assertTrue(self.graph.follows(1, 4))
+        self.assertFalse(self.graph.follows(1, 3))
+        self.assertEqual(self.graph.following.row(1), [2, 4])
+        self.assertEqual(self.graph.followers_count(1), 2)
+        self.assertEqual(self.graph.followers_count(3), 2)
+        self.graph.apply(1, 3, True)
+        self.graph.apply(1, 4, False)
+        self.assertEqual(self.graph.following.row(1), [2, 3])
+        self.assertEqual(self.graph.changes(), 1)
+
+    def test_benchmark(self):
+        """Замер графа возвращает все метрики."""
+        results = benchmark_graph.graph_run(edges=500, users=100, checks=50)
+        self.assertEqual(results['edges'], 500)
+        self.assertGreater(results['memory_mb'], 0)
+
+
+@override_settings(GRAPH_REFRESH_INTERVAL=0)
+class WhoToFollowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.friend, cls.star = [
+            User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'star')
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.friend)
+        Follow.objects.create(user=cls.friend, author=cls.star)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_follows_are_logged_and_applied(self):
+        """Подписки попадают в журнал, и граф дочитывает его."""
+        current = graph.get_graph()
+        Follow.objects.create(user=self.star, author=self.reader)
+        self.assertTrue(FollowEvent.objects.filter(
+            user_id=self.star.pk, author_id=self.reader.pk, followed=True
+        ).exists())
+        self.assertIs(graph.get_graph(), current)
+        self.assertTrue(current.follows(self.star.pk, self.reader.pk))
+        Follow.objects.filter(user=self.star).delete()
+        self.assertFalse(
+            graph.get_graph().follows(self.star.pk, self.reader.pk))
+
+    def test_refresh_rereads_events_committed_out_of_order(self):
+        """Событие с меньшим id, зафиксированное позже, не теряется."""
+        current = graph.load()
+        late = FollowEvent.objects.create(
+            user_id=self.star.pk, author_id=self.reader.pk, followed=True)
+        # Как если бы событие с большим id зафиксировали раньше.
+        current.event_id = late.pk + 1
+        graph.refresh(current)
+        self.assertTrue(current.follows(self.star.pk, self.reader.pk))
+        self.assertEqual(current.event_id, late.pk + 1)
+        graph.refresh(current)
+        self.assertTrue(current.follows(self.star.pk, self.reader.pk))
+
+    def test_rebuild_reloads_graph_in_background(self):
+        """Пересборка идет в фоне, запрос получает старый граф."""
+        current = graph.get_graph()
+        graph.rebuild()
+        started = []
+        with mock.patch.object(
+            graph, '_can_reload_in_background', return_value=True
+        ), mock.patch.object(graph, '_in_background', started.append):
+            self.assertIs(graph.get_graph(), current)
+            self.assertIs(graph.get_graph(), current)
+        self.assertEqual(started, [graph._reload])
+        started[0]()
+        self.assertIsNot(graph.get_graph(), current)
+
+    def test_prune_command_removes_old_events(self):
+        """prune_follow_events удаляет старые события, граф их не трогает."""
+        Follow.objects.create(user=self.star, author=self.reader)
+        FollowEvent.objects.update(
+            created=timezone.now() - datetime.timedelta(days=2))
+        graph.rebuild()
+        graph.get_graph()
+        self.assertTrue(FollowEvent.objects.exists())
+        call_command('prune_follow_events', stdout=StringIO())
+        self.assertFalse(FollowEvent.objects.exists())
+
+    def test_block_on_follow_index_and_profile(self):
+        """Блок «Кого почитать» на ленте подписок и в профиле."""
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            response.context['who_to_follow'],
+            [{'username': 'star', 'full_name': '', 'mutual': 1}],
+        )
+        self.assertContains(response, 'Кого почитать')
+        response = self.client.get(
+            reverse('posts:profile', args=['friend']))
+        self.assertEqual(len(response.context['who_to_follow']), 1)
+
+    def test_follow_resets_suggestions(self):
+        """Подписка убирает автора из подсказок сразу."""
+        graph.who_to_follow(self.reader)
+        self.client.get(reverse('posts:profile_follow', args=['star']))
+        self.assertEqual(graph.who_to_follow(self.reader), [])
+
+    def test_profile_shows_reverse_follow(self):
+        """Профиль отмечает, что автор подписан на зрителя."""
+        profile = reverse('posts:profile', args=['friend'])
+        self.assertNotContains(self.client.get(profile), 'Подписан на вас')
+        Follow.objects.create(user=self.friend, author=self.reader)
+        self.assertContains(self.client.get(profile), 'Подписан на вас')
@@ -0,0 +1,61 @@
+import datetime as dt
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class HotThreadsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.quiet = Post.objects.create(author=cls.author, text='Тихий пост')
+        cls.old = Post.objects.create(author=cls.author, text='Старый')
+        cls.fresh = Post.objects.create(author=cls.author, text='Свежий')
+        Comment.objects.create(post=cls.fresh, author=cls.author, text='Да')
+        Comment.objects.create(post=cls.old, author=cls.author, text='Нет')
+        # Комментарий к свежему посту оказывается позже - он выше в списке.
+        Post.objects.filter(pk=cls.fresh.pk).update(
+            last_commented=timezone.now() + dt.timedelta(minutes=1))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_hot_orders_by_last_comment(self):
+        """В обсуждениях только посты с комментариями, свежие сверху."""
+        response = self.client.get(reverse('posts:hot'))
+        self.assertEqual(
+            list(response.context['page_obj']), [self.fresh, self.old])
+        self.assertContains(response, 'Горячие обсуждения')
+
+    def test_hot_keyset_cursor(self):
+        """Курсор ?after= ведет по (last_commented, id)."""
+        with self.settings(PAGINATOR_VALUE=1, KEYSET_PAGINATION=True):
+            first = self.client.get(reverse('posts:hot'))
+            cursor = first.context['page_obj'].next_cursor
+            second = self.client.get(reverse('posts:hot'), {'after': cursor})
+        self.assertEqual(list(second.context['page_obj']), [self.old])
+
+    def test_feed_shows_counts_without_extra_queries(self):
+        """Число комментариев в ленте берется из поста, без запроса на пост."""
+        for number in range(5):
+            Comment.objects.create(
+                post=self.quiet, author=self.author, text=f'Ответ {number}')
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Комментариев: 5')
+        self.assertContains(response, 'Комментариев: 1', count=2)
+
+    def test_new_comment_refreshes_cached_feed(self):
+        """Новый комментарий сбрасывает кэш лент, где виден пост."""
+        self.client.get(reverse('posts:index'))
+        Comment.objects.create(post=self.quiet, author=self.author, text='!')
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Комментариев: 0')
@@ -0,0 +1,190 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import importing, search
+from ..models import (
+    Comment, Follow, Group, ImportCheckpoint, Post, TimelineEntry,
+)
+
+User = get_user_model()
+
+
+class ImportContentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, lines):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as target:
+            target.write('\n'.join(lines) + '\n')
+        return path
+
+    def ndjson(self, records):
+        return self.write(
+            'content.ndjson',
+            [json.dumps(record, ensure_ascii=False) for record in records],
+        )
+
+    def run_import(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_content', path, stdout=out, stderr=err,
+                     **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_updates_derived_data(self):
+        """После импорта верны счетчики, ленты и поиск, даты сохранены."""
+        path = self.ndjson([
+            {'type': 'follow', 'user': 'reader', 'author': 'leo'},
+            {'type': 'post', 'id': 500, 'author': 'leo', 'group': 'group',
+             'text': 'Импортированный пост',
+             'pub_date': '2015-03-01T10:00:00'},
+            {'type': 'comment', 'post': 500, 'author': 'reader',
+             'text': 'Комментарий'},
+        ])
+        out, err = self.run_import(path, batch_size=2)
+        self.assertEqual(err, '')
+        self.assertIn('Импортировано: 3', out)
+        post = Post.objects.select_related('author__stats').get(pk=500)
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.author.stats.posts_count, 1)
+        self.assertEqual(post.author.stats.followers_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(
+            [pk for pk, _ in search.search('импортированный')], [500])
+        self.assertFalse(post.author.has_usable_password())
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_bad_records_are_reported_and_skipped(self):
+        """Испорченные записи пропускаются с номером строки."""
+        path = self.write('content.ndjson', [
+            '{"type": "post", "author": "leo", "text": "Хороший"}',
+            '{not json',
+            '{"type": "post", "author": "leo", "text": "x", "group": "no"}',
+            '{"type": "comment", "post": 999, "author": "leo", "text": "x"}',
+            '{"type": "follow", "user": "leo", "author": "leo"}',
+        ])
+        out, err = self.run_import(path)
+        self.assertIn('Импортировано: 1, пропущено: 4', out)
+        for number in range(2, 6):
+            self.assertIn(f'Запись {number}:', err)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_csv_needs_type(self):
+        """CSV импортируется с --type."""
+        path = self.write('follows.csv', [
+            'user,author', 'reader,leo', 'reader,ann'])
+        self.run_import(path, type='follow')
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader).count(), 2)
+
+    def test_resume_from_checkpoint(self):
+        """Импорт продолжается после записи из контрольной точки."""
+        path = self.ndjson([
+            {'type': 'post', 'author': 'leo', 'text': f'Пост {number}'}
+            for number in range(1, 6)
+        ])
+        ImportCheckpoint.objects.create(
+            path=os.path.abspath(path), position=3, imported=3)
+        out, _ = self.run_import(path, chunk_size=1)
+        self.assertIn('Продолжаем после записи 3', out)
+        self.assertIn('Импортировано: 5', out)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Пост 4', 'Пост 5'],
+        )
+
+    def test_dates_are_kept_without_explicit_ids(self):
+        """Даты записей без id сохраняются, auto_now их не затирает."""
+        path = self.ndjson([
+            {'type': 'post', 'author': 'leo', 'text': 'Старый',
+             'pub_date': '2012-05-01T10:00:00'},
+            {'type': 'post', 'author': 'leo', 'text': 'Новый',
+             'pub_date': '2016-05-01T10:00:00'},
+            {'type': 'post', 'id': 700, 'author': 'leo', 'text': 'Явный',
+             'pub_date': '2014-05-01T10:00:00'},
+            {'type': 'comment', 'post': 700, 'author': 'leo', 'text': 'x',
+             'created': '2013-01-01T10:00:00'},
+        ])
+        self.run_import(path)
+        years = dict(Post.objects.values_list('text', 'pub_date__year'))
+        self.assertEqual(
+            years, {'Старый': 2012, 'Новый': 2016, 'Явный': 2014})
+        self.assertEqual(
+            list(Post.objects.values_list('modified__year', flat=True)
+                 .order_by('pub_date')),
+            [2012, 2014, 2016],
+        )
+        self.assertEqual(Comment.objects.get().created.year, 2013)
+
+    def test_existing_rows_are_skipped_not_counted(self):
+        """Повтор id или подписки - пропуск, а не импорт."""
+        path = self.ndjson([
+            {'type': 'post', 'id': 10, 'author': 'leo', 'text': 'Пост'},
+            {'type': 'post', 'id': 10, 'author': 'leo', 'text': 'Повтор'},
+            {'type': 'follow', 'user': 'reader', 'author': 'leo'},
+            {'type': 'follow', 'user': 'reader', 'author': 'leo'},
+        ])
+        out, err = self.run_import(path)
+        self.assertIn('Импортировано: 2, пропущено: 2', out)
+        self.assertIn('пост 10 уже есть', err)
+        out, _ = self.run_import(path)
+        self.assertIn('Импортировано: 0, пропущено: 4', out)
+        self.assertEqual(Post.objects.get(pk=10).text, 'Пост')
+
+    def test_failed_chunk_keeps_checkpoint_consistent(self):
+        """Сбой откатывает пачку вместе с точкой: повтор без дублей."""
+        path = self.ndjson([
+            {'type': 'post', 'author': 'leo', 'text': f'Пост {number}'}
+            for number in range(1, 5)
+        ])
+        original = importing.Importer.import_chunk
+        calls = []
+
+        def crash_on_second(importer, records):
+            calls.append(records)
+            result = original(importer, records)
+            if len(calls) == 2:
+                raise RuntimeError('сбой')
+            return result
+
+        with mock.patch.object(
+            importing.Importer, 'import_chunk', crash_on_second
+        ):
+            with self.assertRaises(RuntimeError):
+                self.run_import(path, chunk_size=2)
+        self.assertEqual(ImportCheckpoint.objects.get().position, 2)
+        self.assertEqual(Post.objects.count(), 2)
+        out, _ = self.run_import(path, chunk_size=2)
+        self.assertIn('Импортировано: 4', out)
+        self.assertEqual(Post.objects.count(), 4)
+
+    def test_sequences_are_reset_in_every_chunk(self):
+        """Последовательности id сдвигаются в транзакции каждой пачки."""
+        path = self.ndjson([
+            {'type': 'post', 'id': 100 + number, 'author': 'leo',
+             'text': f'Пост {number}'}
+            for number in range(4)
+        ])
+        with mock.patch.object(
+            importing.Importer, 'reset_sequences', autospec=True
+        ) as reset_sequences:
+            self.run_import(path, chunk_size=2)
+        self.assertEqual(reset_sequences.call_count, 2)
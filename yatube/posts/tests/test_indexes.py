@@ -0,0 +1,106 @@
+import re
+import unittest
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import trending
+from ..graph import get_graph
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?posts_\w+$')
+
+
+def query_plans(queries):
+    """EXPLAIN QUERY PLAN для каждого SELECT из CaptureQueriesContext."""
+    plans = []
+    with connection.cursor() as cursor:
+        for query in queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+            plans.append(
+                (query['sql'], [row[-1] for row in cursor.fetchall()])
+            )
+    return plans
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'планы SQLite')
+class QueryPlanTests(TestCase):
+    """Запросы страниц идут по составным индексам без сортировки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Коммент {i}')
+        trending.compute()
+
+    def setUp(self):
+        cache.clear()
+        # Граф подписок читает Follow целиком, но раз на загрузку.
+        get_graph()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def assert_uses_index(self, method, url, index, data=None):
+        with CaptureQueriesContext(connection) as context:
+            getattr(self.client, method)(url, data)
+        plans = query_plans(context.captured_queries)
+        details = [detail for _, details in plans for detail in details]
+        self.assertTrue(
+            any(index in detail for detail in details),
+            f'{url}: индекс {index} не используется: {details}'
+        )
+        for sql, details in plans:
+            for detail in details:
+                self.assertNotRegex(detail, FULL_SCAN, sql)
+                self.assertNotIn('TEMP B-TREE', detail, sql)
+
+    def test_listings_use_composite_indexes(self):
+        """Ленты, пост и подписки читаются по своим индексам."""
+        cases = (
+            ('get', reverse('posts:index'), 'post_pub_date_idx'),
+            ('get', reverse('posts:group_list', args=['group']),
+             'post_group_pub_date_idx'),
+            ('get', reverse('posts:profile', args=['author']),
+             'post_author_pub_date_idx'),
+            ('get', reverse('posts:post_detail', args=[self.post.id]),
+             'comment_post_created_idx'),
+            ('get', reverse('posts:follow_index'),
+             'timeline_user_pub_date_idx'),
+            ('post', reverse('posts:post_create'), 'follow_author_user_idx',
+             {'text': 'Новый пост'}),
+        )
+        for method, url, index, *data in cases:
+            with self.subTest(url=url, index=index):
+                self.assert_uses_index(method, url, index, *data)
+
+    def test_keyset_pages_use_composite_indexes(self):
+        """Keyset-страницы ищут по (pub_date, id) в индексе."""
+        for name, args, index in (
+            ('posts:index', [], 'post_pub_date_idx'),
+            ('posts:group_list', ['group'], 'post_group_pub_date_idx'),
+            ('posts:profile', ['author'], 'post_author_pub_date_idx'),
+            ('posts:trending', [], 'trending_score_idx'),
+        ):
+            url = reverse(name, args=args)
+            with self.subTest(url=url):
+                with self.settings(KEYSET_PAGINATION=True):
+                    page_obj = self.client.get(url).context['page_obj']
+                    self.assert_uses_index(
+                        'get', url, index, {'after': page_obj.next_cursor})
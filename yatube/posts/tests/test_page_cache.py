@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Первый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_repeated_anonymous_get_is_served_from_cache(self):
+        """Повторный анонимный запрос не рендерит страницу заново."""
+        # Для поста остается запрос валидаторов условного GET.
+        budgets = {
+            reverse('posts:index'): 0,
+            reverse('posts:group_list', args=[self.group.slug]): 0,
+            reverse('posts:profile', args=[self.author.username]): 0,
+            reverse('posts:post_detail', args=[self.post.id]): 1,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                with self.assertQueryBudget(budget):
+                    second = self.guest_client.get(url)
+                self.assertEqual(first.content, second.content)
+                self.assertIn('Cookie', second['Vary'])
+
+    def test_query_string_is_part_of_key(self):
+        """Разные страницы пагинатора кэшируются отдельно."""
+        for number in range(settings.PAGINATOR_VALUE):
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+        first = self.guest_client.get(reverse('posts:index'))
+        second = self.guest_client.get(reverse('posts:index') + '?page=2')
+        self.assertNotEqual(first.content, second.content)
+        self.assertContains(second, 'Первый пост')
+
+    def test_write_invalidates_only_affected_pages(self):
+        """Пост в группе сбрасывает ее страницу, но не чужую."""
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        other_url = reverse('posts:group_list', args=[self.other_group.slug])
+        self.guest_client.get(group_url)
+        self.guest_client.get(other_url)
+        Post.objects.create(
+            author=self.author, group=self.group, text='Новый пост')
+        self.assertContains(self.guest_client.get(group_url), 'Новый пост')
+        with self.assertQueryBudget(0):
+            self.guest_client.get(other_url)
+
+    def test_deferred_post_moved_to_other_group(self):
+        """only() без group_id: без догрузки, перенос сбросит группу."""
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        self.assertContains(self.guest_client.get(group_url), 'Первый пост')
+        # По запросу на объект: сигналы post_init не догружают поля.
+        with self.assertNumQueries(2):
+            post = Post.objects.only('pk').get(pk=self.post.pk)
+            Group.objects.only('pk').get(pk=self.group.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertNotContains(
+            self.guest_client.get(group_url), 'Первый пост')
+
+    def test_comment_invalidates_post_detail(self):
+        """Новый комментарий сразу виден на странице поста."""
+        url = reverse('posts:post_detail', args=[self.post.id])
+        self.guest_client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Свежий комментарий')
+        self.assertContains(self.guest_client.get(url), 'Свежий комментарий')
+
+    def test_authorized_and_session_requests_bypass_cache(self):
+        """Запросы с сессией всегда рендерятся заново."""
+        url = reverse('posts:index')
+        authorized_client = Client()
+        authorized_client.force_login(self.author)
+        authorized_client.get(url)
+        response = authorized_client.get(url)
+        self.assertIsNotNone(response.context)
+        self.guest_client.get(url)
+        self.guest_client.cookies[settings.SESSION_COOKIE_NAME] = 'missing'
+        response = self.guest_client.get(url)
+        self.assertIsNotNone(response.context)
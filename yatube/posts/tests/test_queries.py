@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..following import followed_ids
+from ..graph import who_to_follow
+from ..models import Comment, Follow, Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Число запросов страниц не зависит от числа постов и комментариев."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+        for i in range(12):
+            author = User.objects.create_user(
+                username=f'user{i}', first_name=f'Имя{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-')
+            Follow.objects.create(user=cls.reader, author=author)
+            post = Post.objects.create(
+                author=author if i % 2 else cls.author,
+                group=group if i % 3 else cls.group,
+                text=f'Пост {i}',
+            )
+            Comment.objects.create(post=post, author=author, text='Ок')
+            Comment.objects.create(
+                post=cls.post, author=author, text=f'Коммент {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        # Подписки и подсказки грузятся раз на кэш, а не на страницу.
+        followed_ids(self.reader.pk)
+        who_to_follow(self.reader)
+
+    def test_pages_fit_query_budget(self):
+        """Страницы укладываются в фиксированный бюджет запросов."""
+        budgets = {
+            reverse('posts:index'): 4,
+            reverse('posts:group_list', args=[self.group.slug]): 5,
+            reverse('posts:profile', args=[self.author.username]): 5,
+            reverse('posts:post_detail', args=[self.post.id]): 5,
+            reverse('posts:follow_index'): 5,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                with self.assertQueryBudget(budget):
+                    self.client.get(url)
+
+    def test_anonymous_pages_fit_query_budget(self):
+        """Анонимные страницы обходятся без запросов сессии."""
+        guest = Client()
+        budgets = {
+            reverse('posts:index'): 2,
+            reverse('posts:group_list', args=[self.group.slug]): 3,
+            reverse('posts:profile', args=[self.author.username]): 3,
+            reverse('posts:post_detail', args=[self.post.id]): 3,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                with self.assertQueryBudget(budget):
+                    guest.get(url)
@@ -0,0 +1,158 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+def found_ids(query, **filters):
+    return [pk for pk, _ in search.search(query, limit=100, **filters)]
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Садоводы',
+            slug='garden',
+            description='Все о рассаде и поливе',
+        )
+
+    def test_index_follows_save_and_delete(self):
+        """Индекс обновляется при создании, правке и удалении поста."""
+        post = Post.objects.create(author=self.author, text='Огурцы')
+        self.assertEqual(found_ids('огурцы'), [post.pk])
+        post.text = 'Помидоры'
+        post.save()
+        self.assertEqual(found_ids('огурцы'), [])
+        self.assertEqual(found_ids('помидоры'), [post.pk])
+        post.delete()
+        self.assertEqual(found_ids('помидоры'), [])
+
+    def test_group_fields_are_indexed(self):
+        """Пост находится по названию и описанию своей группы."""
+        group = Group.objects.get(pk=self.group.pk)
+        post = Post.objects.create(
+            author=self.author, text='Первый урожай', group=group)
+        self.assertEqual(found_ids('садоводы'), [post.pk])
+        self.assertEqual(found_ids('рассаде'), [post.pk])
+        group.title = 'Огородники'
+        group.save()
+        self.assertEqual(found_ids('садоводы'), [])
+        self.assertEqual(found_ids('огородники'), [post.pk])
+        group.delete()
+        self.assertEqual(found_ids('огородники'), [])
+
+    def test_words_match_as_prefixes(self):
+        """Все слова запроса ищутся как префиксы."""
+        post = Post.objects.create(author=self.author, text='Полив рассады')
+        Post.objects.create(author=self.author, text='Полив газона')
+        self.assertEqual(found_ids('пол расс'), [post.pk])
+
+    def test_text_outranks_group_description(self):
+        """Совпадение в тексте весит больше, чем в описании группы."""
+        in_group = Post.objects.create(
+            author=self.author, text='Урожай', group=self.group)
+        in_text = Post.objects.create(
+            author=self.author, text='Полив по утрам')
+        self.assertEqual(found_ids('полив'), [in_text.pk, in_group.pk])
+
+    def test_filters_by_group_and_author(self):
+        """Выдачу можно ограничить группой и автором."""
+        other = User.objects.create_user(username='other')
+        in_group = Post.objects.create(
+            author=self.author, text='Рассада', group=self.group)
+        by_other = Post.objects.create(author=other, text='Рассада')
+        self.assertEqual(
+            found_ids('рассада', group_id=self.group.pk), [in_group.pk])
+        self.assertEqual(
+            found_ids('рассада', author_id=other.pk), [by_other.pk])
+
+    def test_query_syntax_is_not_passed_to_index(self):
+        """Кавычки и операторы в запросе не ломают поиск."""
+        post = Post.objects.create(author=self.author, text='Рассада NEAR')
+        self.assertEqual(found_ids('"рассада" (near*'), [post.pk])
+        self.assertEqual(found_ids('!!!'), [])
+
+    def test_rebuild_catches_up_with_update(self):
+        """rebuild_search_index догоняет update() в обход сигналов."""
+        post = Post.objects.create(author=self.author, text='Огурцы')
+        Post.objects.filter(pk=post.pk).update(text='Кабачки')
+        self.assertEqual(found_ids('кабачки'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertEqual(found_ids('кабачки'), [post.pk])
+        self.assertIn('Проиндексировано постов: 1', out.getvalue())
+
+
+@override_settings(PAGINATOR_VALUE=2)
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Садоводы', slug='garden', description='Рассада')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Рассада {"полив " * i}')
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_pages_follow_relevance_without_repeats(self):
+        """Курсоры проходят всю выдачу по релевантности без повторов."""
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'рассада'})
+        seen = []
+        while True:
+            page_obj = response.context['page_obj']
+            seen.extend(post.pk for post in page_obj)
+            if not page_obj.has_next():
+                break
+            response = self.client.get(
+                url, {'q': 'рассада', 'after': page_obj.next_cursor})
+        self.assertEqual(seen, found_ids('рассада'))
+        self.assertEqual(sorted(seen), sorted(p.pk for p in self.posts))
+        previous = self.client.get(
+            url, {'q': 'рассада', 'before': page_obj.previous_cursor})
+        self.assertEqual(
+            [post.pk for post in previous.context['page_obj']], seen[-3:-1])
+
+    def test_links_keep_query_and_filters(self):
+        """Ссылки на соседние страницы сохраняют запрос и фильтры."""
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'рассада', 'author': 'author'})
+        self.assertContains(response, '?q=%D1%80%D0%B0%D1%81%D1%81%D0%B0')
+        self.assertContains(response, 'author=author&after=')
+
+    def test_unknown_author_is_form_error(self):
+        """Неизвестный автор - ошибка формы, а не пустая выдача."""
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'рассада', 'author': 'nobody'})
+        self.assertIsNone(response.context['page_obj'])
+        self.assertContains(response, 'Нет такого автора')
+
+    def test_admin_changelist_uses_index(self):
+        """Поиск в админке идет по тому же индексу."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        post = Post.objects.create(
+            author=self.author, text='Кабачки', group=self.group)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'садовод'})
+        self.assertEqual(
+            [obj.pk for obj in response.context['cl'].result_list],
+            [post.pk],
+        )
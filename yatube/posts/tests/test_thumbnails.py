@@ -0,0 +1,168 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post, ThumbnailJob
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(name='image.png', size=(1200, 800)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color=(200, 30, 30)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+def run_on_commit(callback):
+    callback()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def assert_all_ready(self, post):
+        for geometry, options in thumbnails.variants():
+            with self.subTest(geometry=geometry, options=options):
+                self.assertIsNotNone(
+                    thumbnails.ready(post.image, geometry, **options))
+
+    def test_page_renders_placeholder_without_resizing(self):
+        """Пока миниатюры нет, страница отдает заглушку и ставит задачу."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file())
+        with mock.patch.object(thumbnails, 'enqueue') as enqueue:
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnails.PLACEHOLDER)
+        self.assertContains(response, 'width="600" height="339"')
+        enqueue.assert_called_once()
+        self.assertEqual(enqueue.call_args[0][0], post.image.name)
+        self.assertIsNone(thumbnails.ready(post.image, '600x339'))
+
+    def process(self):
+        out = StringIO()
+        call_command('process_thumbnails', workers=0, stdout=out)
+        return out.getvalue()
+
+    def test_post_create_pregenerates_every_geometry(self):
+        """post_create ставит картинку в очередь, команда режет варианты."""
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', run_on_commit
+        ):
+            self.client.post(
+                reverse('posts:post_create'),
+                {'text': 'С картинкой', 'image': image_file()},
+            )
+        post = Post.objects.get(text='С картинкой')
+        self.assertTrue(
+            ThumbnailJob.objects.filter(name=post.image.name).exists())
+        self.assertIn('обработано: 1', self.process())
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.assert_all_ready(post)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.id]))
+        self.assertNotContains(response, thumbnails.PLACEHOLDER)
+
+    def test_ready_thumbnail_refreshes_cached_pages(self):
+        """Готовые миниатюры сдвигают теги кэша поста."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file())
+        url = reverse('posts:profile', args=[self.user.username])
+        with mock.patch.object(thumbnails, 'enqueue'):
+            self.assertContains(self.client.get(url), thumbnails.PLACEHOLDER)
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', run_on_commit
+        ):
+            thumbnails.schedule(post)
+        self.process()
+        self.assertNotContains(self.client.get(url), thumbnails.PLACEHOLDER)
+
+    def test_enqueue_skips_pending_image(self):
+        """Картинка в очереди повторно не ставится."""
+        with self.assertNumQueries(1):
+            thumbnails.enqueue('posts/same.png')
+            thumbnails.enqueue('posts/same.png')
+        self.assertEqual(ThumbnailJob.objects.count(), 1)
+
+    def test_picture_lists_variants_with_intrinsic_size(self):
+        """post_picture выводит srcset вариантов с размерами <img>."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file())
+        thumbnails.enqueue(post.image.name)
+        self.process()
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.id]))
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, '600w')
+        self.assertContains(response, '1200w')
+        self.assertContains(response, 'width="600" height="339"')
+        if 'WEBP' in thumbnails.image_formats():
+            self.assertContains(response, 'type="image/webp"')
+
+    def test_small_image_is_not_upscaled(self):
+        """Варианты шире исходника не повторяются в srcset."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file(size=(400, 300)))
+        thumbnails.enqueue(post.image.name)
+        self.process()
+        found, complete = thumbnails.ready_variants(post.image)
+        self.assertTrue(complete)
+        self.assertEqual(
+            [variant.width for variant in found['JPEG']], [300, 400])
+
+    def test_unsupported_formats_are_skipped(self):
+        """Форматы, которые не умеет sorl или Pillow, пропускаются."""
+        config = dict(settings.POST_IMAGE_VARIANTS, formats=('AVIF', 'JPEG'))
+        with self.settings(POST_IMAGE_VARIANTS=config):
+            self.assertEqual(thumbnails.image_formats(), ['JPEG'])
+
+    def test_backfill_creates_missing_variants(self):
+        """backfill_post_images догоняет старые картинки."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file())
+        out = StringIO()
+        call_command('backfill_post_images', workers=0, stdout=out)
+        self.assert_all_ready(post)
+        self.assertIn('обработано: 1', out.getvalue())
+        call_command('backfill_post_images', workers=0, stdout=out)
+        self.assertIn('обработано: 0', out.getvalue())
+
+    def test_broken_image_leaves_queue(self):
+        """Ошибка генерации пишется в stderr, задача не зацикливается."""
+        thumbnails.enqueue('posts/missing.png')
+        err = StringIO()
+        call_command(
+            'process_thumbnails', workers=0, stdout=StringIO(), stderr=err)
+        self.assertIn('posts/missing.png', err.getvalue())
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    def test_worker_settings_follow_parent(self):
+        """Процессы пула получают хранилище родителя, а не модуля."""
+        overrides = thumbnails._worker_settings()
+        self.assertEqual(overrides['MEDIA_ROOT'], TEMP_MEDIA_ROOT)
+        self.assertIn('THUMBNAIL_WORKERS', overrides)
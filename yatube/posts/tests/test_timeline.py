@@ -0,0 +1,105 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост попадает в ленту подписчика без join при чтении."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый')
+        Post.objects.create(author=self.other, text='Чужой')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка дописывает старые посты автора, отписка убирает."""
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertEqual(self.feed(), posts[::-1])
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_prolific_author_is_merged_on_read(self):
+        """Посты популярного автора не раскладываются, а подмешиваются."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.other)
+        Follow.objects.create(user=self.other, author=self.author)
+        cache.clear()
+        first = Post.objects.create(author=self.other, text='Обычный')
+        second = Post.objects.create(author=self.author, text='Популярный')
+        self.assertFalse(TimelineEntry.objects.filter(post=second).exists())
+        self.assertEqual(self.feed(), [second, first])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_author_below_limit_is_fanned_out(self):
+        """Автор ниже порога раскладывает посты, подмешанные раньше."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Популярный')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        follow.delete()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_trim_command(self):
+        """trim_timelines оставляет TIMELINE_LENGTH последних записей."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(4)
+        ]
+        call_command('trim_timelines', stdout=StringIO())
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('post', flat=True)),
+            [posts[3].id, posts[2].id],
+        )
+
+    def test_rebuild_command(self):
+        """rebuild_timelines восстанавливает ленты по Follow и Post."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        TimelineEntry.objects.all().delete()
+        TimelineEntry.objects.create(
+            user=self.other, post=post, pub_date=post.pub_date)
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', 'post')),
+            [(self.reader.id, post.id)]
+        )
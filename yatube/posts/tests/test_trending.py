@@ -0,0 +1,84 @@
+import datetime as dt
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from ..models import Comment, Follow, Post, TrendingScore
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.quiet = Post.objects.create(author=cls.author, text='Тихий')
+        cls.discussed = Post.objects.create(author=cls.author, text='Спор')
+        cls.followed = Post.objects.create(author=cls.star, text='Звезда')
+        cls.stale = Post.objects.create(author=cls.author, text='Старый')
+        Post.objects.filter(pk=cls.stale.pk).update(
+            pub_date=timezone.now() - dt.timedelta(days=30))
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.discussed, author=cls.reader, text=f'{number}')
+        Follow.objects.create(user=cls.reader, author=cls.star)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_score_decays_with_age(self):
+        """Активность поднимает рейтинг, возраст опускает."""
+        self.assertGreater(trending.score(3, 0, 1), trending.score(0, 0, 1))
+        self.assertGreater(trending.score(0, 2, 1), trending.score(0, 0, 1))
+        self.assertGreater(trending.score(3, 0, 1), trending.score(3, 0, 48))
+
+    def test_compute_ranks_recent_activity(self):
+        """Комментарии и новые подписчики поднимают пост, старые - вне."""
+        out = StringIO()
+        call_command('compute_trending', stdout=out)
+        self.assertIn('Постов в рейтинге: 3', out.getvalue())
+        ranked = list(TrendingScore.objects.order_by(
+            '-score').values_list('post_id', flat=True))
+        self.assertEqual(
+            ranked, [self.discussed.pk, self.followed.pk, self.quiet.pk])
+
+    def test_writes_do_not_touch_scores(self):
+        """Новый комментарий не пересчитывает рейтинг."""
+        trending.compute()
+        before = TrendingScore.objects.get(post=self.quiet).score
+        Comment.objects.create(post=self.quiet, author=self.reader, text='!')
+        self.assertEqual(
+            TrendingScore.objects.get(post=self.quiet).score, before)
+
+    def test_trending_page_is_keyset_feed(self):
+        """Вкладка читает готовый рейтинг по курсорам."""
+        trending.compute()
+        url = reverse('posts:trending')
+        with self.settings(PAGINATOR_VALUE=2, KEYSET_PAGINATION=True):
+            with self.assertNumQueries(1):
+                first = self.client.get(url)
+            second = self.client.get(
+                url, {'after': first.context['page_obj'].next_cursor})
+        self.assertEqual(
+            [row.post for row in first.context['page_obj']],
+            [self.discussed, self.followed],
+        )
+        self.assertEqual(
+            [row.post for row in second.context['page_obj']], [self.quiet])
+        self.assertContains(first, 'Популярное')
+
+    def test_recompute_refreshes_cached_page(self):
+        """Пересчет сдвигает тег, и закэшированная страница обновляется."""
+        url = reverse('posts:trending')
+        self.assertNotContains(self.client.get(url), 'Спор')
+        trending.compute()
+        self.assertContains(self.client.get(url), 'Спор')
@@ -8,6 +8,7 @@ from django import forms
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.core.paginator import Paginator
 
 from ..models import Comment, Follow, Group, Post
 
@@ -194,19 +195,83 @@ class CachePostPagesTests(TestCase):
 
     def test_index_page_caching(self):
         """Проверка кэша Главной страницы."""
+        cache.clear()
         response = self.authorized_client.get(reverse('posts:index'))
         content_before = response.content
 
-        self.post.delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Мимо сигналов')
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(response.content, content_before)
 
+        self.post.delete()
         response = self.authorized_client.get(reverse('posts:index'))
-        content_after = response.content
-        self.assertEqual(content_after, content_before)
+        self.assertNotEqual(response.content, content_before)
 
+    def test_feed_caches_become_fresh_on_write(self):
+        """Лента, группа и профиль обновляются сразу после записи."""
         cache.clear()
-        response = self.authorized_client.get(reverse('posts:index'))
-        content_after = response.content
-        self.assertNotEqual(content_after, content_before)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        Post.objects.create(
+            author=self.post.author, group=self.group, text='Свежая запись')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Свежая запись')
+
+    def test_group_edit_refreshes_feed(self):
+        """Правка группы сдвигает поколение ее ленты."""
+        self.post.group = self.group
+        self.post.save()
+        cache.clear()
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        self.authorized_client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        self.group.description = 'Новое описание'
+        self.group.save()
+        self.assertContains(self.authorized_client.get(url), 'Новый текст')
+
+    def test_group_rename_refreshes_author_profile(self):
+        """Новый slug группы сразу виден в профилях авторов ее постов."""
+        Post.objects.create(
+            author=self.post.author, group=self.group, text='В группе')
+        cache.clear()
+        url = reverse('posts:profile', kwargs={'username': 'auth'})
+        self.authorized_client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed-slug'
+        group.save()
+        response = self.authorized_client.get(url)
+        self.assertContains(response, '/group/renamed-slug/')
+        self.assertNotContains(response, '/group/test-slug/')
+
+    def test_author_rename_refreshes_group_page(self):
+        """Новое имя автора сразу видно в лентах его групп."""
+        Post.objects.create(
+            author=self.post.author, group=self.group, text='В группе')
+        cache.clear()
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        self.authorized_client.get(url)
+        author = User.objects.get(pk=self.post.author.pk)
+        author.first_name = 'Переименованный'
+        author.save()
+        self.assertContains(self.authorized_client.get(url), 'Переименованный')
+
+    def test_feed_cache_is_page_aware(self):
+        """Разные страницы ленты кэшируются отдельно."""
+        cache.clear()
+        for i in range(11):
+            Post.objects.create(author=self.user, text=f'Запись {i}')
+        first = self.authorized_client.get(reverse('posts:index'))
+        second = self.authorized_client.get(
+            reverse('posts:index') + '?page=2')
+        self.assertNotEqual(first.content, second.content)
+        self.assertContains(second, 'Тестовая запись')
 
 
 class PaginatorPostPagesTests(TestCase):
@@ -277,6 +342,80 @@ class PaginatorPostPagesTests(TestCase):
         self.assertEqual(len(response.context['page_obj']), 4)
 
 
+class KeysetPaginatorPostPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(14):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Запись {i}',
+                group=cls.group,
+            )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    @override_settings(KEYSET_PAGINATION=True)
+    def test_cursor_pages_cover_all_posts(self):
+        """Курсоры after/before обходят ленту без пропусков и повторов."""
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url).context['page_obj']
+                self.assertFalse(first.has_previous())
+                response = self.guest_client.get(
+                    url, {'after': first.next_cursor})
+                second = response.context['page_obj']
+                self.assertEqual(list(first) + list(second), expected)
+                self.assertFalse(second.has_next())
+                back = self.guest_client.get(
+                    url, {'before': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+
+    @override_settings(KEYSET_PAGINATION=True)
+    def test_keyset_pagination_is_opt_in(self):
+        """С KEYSET_PAGINATION первая страница тоже keyset."""
+        response = self.guest_client.get(self.urls[0])
+        page_obj = response.context['page_obj']
+        self.assertTrue(page_obj.is_keyset)
+        self.assertEqual(len(page_obj), 10)
+        self.assertContains(response, f'?after={page_obj.next_cursor}')
+
+    @override_settings(KEYSET_PAGINATION=True)
+    def test_old_page_links_fall_back(self):
+        """Старые ссылки ?page= обслуживает обычный Paginator."""
+        response = self.guest_client.get(self.urls[0], {'page': 2})
+        page_obj = response.context['page_obj']
+        self.assertIsInstance(page_obj.paginator, Paginator)
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(len(page_obj), 4)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор дает первую страницу, а не ошибку."""
+        for cursor in ('garbage', 'W10', 'WyJ4IiwieSJd'):
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(
+                    self.urls[0], {'after': cursor})
+                page_obj = response.context['page_obj']
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(page_obj.has_previous())
+                self.assertEqual(len(page_obj), 10)
+
+
 class FollowTest(TestCase):
     def setUp(self):
         self.user1 = User.objects.create_user(username='Follower')
@@ -0,0 +1,262 @@
+"""Фоновая генерация миниатюр картинок постов.
+
+Шаблоны не режут картинки сами: тег post_picture из post_images
+только ищет готовые варианты в key-value хранилище sorl, а пока их
+нет, отдает заглушку того же размера и ставит картинку в очередь -
+таблицу ThumbnailJob. post_create и post_edit ставят картинку в
+очередь сразу после коммита.
+
+Веб-процессы миниатюры не режут. Очередь разбирает команда
+process_thumbnails (--interval - постоянный обработчик), уже
+загруженные картинки догоняет backfill_post_images. Ресайз идет в
+пуле процессов команды (spawn - форк процесса с потоками и открытыми
+соединениями к базе небезопасен); процессы пула получают настройки
+хранилища явно, только пишут файлы и возвращают размеры, а kvstore
+заполняет и теги кэша поста сдвигает сама команда.
+"""
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.templatetags.static import static
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import caching
+from .models import Post, ThumbnailJob
+
+PENDING_TIMEOUT = 300
+PLACEHOLDER = 'img/thumbnail-placeholder.svg'
+# Настройки, которые процессы пула берут у родителя, а не из модуля
+# настроек: override_settings и правки во время работы тоже доходят.
+WORKER_SETTINGS = ('MEDIA_ROOT', 'MEDIA_URL', 'DEFAULT_FILE_STORAGE')
+
+MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'GIF': 'image/gif',
+    'WEBP': 'image/webp',
+}
+
+
+class Placeholder:
+    """Заглушка с размерами будущей миниатюры."""
+
+    is_placeholder = True
+
+    def __init__(self, geometry):
+        width, _, height = geometry.partition('x')
+        self.width = int(width) if width else None
+        self.height = int(height) if height else None
+        self.url = static(PLACEHOLDER)
+
+
+def image_formats():
+    """Форматы POST_IMAGE_VARIANTS, которые умеют писать Pillow и sorl.
+
+    Например, AVIF sorl не поддерживает, а WebP есть не в каждой
+    сборке Pillow; такие форматы пропускаются.
+    """
+    Image.init()
+    return [
+        image_format
+        for image_format in settings.POST_IMAGE_VARIANTS['formats']
+        if image_format in EXTENSIONS and image_format in Image.SAVE
+    ]
+
+
+def variants():
+    """(геометрия, опции) всех вариантов картинки поста."""
+    config = settings.POST_IMAGE_VARIANTS
+    aspect_width, aspect_height = config['aspect']
+    return [
+        (
+            f'{width}x{round(width * aspect_height / aspect_width)}',
+            {
+                'crop': 'center',
+                'upscale': False,
+                'format': image_format,
+                'quality': config['quality'],
+            },
+        )
+        for image_format in image_formats()
+        for width in config['widths']
+    ]
+
+
+def _prepare(file_, geometry, options):
+    """Миниатюра и полные опции - те же, что выберет sorl."""
+    backend = default.backend
+    source = ImageFile(file_)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage), options
+
+
+def ready(file_, geometry, **options):
+    """Готовая миниатюра или None; исходная картинка не читается."""
+    thumbnail, _ = _prepare(file_, geometry, options)
+    return default.kvstore.get(thumbnail)
+
+
+def ready_variants(file_):
+    """Готовые варианты картинки по форматам и признак, что готовы все.
+
+    Варианты шире исходной картинки совпадают по размеру с меньшими
+    (upscale выключен) - такие повторы отбрасываются.
+    """
+    found = {}
+    complete = True
+    for geometry, options in variants():
+        thumbnail = ready(file_, geometry, **options)
+        if thumbnail is None:
+            complete = False
+            continue
+        widths = found.setdefault(options['format'], {})
+        widths.setdefault(thumbnail.width, thumbnail)
+    return {
+        image_format: [widths[width] for width in sorted(widths)]
+        for image_format, widths in found.items()
+    }, complete
+
+
+def generate(name, geometries):
+    """Режет картинку; выполняется в процессе пула.
+
+    Процесс только пишет файлы в хранилище и не трогает базу:
+    размеры возвращаются родителю, и он сам записывает их в kvstore.
+    """
+    source_image = default.engine.get_image(ImageFile(name))
+    try:
+        image_info = default.engine.get_image_info(source_image)
+        created = []
+        for geometry, options in geometries:
+            thumbnail, options = _prepare(name, geometry, options)
+            if thumbnail.exists():
+                thumbnail.set_size()
+            else:
+                options['image_info'] = image_info
+                default.backend._create_thumbnail(
+                    source_image, geometry, options, thumbnail)
+            created.append((thumbnail.name, thumbnail.size))
+        return default.engine.get_image_size(source_image), created
+    finally:
+        default.engine.cleanup(source_image)
+
+
+def record(name, source_size, created):
+    """Записывает готовые миниатюры в kvstore sorl."""
+    source = ImageFile(name)
+    source.set_size(source_size)
+    default.kvstore.get_or_set(source)
+    for thumbnail_name, size in created:
+        thumbnail = ImageFile(thumbnail_name, default.storage)
+        thumbnail.set_size(size)
+        default.kvstore.set(thumbnail, source)
+
+
+def _worker_settings():
+    names = WORKER_SETTINGS + tuple(
+        name for name in dir(settings) if name.startswith('THUMBNAIL_'))
+    return {
+        name: getattr(settings, name)
+        for name in names if hasattr(settings, name)
+    }
+
+
+def _init_worker(settings_module, overrides):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+
+
+def make_executor(workers):
+    """Пул процессов для generate с настроенным Django."""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(os.environ['DJANGO_SETTINGS_MODULE'], _worker_settings()),
+    )
+
+
+def generate_many(names, workers, batch_size):
+    """Пары (имя, результат generate или исключение).
+
+    workers = 0 - генерация в текущем процессе.
+    """
+    geometries = variants()
+    if not workers:
+        for name in names:
+            try:
+                yield name, generate(name, geometries)
+            except Exception as error:
+                yield name, error
+        return
+    names = iter(names)
+    with make_executor(workers) as executor:
+        while True:
+            batch = list(islice(names, batch_size))
+            if not batch:
+                return
+            futures = {
+                executor.submit(generate, name, geometries): name
+                for name in batch
+            }
+            for future in as_completed(futures):
+                yield futures[future], (
+                    future.exception() or future.result()
+                )
+
+
+def finish(name, result):
+    """Записывает результат generate и обновляет страницы постов."""
+    record(name, *result)
+    for post in Post.objects.filter(image=name).select_related(
+        'author', 'group'
+    ):
+        caching.bump(*caching.post_tags(post))
+
+
+def _pending_key(name):
+    return 'thumbnail_pending:' + hashlib.md5(name.encode()).hexdigest()
+
+
+def enqueue(name):
+    """Ставит картинку в очередь ThumbnailJob.
+
+    Не чаще раза в PENDING_TIMEOUT: показ страницы с заглушкой не
+    должен писать в базу на каждом запросе.
+    """
+    if not cache.add(_pending_key(name), True, PENDING_TIMEOUT):
+        return
+    ThumbnailJob.objects.bulk_create(
+        [ThumbnailJob(name=name)], ignore_conflicts=True)
+
+
+def schedule(post):
+    """После коммита ставит картинку поста в очередь."""
+    if not post.image:
+        return
+    name = post.image.name
+    cache.delete(_pending_key(name))
+    transaction.on_commit(lambda: enqueue(name))
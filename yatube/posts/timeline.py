@@ -0,0 +1,211 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост сразу раскладывается в TimelineEntry всех подписчиков автора,
+поэтому follow_index читает готовый список id по индексу
+(user, -pub_date, -post) без join с Follow и без COUNT.
+Посты авторов, у которых подписчиков не меньше TIMELINE_FANOUT_LIMIT,
+не раскладываются, а подмешиваются в ленту при чтении; когда автор
+опускается ниже порога, его последние посты раскладываются по лентам
+подписчиков (followers_changed).
+
+Раскладка только добавляет записи, лишнее сверх TIMELINE_LENGTH на
+пользователя удаляет trim (команда trim_timelines).
+"""
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .following import followed_ids
+from .models import Follow, Post, TimelineEntry, UserStats
+
+PROLIFIC_CACHE_KEY = 'timeline:prolific_authors'
+PROLIFIC_CACHE_TIMEOUT = 600
+
+
+def prolific_authors():
+    """Множество id авторов, чьи посты подмешиваются при чтении."""
+    authors = cache.get(PROLIFIC_CACHE_KEY)
+    if authors is None:
+        authors = set(
+            UserStats.objects.filter(
+                followers_count__gte=settings.TIMELINE_FANOUT_LIMIT
+            ).values_list('user_id', flat=True)
+        )
+        cache.set(PROLIFIC_CACHE_KEY, authors, PROLIFIC_CACHE_TIMEOUT)
+    return authors
+
+
+def _entries(user_id, rows):
+    return [
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in rows
+    ]
+
+
+def push_post(post):
+    """Добавляет новый пост в ленты подписчиков автора."""
+    if post.author_id in prolific_authors():
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def followers_changed(author_id, followed):
+    """Переводит автора через порог TIMELINE_FANOUT_LIMIT.
+
+    Вызывается после изменения followers_count. Посты, которые
+    подмешивались при чтении, раскладываются по лентам, когда автор
+    опускается ниже порога, иначе они пропали бы из лент.
+    """
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    crossed = UserStats.objects.filter(
+        user_id=author_id,
+        followers_count=limit if followed else limit - 1,
+    ).exists()
+    if not crossed:
+        return
+    cache.delete(PROLIFIC_CACHE_KEY)
+    if followed:
+        return
+    posts = list(Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:settings.TIMELINE_LENGTH])
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            entry
+            for user_id in followers.iterator()
+            for entry in _entries(user_id, posts)
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def push_posts(post_ids):
+    """Раскладывает по лентам подписчиков сразу много постов.
+
+    Для массового импорта: один запрос к Post и Follow вместо
+    push_post на каждый пост.
+    """
+    rows = Post.objects.filter(pk__in=post_ids).exclude(
+        author_id__in=prolific_authors()
+    ).values_list('author__following__user_id', 'id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for user_id, post_id, pub_date in rows.iterator()
+            if user_id is not None
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Дописывает в ленту последние посты нового автора подписки."""
+    if author_id in prolific_authors():
+        return
+    rows = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:settings.TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        _entries(user_id, rows),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user_id):
+    """Собирает ленту пользователя заново из Follow и Post."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    rows = Post.objects.filter(
+        author__following__user_id=user_id
+    ).exclude(
+        author_id__in=prolific_authors()
+    ).order_by('-pub_date', '-id').values_list(
+        'id', 'pub_date'
+    )[:settings.TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        _entries(user_id, rows),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+    )
+
+
+def trim(user_id):
+    """Удаляет из ленты записи старше TIMELINE_LENGTH последних."""
+    boundary = TimelineEntry.objects.filter(user_id=user_id).values_list(
+        'pub_date', 'post_id'
+    )[settings.TIMELINE_LENGTH - 1:settings.TIMELINE_LENGTH]
+    boundary = next(iter(boundary), None)
+    if boundary is None:
+        return 0
+    pub_date, post_id = boundary
+    deleted, _ = TimelineEntry.objects.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, post_id__lt=post_id),
+        user_id=user_id,
+    ).delete()
+    return deleted
+
+
+def overflowing_users():
+    """Пользователи, у которых в ленте больше TIMELINE_LENGTH записей."""
+    return TimelineEntry.objects.order_by().values('user_id').annotate(
+        total=Count('id')
+    ).filter(total__gt=settings.TIMELINE_LENGTH).values_list(
+        'user_id', flat=True
+    )
+
+
+def timeline_post_ids(user):
+    """Посты ленты подписок (id), от новых к старым.
+
+    Лента ограничена TIMELINE_LENGTH последними постами.
+    """
+    limit = settings.TIMELINE_LENGTH
+    stored = TimelineEntry.objects.filter(user=user).values_list(
+        'pub_date', 'post_id'
+    )[:limit]
+    merged = stored
+    prolific = prolific_authors()
+    followed = []
+    if prolific:
+        followed = [
+            author_id for author_id in followed_ids(user.pk)
+            if author_id in prolific
+        ]
+    if followed:
+        merged = heapq.merge(
+            stored,
+            Post.objects.filter(author_id__in=followed).order_by(
+                '-pub_date', '-id'
+            ).values_list('pub_date', 'id')[:limit],
+            reverse=True,
+        )
+    post_ids = []
+    seen = set()
+    for _, post_id in merged:
+        if post_id not in seen:
+            seen.add(post_id)
+            post_ids.append(post_id)
+    return post_ids[:limit]
@@ -0,0 +1,96 @@
+"""Рейтинг «Популярное»: комментарии, подписчики автора и возраст поста.
+
+score = (1 + TRENDING_COMMENT_WEIGHT * комментарии за окно
+         + TRENDING_FOLLOW_WEIGHT * прирост подписчиков автора за окно)
+        / (часы с публикации + 2) ** TRENDING_GRAVITY
+
+Считается только командой compute_trending: пачками по
+TRENDING_BATCH_SIZE постов, одним агрегатом комментариев на пачку,
+прирост подписчиков - из журнала FollowEvent. Таблица TrendingScore
+заменяется целиком в одной транзакции, запись постов и комментариев
+рейтинг не трогает, а чтение его не считает.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Q, Sum, Value, When
+from django.utils import timezone
+
+from . import caching
+from .models import Comment, FollowEvent, Post, TrendingScore
+
+
+def score(comments, follows, age_hours):
+    activity = (
+        1
+        + settings.TRENDING_COMMENT_WEIGHT * comments
+        + settings.TRENDING_FOLLOW_WEIGHT * max(follows, 0)
+    )
+    return activity / (max(age_hours, 0) + 2) ** settings.TRENDING_GRAVITY
+
+
+def follows_gained(since):
+    """{author_id: подписки минус отписки} с момента since."""
+    return dict(
+        FollowEvent.objects.filter(created__gte=since).order_by().values(
+            'author_id'
+        ).annotate(gained=Sum(Case(
+            When(followed=True, then=Value(1)),
+            default=Value(-1),
+            output_field=IntegerField(),
+        ))).values_list('author_id', 'gained')
+    )
+
+
+def candidates(now, since):
+    """Пачки (id, author_id, pub_date) свежих или обсуждаемых постов."""
+    posts = Post.objects.filter(
+        Q(pub_date__gte=now - datetime.timedelta(
+            seconds=settings.TRENDING_MAX_AGE))
+        | Q(last_commented__gte=since)
+    ).values_list('id', 'author_id', 'pub_date').order_by('id')
+    last_id = 0
+    while True:
+        batch = list(
+            posts.filter(id__gt=last_id)[:settings.TRENDING_BATCH_SIZE])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1][0]
+
+
+def compute(now=None):
+    """Пересчитывает TrendingScore; возвращает число постов в рейтинге."""
+    now = now or timezone.now()
+    # Окно не длиннее хранения журнала подписок (posts.graph).
+    since = now - datetime.timedelta(seconds=min(
+        settings.TRENDING_WINDOW, settings.GRAPH_EVENT_RETENTION))
+    gained = follows_gained(since)
+    total = 0
+    with transaction.atomic():
+        TrendingScore.objects.all().delete()
+        for batch in candidates(now, since):
+            comments = dict(
+                Comment.objects.filter(
+                    post_id__in=[post_id for post_id, _, _ in batch],
+                    created__gte=since,
+                ).order_by().values('post').annotate(
+                    total=Count('id')
+                ).values_list('post', 'total')
+            )
+            TrendingScore.objects.bulk_create(
+                TrendingScore(
+                    post_id=post_id,
+                    score=score(
+                        comments.get(post_id, 0),
+                        gained.get(author_id, 0),
+                        (now - pub_date).total_seconds() / 3600,
+                    ),
+                    computed=now,
+                )
+                for post_id, author_id, pub_date in batch
+            )
+            total += len(batch)
+    caching.bump(caching.TRENDING)
+    return total
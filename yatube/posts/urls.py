@@ -1,15 +1,37 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('hot/', views.hot, name='hot'),
+    path('trending/', views.trending, name='trending'),
+    path('feed/', feeds.posts_rss, name='feed_rss'),
+    path('feed/atom/', feeds.posts_atom, name='feed_atom'),
     path('group/<slug:slug>/', views.group_list, name='group_list'),
+    path('group/<slug:slug>/feed/', feeds.group_rss, name='group_rss'),
+    path('group/<slug:slug>/feed/atom/', feeds.group_atom,
+         name='group_atom'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/feed/', feeds.author_rss,
+         name='author_rss'),
+    path('profile/<str:username>/feed/atom/', feeds.author_atom,
+         name='author_atom'),
+    path(
+        'profile/<str:username>/export/',
+        views.profile_export,
+        name='profile_export'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path('posts/<int:post_id>/comment', views.add_comment, name='add_comment'),
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('follow/', views.follow_index, name='follow_index'),
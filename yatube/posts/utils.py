@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import QuerySet
+
+from .paginators import KeysetPaginator
+
+
+def paginate(request, posts, keys=('pub_date', 'id')):
+    """Страница ленты постов для шаблона posts/includes/paginator.html.
+
+    Курсоры ?after= и ?before= (или KEYSET_PAGINATION в настройках)
+    включают keyset-пагинацию для QuerySet; старые ссылки ?page=
+    и готовые списки вроде ленты подписок обслуживает обычный Paginator.
+    keys - ключ keyset-пагинации, QuerySet должен быть упорядочен по нему.
+    """
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    use_keyset = (
+        (after or before or settings.KEYSET_PAGINATION)
+        and 'page' not in request.GET
+    )
+    if use_keyset and isinstance(posts, QuerySet):
+        paginator = KeysetPaginator(posts, settings.PAGINATOR_VALUE, keys)
+        return paginator.get_keyset_page(after=after, before=before)
+    paginator = Paginator(posts, settings.PAGINATOR_VALUE)
+    return paginator.get_page(request.GET.get('page'))
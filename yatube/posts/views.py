@@ -1,38 +1,123 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 
-from .models import Follow, Group, Post, User
-from .forms import PostForm, CommentForm
-from yatube.settings import PAGINATOR_VALUE
+from . import caching, export, graph, thumbnails
+from .conditional import (
+    conditional_page, feed_validators, group_validators, post_validators,
+    profile_validators, trending_validators,
+)
+from .counters import stats_for
+from .models import Comment, Follow, Group, Post, TrendingScore, User
+from .following import button_state, is_following
+from .forms import PostForm, CommentForm, SearchForm
+from .paginators import IdSequence, KeysetPaginator
+from .search import SearchPaginator
+from .timeline import timeline_post_ids
+from .utils import paginate
 
 
+@conditional_page(feed_validators)
+@caching.cache_anonymous_page
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, PAGINATOR_VALUE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.select_related('author', 'group')
+    page_obj = paginate(request, posts)
     context = {
+        'index': True,
         'posts': posts,
         'page_obj': page_obj,
+        'feed_cache': caching.feed_cache(request, page_obj, caching.FEED),
+        'follow_buttons': button_state(request),
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(feed_validators)
+@caching.cache_anonymous_page
+def hot(request):
+    # Только обсуждавшиеся посты, по индексу post_last_commented_idx.
+    posts = Post.objects.filter(
+        last_commented__isnull=False
+    ).select_related('author', 'group').order_by('-last_commented', '-id')
+    page_obj = paginate(request, posts, keys=('last_commented', 'id'))
+    context = {
+        'hot': True,
+        'posts': posts,
+        'page_obj': page_obj,
+        'feed_cache': caching.feed_cache(request, page_obj, caching.FEED),
+        'follow_buttons': button_state(request),
+    }
+    return render(request, 'posts/hot.html', context)
+
+
+@conditional_page(trending_validators)
+@caching.cache_anonymous_page
+def trending(request):
+    # Рейтинг готов заранее (compute_trending), страница его только читает.
+    scores = TrendingScore.objects.select_related(
+        'post__author', 'post__group').order_by('-score', '-post_id')
+    page_obj = paginate(request, scores, keys=('score', 'post_id'))
+    context = {
+        'trending': True,
+        'page_obj': page_obj,
+        'feed_cache': caching.feed_cache(
+            request, page_obj, caching.FEED, caching.TRENDING),
+        'follow_buttons': button_state(request),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@conditional_page(group_validators)
+@caching.cache_anonymous_page
 def group_list(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, PAGINATOR_VALUE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.select_related('author', 'group')
+    page_obj = paginate(request, posts)
     context = {
         'group': group,
         'posts': posts,
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'feed_cache': caching.feed_cache(
+            request, page_obj, caching.group_tag(group.slug)),
+        'follow_buttons': button_state(request),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(feed_validators)
+@caching.cache_anonymous_page
+def search(request):
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid():
+        group = form.cleaned_data['group']
+        author = form.cleaned_data['author']
+        paginator = SearchPaginator(
+            Post.objects.select_related('author', 'group'),
+            settings.PAGINATOR_VALUE,
+            form.cleaned_data['q'],
+            group_id=group.pk if group else None,
+            author_id=author.pk if author else None,
+        )
+        page_obj = paginator.get_keyset_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    # Выдача зависит от любого поста, группы и автора.
+    caching.add_cache_tags(request, caching.FEED)
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'query': query.urlencode(),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -43,6 +128,7 @@ def post_create(request):
         create_post = form.save(commit=False)
         create_post.author = request.user
         create_post.save()
+        thumbnails.schedule(create_post)
         return redirect('posts:profile', create_post.author)
     context = {
         'form': form,
@@ -61,7 +147,9 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -71,30 +159,66 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+@conditional_page(profile_validators)
+@caching.cache_anonymous_page
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, PAGINATOR_VALUE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    following = False
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    posts = author.posts.select_related('group')
+    page_obj = paginate(request, posts)
+    follows_you = False
+    who_to_follow = []
     if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user, author=author.id).exists()
-
+        follows_you = graph.get_graph().follows(author.id, request.user.pk)
+        who_to_follow = [
+            row for row in graph.who_to_follow(request.user)
+            if row['username'] != author.username
+        ]
+    stats = stats_for(author)
     context = {
         'username': author,
         'page_obj': page_obj,
-        'count_posts': author.posts.count(),
-        'following': following
+        'count_posts': stats.posts_count,
+        'stats': stats,
+        'following': is_following(request, author.id),
+        'follows_you': follows_you,
+        'who_to_follow': who_to_follow,
+        'feed_cache': caching.feed_cache(
+            request, page_obj, caching.author_tag(author.username)),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in export.FORMATS:
+        export_format = 'ndjson'
+    response = StreamingHttpResponse(
+        export.lines(author, export_format),
+        content_type=export.FORMATS[export_format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{author.username}.{export_format}"'
+    )
+    return response
+
+
+@conditional_page(post_validators)
+@caching.cache_anonymous_page
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    posts_count = post.author.posts.count()
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id)
+    posts_count = stats_for(post.author).posts_count
+    comments = comments_page(request, post.pk)
+    tags = comment_tags(post.pk, comments)
+    tags.add(caching.author_tag(post.author.username))
+    if post.group is not None:
+        tags.add(caching.group_tag(post.group.slug))
+    caching.add_cache_tags(request, *tags)
     form = CommentForm(request.POST or None)
     context = {
         'post_detail': post,
@@ -105,9 +229,60 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_page(request, post_id):
+    """Страница комментариев после курсора ?after=, от новых к старым.
+
+    Авторы приходят тем же запросом через select_related.
+    """
+    paginator = KeysetPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        keys=('created', 'id'),
+    )
+    return paginator.get_keyset_page(after=request.GET.get('after'))
+
+
+def comment_tags(post_id, comments):
+    # Имя автора комментария видно на странице.
+    tags = {caching.post_tag(post_id)}
+    tags.update(
+        caching.author_tag(comment.author.username) for comment in comments
+    )
+    return tags
+
+
+@conditional_page(post_validators)
+@caching.cache_anonymous_page
+def post_comments(request, post_id):
+    """Следующая страница комментариев: HTML-фрагмент или JSON."""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments = comments_page(request, post_id)
+    caching.add_cache_tags(request, *comment_tags(post_id, comments))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'results': [
+                {
+                    'id': comment.pk,
+                    'text': comment.text,
+                    'created': comment.created,
+                    'author': comment.author.username,
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        }, json_dumps_params={'ensure_ascii': False})
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -119,11 +294,14 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, PAGINATOR_VALUE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = IdSequence(
+        timeline_post_ids(request.user),
+        Post.objects.select_related('author', 'group')
+    )
+    page_obj = paginate(request, posts)
     context = {
+        'follow': True,
+        'who_to_follow': graph.who_to_follow(request.user),
         'posts': posts,
         'page_obj': page_obj,
     }
@@ -141,7 +319,7 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     follower = get_object_or_404(
-        Follow,
+        Follow.objects.select_related('author', 'user'),
         user=request.user,
         author__username=username
     )
@@ -0,0 +1,24 @@
+// «Показать еще» под комментариями: подгружает следующую страницу
+// фрагментом вместо перехода на ?after=.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('.load-more-comments');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  link.classList.add('disabled');
+  fetch(link.dataset.url, {credentials: 'same-origin'})
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.status);
+      }
+      return response.text();
+    })
+    .then(function (html) {
+      link.insertAdjacentHTML('afterend', html);
+      link.remove();
+    })
+    .catch(function () {
+      window.location.href = link.href;
+    });
+});
@@ -0,0 +1,19 @@
+// Кнопки подписки в лентах: кэшированный фрагмент ленты один на всех,
+// поэтому нужную кнопку открывает скрипт по списку подписок страницы.
+(function () {
+  var data = document.getElementById('follow-buttons');
+  if (!data) {
+    return;
+  }
+  var state = JSON.parse(data.textContent);
+  var authors = new Set(state.authors);
+  document.querySelectorAll('.follow-buttons').forEach(function (buttons) {
+    var author = Number(buttons.dataset.author);
+    if (author === state.user) {
+      return;
+    }
+    buttons.querySelector(authors.has(author) ? '.follow' : '.unfollow')
+      .remove();
+    buttons.classList.remove('d-none');
+  });
+})();
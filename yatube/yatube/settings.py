@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -40,6 +41,7 @@ INSTALLED_APPS = [
     'about.apps.AboutConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -51,7 +53,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -90,11 +94,44 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        #  SQLite с очередью записи процесса (core.sqlite)
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
 
+#  Реплики только для чтения (core.replicas), пути через запятую:
+#  DATABASE_REPLICAS=/var/tmp/replica1.sqlite3,/var/tmp/replica2.sqlite3.
+#  Локально их заполняет команда sync_replicas. После записи клиент
+#  читает с default еще REPLICA_STICKY_SECONDS секунд.
+for number, name in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+
+#  PRAGMA каждого соединения с SQLite (core.sqlite); пустой словарь -
+#  настройки SQLite по умолчанию. mmap_size - в байтах, cache_size < 0 -
+#  в КиБ, busy_timeout - в мс.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+#  транзакции и пишущие запросы процесса идут в SQLite по очереди
+#  (ENGINE core.backends.sqlite3)
+SQLITE_SERIALIZE_WRITES = True
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -153,13 +190,125 @@ LOGIN_REDIRECT_URL = 'posts:index'
 
 #  указываем количество постов в пагинации
 PAGINATOR_VALUE = 10
+#  комментариев на странице поста и в подгрузке «Показать еще»
+COMMENTS_PER_PAGE = 20
+#  keyset-пагинация по курсорам ?after=/?before= вместо номеров страниц
+KEYSET_PAGINATION = False
+
+#  лента подписок: сколько постов хранить на пользователя
+TIMELINE_LENGTH = 1000
+#  с какого числа подписчиков посты автора не раскладываются по лентам,
+#  а подмешиваются при чтении
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 500
+
+#  сколько последних постов отдают RSS и Atom (posts.feeds)
+FEED_ITEMS = 20
+
+#  наибольший ?limit= в JSON API (api.views)
+API_MAX_LIMIT = 100
+
+#  выгрузка постов пользователя (posts.export): строк за одну выборку
+EXPORT_CHUNK_SIZE = 2000
+
+#  варианты картинок постов для <picture>/srcset (posts.thumbnails):
+#  ширины, пропорции кадра, форматы по убыванию приоритета (последний -
+#  запасной для <img>), ширина <img> по умолчанию и атрибут sizes.
+#  Форматы, которые не умеют писать Pillow или sorl (AVIF), пропускаются.
+POST_IMAGE_VARIANTS = {
+    'widths': (300, 600, 900, 1200),
+    'aspect': (600, 339),
+    'formats': ('WEBP', 'JPEG'),
+    'quality': 80,
+    'default_width': 600,
+    'sizes': '(min-width: 768px) 600px, 100vw',
+}
+#  процессы пула команды process_thumbnails; 0 - в текущем процессе
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', '2'))
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
 
+#  Метрики Prometheus (core.metrics): каждый процесс сбрасывает свои
+#  счетчики в METRICS_DIR/<pid>-<время старта>.json не чаще раза в
+#  METRICS_FLUSH_INTERVAL секунд, /metrics складывает все файлы.
+#  Каталог общий для всех воркеров gunicorn; файлы завершившихся
+#  воркеров переносятся в archive.json, чтобы счетчики не шли назад.
+METRICS_DIR = os.getenv(
+    'METRICS_DIR',
+    os.path.join(tempfile.gettempdir(), 'yatube-metrics'),
+)
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+#  Доступ к /metrics: адреса через запятую (METRICS_ALLOWED_IPS) или
+#  заголовок Authorization: Bearer <METRICS_TOKEN>. По умолчанию закрыто:
+#  за обратным прокси REMOTE_ADDR у всех запросов - адрес прокси, и
+#  INTERNAL_IPS открыл бы метрики всем.
+METRICS_ALLOWED_IPS = list(
+    filter(None, os.getenv('METRICS_ALLOWED_IPS', '').split(','))
+)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+#  время жизни кэша лент; свежесть обеспечивают поколения posts.caching
+FEED_CACHE_TIMEOUT = 60 * 60
+#  время жизни целых страниц для анонимов (posts.caching)
+PAGE_CACHE_TIMEOUT = 60 * 60
+#  время жизни списка подписок пользователя (posts.following); ключ
+#  сбрасывается при подписке и отписке
+FOLLOWING_CACHE_TIMEOUT = 24 * 60 * 60
+
+#  граф подписок в памяти процесса (posts.graph): журнал FollowEvent
+#  дочитывается раз в GRAPH_REFRESH_INTERVAL секунд, события последних
+#  GRAPH_EVENT_LAG секунд перечитываются (транзакции параллельных
+#  писателей фиксируются не по порядку id), граф собирается
+#  заново раз в GRAPH_RELOAD_INTERVAL или после GRAPH_MAX_CHANGES
+#  изменений (в фоне); события старше GRAPH_EVENT_RETENTION удаляет
+#  команда prune_follow_events
+GRAPH_REFRESH_INTERVAL = 5
+GRAPH_EVENT_LAG = 60
+GRAPH_RELOAD_INTERVAL = 60 * 60
+GRAPH_MAX_CHANGES = 10000
+GRAPH_EVENT_RETENTION = 24 * 60 * 60
+GRAPH_LOAD_CHUNK_SIZE = 10000
+#  рейтинг «Популярное» (posts.trending, команда compute_trending):
+#  окно активности и предельный возраст поста в секундах, веса
+#  комментариев и новых подписчиков, степень затухания по возрасту
+TRENDING_WINDOW = 24 * 60 * 60
+TRENDING_MAX_AGE = 7 * 24 * 60 * 60
+TRENDING_COMMENT_WEIGHT = 1.0
+TRENDING_FOLLOW_WEIGHT = 0.5
+TRENDING_GRAVITY = 1.5
+TRENDING_BATCH_SIZE = 1000
+#  блок «Кого почитать»: число подсказок и время их жизни в кэше
+WHO_TO_FOLLOW_COUNT = 5
+WHO_TO_FOLLOW_TIMEOUT = 10 * 60
+
+#  default - LRU в памяти процесса поверх общего кэша shared (core.cache).
+#  Общий кэш задается окружением, например
+#  CACHE_SHARED_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+#  CACHE_SHARED_LOCATION=/var/tmp/yatube_cache; по умолчанию - LocMemCache,
+#  и с ним L1 выключен: LocMemCache не общий, и инвалидация не дойдет до
+#  других процессов. Для нескольких воркеров нужен общий бэкенд.
+#  Изменения из других процессов доходят до L1 не дольше SYNC_INTERVAL.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_MAX_BYTES': 16 * 1024 * 1024,
+            'L1_TIMEOUT': 30,
+            'SYNC_INTERVAL': 1.0,
+            'COMPRESS_MIN_SIZE': 1024,
+        },
+    },
+    'shared': {
+        'BACKEND': os.getenv(
+            'CACHE_SHARED_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_SHARED_LOCATION', 'shared'),
+        'TIMEOUT': None,
+    },
 }
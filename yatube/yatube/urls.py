@@ -18,6 +18,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.metrics import metrics_view
+
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
@@ -25,6 +27,8 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('api.urls', namespace='api')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 handler404 = 'core.views.page_not_found'